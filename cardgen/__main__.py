@@ -0,0 +1,49 @@
+"""
+Run any of the cardgen scripts as a command, from the repository root:
+
+  python cardgen lint
+  python cardgen frequency --anime --limit 50
+"""
+
+import runpy
+import sys
+from collections import OrderedDict
+
+# Command => module
+COMMANDS = OrderedDict([
+  ('lint', 'lint'),
+  ('duplicates', 'duplicates'),
+  ('sort', 'sort'),
+  ('shard', 'shards'),
+  ('update-frequencies', 'update_frequencies'),
+  ('insert-blank-notes', 'insert_blank_notes'),
+  ('tsv-import', 'tsv_import'),
+  ('jmdict', 'jmdict'),
+  ('enrich', 'enrich'),
+  ('vocabulary-deck', 'generate_vocabulary_deck'),
+  ('verb-deck', 'generate_verb_deck'),
+  ('adjective-deck', 'generate_adjective_deck'),
+  ('frequency', 'frequency'),
+  ('note-store', 'note_store'),
+  ('report-server', 'report_server'),
+  ('report-client', 'report_client'),
+  ('build-frequency-list', 'build_frequency_list'),
+  ('corpus-scan', 'corpus_scan'),
+])
+
+def main():
+  if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+    print('usage: python cardgen <command> [arguments]')
+    print()
+    print('commands:')
+    for command in COMMANDS:
+      print('  {}'.format(command))
+    sys.exit(1 if len(sys.argv) > 1 and sys.argv[1] not in ('-h', '--help') else 0)
+
+  command = sys.argv.pop(1)
+  sys.argv[0] = 'cardgen {}'.format(command)
+  # NB: Modules are only imported when run, so each command loads only what it needs.
+  runpy.run_module(COMMANDS[command], run_name='__main__', alter_sys=True)
+
+if __name__ == '__main__':
+  main()
@@ -24,8 +24,9 @@ def load_word_frequency_map(filename):
   """
   Gets the {word => frequency} map in a file.
   Filters out comments and the ignore list of words.
+  Lines may have more tab separated columns after the word.
   """
-  words = load_file_lines(filename)
+  words = [line.split('\t')[0] for line in load_file_lines(filename)]
   return { word : rank for rank, word in enumerate(words) \
           if word not in IGNORE_SET \
           and not word.startswith('#') }
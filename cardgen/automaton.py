@@ -0,0 +1,110 @@
+"""
+Aho-Corasick automaton for finding many words in unsegmented text.
+
+Japanese text has no spaces, so finding words means matching every word at
+every position. The automaton does that for all words at once in one pass
+over the text, no matter how many words there are.
+"""
+
+import heapq
+from collections import deque
+
+class Automaton:
+  def __init__(self, patterns):
+    """
+    Build the automaton over a list of patterns. Matches are reported with
+    the pattern's position in this list.
+    """
+    self.patterns = list(patterns)
+
+    # Trie of the patterns. State 0 is the root.
+    self.goto = [{}]
+    self.outputs = [()]
+    for pattern_id, pattern in enumerate(self.patterns):
+      state = 0
+      for c in pattern:
+        if c not in self.goto[state]:
+          self.goto[state][c] = len(self.goto)
+          self.goto.append({})
+          self.outputs.append(())
+        state = self.goto[state][c]
+      self.outputs[state] += (pattern_id,)
+
+    # Failure links, breadth first so shorter suffixes are linked first. Each
+    # state also inherits the outputs of its failure state, so a scan never
+    # has to follow output links.
+    self.fail = [0] * len(self.goto)
+    queue = deque(self.goto[0].values())
+    while queue:
+      state = queue.popleft()
+      for c, next_state in self.goto[state].items():
+        queue.append(next_state)
+        fail = self.fail[state]
+        while fail and c not in self.goto[fail]:
+          fail = self.fail[fail]
+        fail = self.goto[fail].get(c, 0)
+        self.fail[next_state] = fail if fail != next_state else 0
+        self.outputs[next_state] += self.outputs[self.fail[next_state]]
+
+  def __len__(self):
+    return len(self.patterns)
+
+  def scan(self, text):
+    """
+    Yield (start, pattern id) for every match in the text, in order of where
+    the match ends. Overlapping matches are all reported.
+    """
+    return self.scan_chunks([text])
+
+  def scan_chunks(self, chunks):
+    """
+    scan() over a stream of text chunks, as one text. Matches may span chunks.
+    """
+    goto = self.goto
+    fail = self.fail
+    outputs = self.outputs
+    lengths = [len(pattern) for pattern in self.patterns]
+    state = 0
+    offset = 0
+    for text in chunks:
+      for i, c in enumerate(text, offset):
+        while state and c not in goto[state]:
+          state = fail[state]
+        state = goto[state].get(c, 0)
+        if outputs[state]:
+          for pattern_id in outputs[state]:
+            yield i - lengths[pattern_id] + 1, pattern_id
+      offset += len(text)
+
+  def scan_longest(self, chunks):
+    """
+    Yield (start, pattern id) of non-overlapping matches, taking the longest
+    match at the leftmost position first. This segments text into words the
+    way a greedy dictionary tokenizer would.
+    """
+    lengths = [len(pattern) for pattern in self.patterns]
+    max_length = max(lengths, default=0)
+    # start => longest pattern id starting there, for starts still open
+    longest = {}
+    starts = []
+    cursor = 0
+    for start, pattern_id in self.scan_chunks(chunks):
+      if start not in longest:
+        heapq.heappush(starts, start)
+        longest[start] = pattern_id
+      elif lengths[pattern_id] > lengths[longest[start]]:
+        longest[start] = pattern_id
+      # Matches are reported by end, so no later match starts before this.
+      end = start + lengths[pattern_id] - 1
+      while starts and starts[0] <= end - max_length:
+        cursor = yield from self._emit_longest(starts, longest, lengths, cursor)
+    while starts:
+      cursor = yield from self._emit_longest(starts, longest, lengths, cursor)
+
+  def _emit_longest(self, starts, longest, lengths, cursor):
+    start = heapq.heappop(starts)
+    pattern_id = longest.pop(start)
+    if start >= cursor:
+      yield start, pattern_id
+      cursor = start + lengths[pattern_id]
+    return cursor
@@ -0,0 +1,41 @@
+import unittest
+
+from automaton import Automaton
+
+def matches(automaton, found):
+  return [(start, automaton.patterns[pattern_id]) for start, pattern_id in found]
+
+class TestAutomaton(unittest.TestCase):
+
+  def test_overlapping_matches(self):
+    automaton = Automaton(['東京', '京都', '東京都', '都'])
+    self.assertEqual(matches(automaton, automaton.scan('東京都')),
+        [(0, '東京'), (0, '東京都'), (1, '京都'), (2, '都')])
+
+  def test_matches_inside_matches(self):
+    automaton = Automaton(['he', 'she', 'his', 'hers'])
+    self.assertEqual(matches(automaton, automaton.scan('ushers')),
+        [(1, 'she'), (2, 'he'), (2, 'hers')])
+
+  def test_repeated_and_self_overlapping(self):
+    automaton = Automaton(['ああ'])
+    self.assertEqual(matches(automaton, automaton.scan('あああ')), [(0, 'ああ'), (1, 'ああ')])
+
+  def test_duplicate_patterns(self):
+    automaton = Automaton(['猫', '猫'])
+    self.assertEqual(list(automaton.scan('猫')), [(0, 0), (0, 1)])
+
+  def test_matches_span_chunks(self):
+    automaton = Automaton(['東京', '京都', '東京都', '都'])
+    self.assertEqual(list(automaton.scan_chunks(['東', '京', '都'])),
+        list(automaton.scan('東京都')))
+
+  def test_longest_leftmost(self):
+    automaton = Automaton(['東京', '京都', '東京都', '都', '大学'])
+    self.assertEqual(matches(automaton, automaton.scan_longest(['東京都の大学'])),
+        [(0, '東京都'), (4, '大学')])
+    self.assertEqual(matches(automaton, automaton.scan_longest(['京都大学'])),
+        [(0, '京都'), (2, '大学')])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+Build a word frequency list from a local folder of subtitles and text.
+
+Text is segmented greedily (longest known word first) against the spellings
+of every note and every word in the JLPT and WaniKani word sets, so only
+candidate words are counted. Words are matched as written, without folding
+katakana into hiragana. The output is one word per line, most frequent
+first, in the format analysis.load_word_frequency_map reads, with the
+cumulative share of counted words as a second, tab separated column. There's
+no header: ranks are line numbers, so the most frequent word is rank 0.
+"""
+
+import argparse
+import multiprocessing
+import os
+from array import array
+
+from automaton import Automaton
+from corpus_scan import corpus_filenames
+from corpus_scan import load_library_scanner
+from corpus_scan import read_text_chunks
+from normalize import KANA_ONLY
+from sources import LazySources
+from sources import WORD_SETS
+
+# Files read under directories. Markdown corpus files are only for examples.
+BUILDER_EXTENSIONS = ('.srt', '.ass', '.txt')
+
+# Set in each pool worker by _init_worker()
+_automaton = None
+
+# Readings of words that have a kanji spelling are only counted if they're
+# this long. Short readings (える for 得る) mostly match inside other words.
+MIN_READING_LENGTH = 3
+
+def spellings(word):
+  return [form.strip().replace('～', '') for form in word.split('/') if form.strip()]
+
+class CandidateWords:
+  def __init__(self, notes, word_sets):
+    """
+    Every spelling of the (kanji, kana) notes, plus every word in the word
+    sets. Single kana are never counted.
+    """
+    # NB: Words are matched as written, so マン and まん are counted apart.
+    self.words = []
+    word_ids = {}
+
+    def add(word):
+      if len(word) < 2 and KANA_ONLY.match(word):
+        return
+      if word and word not in word_ids:
+        word_ids[word] = len(self.words)
+        self.words.append(word)
+
+    for kanji, kana in notes:
+      kanji_spellings = spellings(kanji)
+      kana_only = all(KANA_ONLY.match(word) for word in kanji_spellings)
+      for word in kanji_spellings:
+        add(word)
+      for word in spellings(kana):
+        if kana_only or len(word) >= MIN_READING_LENGTH:
+          add(word)
+
+    for word_set in word_sets:
+      for word in sorted(word_set):
+        add(word)
+
+    self.automaton = Automaton(self.words)
+
+def count_file(filename, automaton):
+  """
+  Occurrences of each candidate pattern in a file, by pattern id.
+  """
+  # NB: One counter per pattern, so memory doesn't grow with the corpus.
+  counts = array('q', [0]) * len(automaton)
+  for _, pattern_id in automaton.scan_longest(read_text_chunks(filename, fold=False)):
+    counts[pattern_id] += 1
+  return counts
+
+def _init_worker(automaton):
+  global _automaton
+  _automaton = automaton
+
+def _count_file(filename):
+  return count_file(filename, _automaton)
+
+def count_corpus(filenames, automaton, processes=None):
+  """
+  Counts of every pattern across the files, counted on a process pool.
+  """
+  totals = array('q', [0]) * len(automaton)
+  processes = processes or os.cpu_count() or 1
+  with multiprocessing.Pool(processes, _init_worker, (automaton,)) as pool:
+    for counts in pool.imap_unordered(_count_file, filenames):
+      for i, count in enumerate(counts):
+        if count:
+          totals[i] += count
+  return totals
+
+def write_frequency_list(words, counts, filename, limit=None):
+  """
+  Ranked `word<TAB>cumulative share` lines, most frequent first.
+  """
+  ranked = sorted((i for i, count in enumerate(counts) if count),
+      key=lambda i: (-counts[i], words[i]))
+  total = sum(counts)
+  cumulative = 0
+  with open(filename, 'w') as f:
+    for i in ranked[0:limit]:
+      cumulative += counts[i]
+      f.write('{}\t{:.6f}\n'.format(words[i], cumulative / total))
+  return len(ranked[0:limit])
+
+def main():
+  parser = argparse.ArgumentParser(description='Build a frequency list from text files')
+  parser.add_argument('paths', nargs='+',
+      help='.srt, .ass and .txt files, or directories of them')
+  parser.add_argument('--output', dest='output', required=True,
+      help='frequency list to write, eg. lists/my_subtitles_frequency.txt')
+  parser.add_argument('--limit', dest='limit', type=int,
+      help='only write the most frequent words')
+  parser.add_argument('--processes', dest='processes', type=int,
+      help='number of worker processes (default: all cores)')
+  args = parser.parse_args()
+
+  word_sets = LazySources(WORD_SETS)
+  candidates = CandidateWords(load_library_scanner().notes, word_sets.values())
+  filenames = corpus_filenames(args.paths, BUILDER_EXTENSIONS)
+  counts = count_corpus(filenames, candidates.automaton, args.processes)
+
+  written = write_frequency_list(candidates.words, counts, args.output, args.limit)
+  print('Wrote {} words ({:,} counted) from {} files to {}'.format(written, sum(counts),
+      len(filenames), args.output))
+
+if __name__ == '__main__':
+  main()
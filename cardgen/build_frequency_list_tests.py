@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+from build_frequency_list import CandidateWords
+from build_frequency_list import count_file
+
+def counted(candidates, text):
+  fd, filename = tempfile.mkstemp(suffix='.txt')
+  with os.fdopen(fd, 'w', encoding='utf-8') as f:
+    f.write(text)
+  try:
+    counts = count_file(filename, candidates.automaton)
+  finally:
+    os.remove(filename)
+  return { word: count for word, count in zip(candidates.words, counts) if count }
+
+class TestCandidateWords(unittest.TestCase):
+
+  def test_words_are_matched_as_written(self):
+    candidates = CandidateWords([('マン', 'まん'), ('万', 'まん')], [])
+    self.assertEqual(candidates.words, ['マン', 'まん', '万'])
+    self.assertEqual(counted(candidates, 'マン、まん、万'), { 'マン': 1, 'まん': 1, '万': 1 })
+
+  def test_single_kana_are_never_counted(self):
+    candidates = CandidateWords([('木', 'き')], [{'は', 'はい'}])
+    self.assertEqual(candidates.words, ['木', 'はい'])
+
+if __name__ == '__main__':
+  unittest.main()
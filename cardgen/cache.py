@@ -0,0 +1,128 @@
+"""
+Local, disposable build caches.
+
+Everything written here can be deleted at any time; it will be rebuilt on
+the next run. Cached artifacts are keyed by a hash of their inputs so that
+stale data is never silently reused.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_DIRECTORY = '.cache'
+
+def cache_path(name):
+  """
+  Path of a named artifact in the cache directory. Creates the directory.
+  """
+  os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+  return os.path.join(CACHE_DIRECTORY, name)
+
+def hash_strings(*values):
+  """
+  Stable hex digest of a sequence of strings.
+  """
+  digest = hashlib.sha1()
+  for value in values:
+    digest.update(value.encode('utf-8'))
+    digest.update(b'\0')
+  return digest.hexdigest()
+
+def hash_file(filename):
+  """
+  Hex digest of a file's contents.
+  """
+  digest = hashlib.sha1()
+  with open(filename, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 16), b''):
+      digest.update(block)
+  return digest.hexdigest()
+
+def local_imports(filename):
+  """
+  The module's file, and the files of every module next to it that it
+  imports, directly or not. Sorted.
+  """
+  directory = os.path.dirname(os.path.abspath(filename))
+  seen = set()
+  pending = [os.path.abspath(filename)]
+  while pending:
+    module = pending.pop()
+    if module in seen:
+      continue
+    seen.add(module)
+    with open(module, 'rb') as f:
+      tree = ast.parse(f.read(), module)
+    for node in ast.walk(tree):
+      if isinstance(node, ast.Import):
+        names = [alias.name for alias in node.names]
+      elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+        names = [node.module]
+      else:
+        continue
+      for name in names:
+        imported = os.path.join(directory, name.split('.')[0] + '.py')
+        if os.path.exists(imported):
+          pending.append(imported)
+  return sorted(seen)
+
+def source_fingerprint(filename):
+  """
+  Changes whenever the source of a module, or of a local module it imports,
+  does.
+  """
+  return hash_strings(*[hash_file(module) for module in local_imports(filename)])
+
+def stat_fingerprint(filenames):
+  """
+  Cheap fingerprint of a set of files from their size and modification time.
+  This doesn't read the files, so it's suitable for startup checks.
+  """
+  parts = []
+  for filename in sorted(filenames):
+    stat = os.stat(filename)
+    parts.append('{}:{}:{}'.format(filename, stat.st_size, stat.st_mtime_ns))
+  return hash_strings(*parts)
+
+def load_json(name):
+  """
+  Load a cached JSON document, or None if it is missing or unreadable.
+  """
+  try:
+    with open(cache_path(name), 'r') as f:
+      return json.load(f)
+  except (OSError, ValueError):
+    return None
+
+def save_json(name, data):
+  _atomic_write(name, json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8'))
+
+def load_pickle(name):
+  """
+  Load a cached pickle, or None if it is missing or unreadable.
+  """
+  try:
+    with open(cache_path(name), 'rb') as f:
+      return pickle.load(f)
+  except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+    return None
+
+def save_pickle(name, data):
+  _atomic_write(name, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+
+def atomic_write(filename, contents):
+  """
+  Replace a file with contents (bytes), all at once.
+  """
+  # NB: Write then rename so a concurrent reader never sees a partial file,
+  # and a crash leaves the old one.
+  temp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+  with open(temp_filename, 'wb') as f:
+    f.write(contents)
+  os.replace(temp_filename, filename)
+
+def _atomic_write(name, contents):
+  atomic_write(cache_path(name), contents)
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+
+from cache import local_imports
+from cache import source_fingerprint
+
+class TestSourceFingerprint(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.write('a.py', 'import os\nfrom b import f\n')
+    self.write('b.py', 'def f():\n  import c\n')
+    self.write('c.py', 'import a\n')
+    self.write('d.py', '')
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def path(self, name):
+    return os.path.join(self.directory.name, name)
+
+  def write(self, name, contents):
+    with open(self.path(name), 'w') as f:
+      f.write(contents)
+
+  def test_local_imports_are_transitive(self):
+    self.assertEqual(local_imports(self.path('a.py')),
+        [self.path('a.py'), self.path('b.py'), self.path('c.py')])
+
+  def test_changes_with_an_imported_module(self):
+    before = source_fingerprint(self.path('a.py'))
+    self.write('d.py', 'x = 1\n')
+    self.assertEqual(source_fingerprint(self.path('a.py')), before)
+    self.write('c.py', 'import a\nx = 1\n')
+    self.assertNotEqual(source_fingerprint(self.path('a.py')), before)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+"""
+Count how often each note appears in Japanese text files.
+
+Every note's kanji, kana and normalized forms are matched in one pass over
+the text with an Aho-Corasick automaton, which is cached and only rebuilt
+when the library changes.
+
+Text is matched as written. Only notes with katakana in them also match
+their hiragana spelling (テレビ in てれび); folding all text would count
+the まん of 万 in マンション.
+"""
+
+import argparse
+import os
+import re
+
+from automaton import Automaton
+from cache import hash_strings
+from cache import load_pickle
+from cache import save_pickle
+from cache import stat_fingerprint
+from constants import IGNORE_SET
+from library import NoteLibrary
+from normalize import ALTERNATE_SEPARATOR
+from normalize import STRIP_CHARACTERS
+from normalize import fold_kana
+from normalize import normalized_keys
+from normalize import rules_fingerprint
+
+AUTOMATON_CACHE_NAME = 'library_automaton.pickle'
+
+# Bump when the matched forms or the automaton layout change.
+AUTOMATON_VERSION = 2
+
+# Files read when a directory is scanned
+CORPUS_EXTENSIONS = ('.srt', '.ass', '.txt', '.md')
+
+# Characters read at a time, so files of any size stream in flat memory
+CHUNK_SIZE = 1 << 20
+
+# Subtitle lines that hold no text: cue numbers and timings
+SRT_CUE = re.compile('^\\d+$|-->')
+
+# .ass override tags like {\\an8}, and escaped line breaks and spaces
+ASS_MARKUP = re.compile('\\{[^}]*\\}|\\\\[Nnh]')
+
+# Fields of an .ass Dialogue line before the text
+ASS_TEXT_FIELD = 9
+
+KATAKANA = re.compile('[ァ-ヶ]')
+
+def surface_forms(word):
+  """
+  Each alternate spelling of a word as written, plus its hiragana spelling
+  if it has katakana.
+  """
+  forms = []
+  for alternate in word.split(ALTERNATE_SEPARATOR):
+    form = alternate.strip().translate(STRIP_CHARACTERS)
+    forms.append(form)
+    if KATAKANA.search(form):
+      forms.append(fold_kana(form))
+  return forms
+
+def note_forms(note):
+  """
+  Every form of a note that's matched in text. Single kana and ignored words
+  are left out, since they match almost everywhere.
+  """
+  forms = []
+  for word in (note['kanji'], note['kana']):
+    for form in surface_forms(word) + normalized_keys(word):
+      if not form or form in forms or form in IGNORE_SET:
+        continue
+      if len(form) == 1 and '぀' <= form <= 'ヿ':
+        continue
+      forms.append(form)
+  return forms
+
+class LibraryScanner:
+  def __init__(self, notes):
+    """
+    Build the automaton over every note in the library.
+    """
+    # (kanji, kana) of each note, by note id
+    self.notes = []
+    # The note ids each pattern belongs to, by pattern id
+    self.pattern_notes = []
+
+    pattern_ids = {}
+    for note in notes:
+      if 'disabled' in note and note['disabled']:
+        continue
+      note_id = len(self.notes)
+      self.notes.append((note['kanji'], note['kana']))
+      for form in note_forms(note):
+        if form not in pattern_ids:
+          pattern_ids[form] = len(self.pattern_notes)
+          self.pattern_notes.append([])
+        self.pattern_notes[pattern_ids[form]].append(note_id)
+
+    self.automaton = Automaton(sorted(pattern_ids, key=pattern_ids.get))
+
+  def count(self, chunks):
+    """
+    Hits per note id in a stream of text chunks. Overlapping matches of the
+    same note (eg. 勉強 inside 勉強する) count once.
+    """
+    counts = [0] * len(self.notes)
+    # End of the last counted hit of each note
+    last_end = [-1] * len(self.notes)
+    lengths = [len(pattern) for pattern in self.automaton.patterns]
+    for start, pattern_id in self.automaton.scan_chunks(chunks):
+      for note_id in self.pattern_notes[pattern_id]:
+        if start > last_end[note_id]:
+          counts[note_id] += 1
+          last_end[note_id] = start + lengths[pattern_id] - 1
+    return counts
+
+def library_fingerprint(filenames):
+  return hash_strings(str(AUTOMATON_VERSION), rules_fingerprint(),
+      stat_fingerprint(filenames))
+
+def library_content_hash(manifest):
+  """
+  Hash of what the scanner matches, from the content hashes of a
+  NoteLibrary.manifest(). Unlike library_fingerprint, touching or
+  re-checking out a file doesn't change it.
+  """
+  return hash_strings(str(AUTOMATON_VERSION), rules_fingerprint(),
+      *['{}:{}'.format(filename, manifest[filename]['hash']) for filename in sorted(manifest)])
+
+def load_library_scanner():
+  """
+  Load the cached scanner, rebuilding it first if any notes file changed.
+  """
+  filenames = NoteLibrary.note_filenames()
+  fingerprint = library_fingerprint(filenames)
+  cached = load_pickle(AUTOMATON_CACHE_NAME)
+  if cached and cached['fingerprint'] == fingerprint:
+    return cached['scanner']
+
+  scanner = LibraryScanner(NoteLibrary.import_all_notes())
+  save_pickle(AUTOMATON_CACHE_NAME, {
+    'fingerprint': fingerprint,
+    'scanner': scanner,
+  })
+  return scanner
+
+def corpus_filenames(paths, extensions=CORPUS_EXTENSIONS):
+  """
+  The given files, plus every file with one of the extensions under the
+  given directories.
+  """
+  filenames = []
+  for path in paths:
+    if not os.path.isdir(path):
+      filenames.append(path)
+      continue
+    for root, directories, files in os.walk(path):
+      directories.sort()
+      for filename in sorted(files):
+        if filename.lower().endswith(extensions):
+          filenames.append(os.path.join(root, filename))
+  return filenames
+
+def subtitle_lines(f, extension):
+  """
+  The spoken text of a subtitle file, without cues, timings or markup.
+  """
+  for line in f:
+    if extension == '.ass':
+      if not line.startswith('Dialogue:'):
+        continue
+      line = ASS_MARKUP.sub('', line.split(',', ASS_TEXT_FIELD)[-1])
+    elif SRT_CUE.search(line.strip()):
+      continue
+    yield line
+
+def read_text_chunks(filename, chunk_size=CHUNK_SIZE, fold=True):
+  """
+  Chunks of a UTF-8 text or subtitle file, kana folded unless `fold` is off.
+  """
+  transform = fold_kana if fold else str
+  extension = os.path.splitext(filename)[1].lower()
+  with open(filename, 'r', encoding='utf-8-sig', errors='replace') as f:
+    if extension not in ('.srt', '.ass'):
+      for chunk in iter(lambda: f.read(chunk_size), ''):
+        yield transform(chunk)
+      return
+
+    lines = []
+    size = 0
+    for line in subtitle_lines(f, extension):
+      lines.append(line)
+      size += len(line)
+      if size >= chunk_size:
+        yield transform(''.join(lines))
+        lines = []
+        size = 0
+    if lines:
+      yield transform(''.join(lines))
+
+def main():
+  parser = argparse.ArgumentParser(description='Count notes in Japanese text files')
+  parser.add_argument('paths', nargs='+',
+      help='text files, or directories of {} files'.format(', '.join(CORPUS_EXTENSIONS)))
+  parser.add_argument('--limit', dest='limit', type=int,
+      help='limit the number of results')
+  parser.add_argument('--missing', dest='missing', action='store_true',
+      help='show the notes that never appear instead')
+  args = parser.parse_args()
+
+  scanner = load_library_scanner()
+  counts = [0] * len(scanner.notes)
+  filenames = corpus_filenames(args.paths)
+  for filename in filenames:
+    for note_id, count in enumerate(scanner.count(read_text_chunks(filename, fold=False))):
+      counts[note_id] += count
+
+  print('==== {} notes in {} files ===='.format(len(scanner.notes), len(filenames)))
+  if args.missing:
+    results = [note_id for note_id, count in enumerate(counts) if not count]
+  else:
+    results = sorted((note_id for note_id, count in enumerate(counts) if count),
+        key=lambda note_id: -counts[note_id])
+  for note_id in results[0:args.limit]:
+    kanji, kana = scanner.notes[note_id]
+    print(u'{:<6} : {} ({})'.format(counts[note_id], kanji, kana))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,114 @@
+"""
+Estimate how much of each frequency corpus the note library covers.
+
+The lists only record ranks, so token counts are estimated with Zipf's law:
+the word at rank r accounts for a share of tokens proportional to 1/r. Words
+on the ignore list (particles, single kana, symbols) aren't in the index, so
+they count toward neither the covered tokens nor the total.
+
+Every curve is a prefix sum over a source's precomputed rank order, so a
+report is a handful of vectorized passes over the index.
+"""
+
+import csv
+import numpy as np
+
+from library import NoteLibrary
+
+# Levels in study order. Coverage at a level includes every easier level.
+JLPT_LEVELS = ['n5', 'n4', 'n3', 'n2', 'n1']
+
+# Corpus coverage points reported as "words needed"
+CURVE_POINTS = [0.25, 0.50, 0.75, 0.80, 0.85, 0.90, 0.95, 0.98]
+
+# Numbers of missing words reported as marginal gains
+NEXT_WORD_COUNTS = [100, 500, 1000, 5000]
+
+def word_mask(index, words):
+  """
+  Boolean array over the index's words: True if the word matches one of
+  `words`, exactly or by a normalized key.
+  """
+  mask = np.zeros(len(index.words), dtype=bool)
+  mask[list(index.matching_ids(words))] = True
+  return mask
+
+def level_word_sets(notes, levels=JLPT_LEVELS):
+  """
+  { level => words of every note at that level or easier }
+  """
+  level_sets = {}
+  words = set()
+  for level in levels:
+    NoteLibrary.add_notes_to_set([note for note in notes if note.get('level') == level], words)
+    level_sets[level] = set(words)
+  return level_sets
+
+class CoverageCurve:
+  def __init__(self, index, source, library_mask):
+    """
+    `library_mask` is a word_mask() of the library over the same index.
+    """
+    self.source = source
+    j = index.source_ids[source]
+    order = np.frombuffer(index.orders[source], dtype=index.orders[source].typecode)
+    ranks = np.frombuffer(index.ranks, dtype=index.ranks.typecode)
+    ranks = ranks.reshape(len(index.words), len(index.sources))[order, j]
+
+    # NB: Ranks are line numbers, so they start after the list's header.
+    weights = 1.0 / (ranks - ranks[0] + 1)
+    self.weights = weights / weights.sum()
+    self.covered = library_mask[order]
+
+    # Share of tokens covered by the first n words of the list...
+    self.corpus = np.cumsum(self.weights)
+    # ...and by the library's words among them
+    self.library = np.cumsum(np.where(self.covered, self.weights, 0.0))
+    # Share gained by learning the next n missing words
+    self.missing_gain = np.cumsum(self.weights[~self.covered])
+
+  def __len__(self):
+    return len(self.weights)
+
+  def coverage(self):
+    return float(self.library[-1])
+
+  def covered_words(self):
+    return int(self.covered.sum())
+
+  def words_needed(self, share):
+    """
+    The number of top words that together cover `share` of the tokens.
+    """
+    return min(int(np.searchsorted(self.corpus, share)) + 1, len(self))
+
+  def next_gain(self, count):
+    """
+    Coverage gained by adding the `count` most frequent missing words.
+    """
+    if not len(self.missing_gain):
+      return 0.0
+    return float(self.missing_gain[min(count, len(self.missing_gain)) - 1])
+
+def print_coverage_report(curve, level_curves=None):
+  print('==== {} ({:,} words) ===='.format(curve.source, len(curve)))
+  print('  library: {:.2%} ({:,} words)'.format(curve.coverage(), curve.covered_words()))
+  for level, level_curve in (level_curves or {}).items():
+    print('  through {}: {:.2%}'.format(level, level_curve.coverage()))
+  for count in NEXT_WORD_COUNTS:
+    print('  next {:,} missing words: +{:.2%}'.format(count, curve.next_gain(count)))
+  for share in CURVE_POINTS:
+    print('  {:.0%} of corpus: {:,} words'.format(share, curve.words_needed(share)))
+
+def write_coverage_csv(curves, filename):
+  """
+  One row per source rank: the corpus and library coverage of the top words.
+  """
+  with open(filename, 'w') as f:
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(['source', 'words', 'corpus_coverage', 'library_coverage', 'library_words'])
+    for curve in curves:
+      library_words = np.cumsum(curve.covered)
+      for n in range(len(curve)):
+        writer.writerow([curve.source, n + 1, '{:.6f}'.format(curve.corpus[n]),
+            '{:.6f}'.format(curve.library[n]), library_words[n]])
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+"""
+Find notes that would clash in the vocabulary deck.
+
+A note's guid is genanki.guid_for(kanji, kana), so two notes with the same
+kanji and kana overwrite each other on import. Everything is found in one
+pass over the notes, with hash indexes on (kanji, kana), guid, normalized
+form and kana:
+
+  duplicate       same kanji and kana (and so the same guid)
+  guid collision  different kanji and kana, but the same guid
+  near duplicate  same after normalization, eg. ～さん and さん, 勉強 and 勉強する
+  homograph       same kana, different kanji (only reported on request)
+
+Disabled notes are ignored; they aren't in the deck.
+"""
+
+import argparse
+import sys
+from collections import OrderedDict
+from collections import namedtuple
+from genanki import guid_for
+
+from library import INDEX_NAME
+from library import NoteLibrary
+from library import note_locations
+from normalize import fold_kana
+from normalize import normalized_keys
+
+DUPLICATE = 'duplicate'
+GUID_COLLISION = 'guid collision'
+NEAR_DUPLICATE = 'near duplicate'
+HOMOGRAPH = 'homograph'
+
+# These corrupt the deck; the rest are only worth a look.
+ERROR_KINDS = (DUPLICATE, GUID_COLLISION)
+
+# A note, and where it came from
+NoteLocation = namedtuple('NoteLocation', ['filename', 'position', 'note'])
+
+Finding = namedtuple('Finding', ['kind', 'locations'])
+
+def normal_form(word):
+  # NB: The last key is the most normalized one.
+  return normalized_keys(word)[-1] if word else word
+
+def find_duplicates(located_notes, homographs=False):
+  """
+  Every Finding among the located notes.
+  """
+  # (kanji, kana) => [NoteLocation]
+  pairs = OrderedDict()
+  for located in located_notes:
+    if located.note.get('disabled'):
+      continue
+    pair = (located.note.get('kanji', ''), located.note.get('kana', ''))
+    pairs.setdefault(pair, []).append(located)
+
+  findings = []
+  guids = OrderedDict()
+  normal_forms = OrderedDict()
+  kana = OrderedDict()
+  for pair, group in pairs.items():
+    if len(group) > 1:
+      findings.append(Finding(DUPLICATE, group))
+    guids.setdefault(guid_for(*pair), []).append(pair)
+    normal_forms.setdefault((normal_form(pair[0]), normal_form(pair[1])), []).append(pair)
+    kana.setdefault(fold_kana(pair[1]), []).append(pair)
+
+  indexes = [(GUID_COLLISION, guids), (NEAR_DUPLICATE, normal_forms)]
+  if homographs:
+    indexes.append((HOMOGRAPH, kana))
+  for kind, index in indexes:
+    for pairs_with_key in index.values():
+      if len(pairs_with_key) > 1:
+        findings.append(Finding(kind, [located for pair in pairs_with_key \
+            for located in pairs[pair]]))
+  return findings
+
+def note_lines(findings):
+  """
+  { (filename, position) => line } of every note in the findings.
+  """
+  lines = {}
+  for filename in set(located.filename for finding in findings \
+      for located in finding.locations):
+    with open(filename, 'r') as f:
+      locations = note_locations(f.read())
+    for position, fields in enumerate(locations):
+      lines[(filename, position)] = fields['']
+  return lines
+
+def print_findings(findings, out=sys.stdout):
+  lines = note_lines(findings)
+  for finding in findings:
+    print(u'{}:'.format(finding.kind), file=out)
+    for located in finding.locations:
+      print(u'  {}:{}: {} ({})'.format(located.filename,
+          lines.get((located.filename, located.position), 1),
+          located.note.get('kanji'), located.note.get('kana')), file=out)
+
+def located_library_notes(filenames=None):
+  located_notes = []
+  for filename in filenames or NoteLibrary.note_filenames():
+    try:
+      notes = NoteLibrary.read_notes_from_toml_file(filename)[INDEX_NAME]
+    except Exception as e:
+      print('Error processing file: {0}'.format(filename))
+      print(e)
+      continue
+    for position, note in enumerate(notes):
+      located_notes.append(NoteLocation(filename, position, note))
+  return located_notes
+
+def main():
+  parser = argparse.ArgumentParser(description='Find notes that clash in the deck')
+  parser.add_argument('--homographs', dest='homographs', action='store_true',
+      help='also list notes with the same kana and different kanji')
+  parser.add_argument('--strict', dest='strict', action='store_true',
+      help='fail on near duplicates too')
+  args = parser.parse_args()
+
+  findings = find_duplicates(located_library_notes(), args.homographs)
+  print_findings(findings)
+
+  counts = OrderedDict((kind, 0) for kind in (DUPLICATE, GUID_COLLISION, NEAR_DUPLICATE, HOMOGRAPH))
+  for finding in findings:
+    counts[finding.kind] += 1
+  print(', '.join('{} {}s'.format(count, kind) for kind, count in counts.items()))
+
+  failing = ERROR_KINDS + ((NEAR_DUPLICATE,) if args.strict else ())
+  if any(counts[kind] for kind in failing):
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,54 @@
+import unittest
+from genanki import guid_for
+from unittest import mock
+
+from duplicates import DUPLICATE
+from duplicates import GUID_COLLISION
+from duplicates import HOMOGRAPH
+from duplicates import NEAR_DUPLICATE
+from duplicates import NoteLocation
+from duplicates import find_duplicates
+
+def located(*notes):
+  return [NoteLocation('test.toml', position, note) for position, note in enumerate(notes)]
+
+def summary(findings):
+  return [(finding.kind, [located.position for located in finding.locations]) \
+      for finding in findings]
+
+class TestFindDuplicates(unittest.TestCase):
+
+  def test_forced_guid_collision(self):
+    notes = located(
+      { 'kanji': '猫', 'kana': 'ねこ' },
+      { 'kanji': '犬', 'kana': 'いぬ' },
+      { 'kanji': '鳥', 'kana': 'とり' },
+    )
+    # NB: Real guids only collide by chance, so force one.
+    def colliding_guid(kanji, kana):
+      return 'collision' if kanji in ('猫', '鳥') else guid_for(kanji, kana)
+    with mock.patch('duplicates.guid_for', colliding_guid):
+      findings = find_duplicates(notes)
+    self.assertEqual(summary(findings), [(GUID_COLLISION, [0, 2])])
+
+  def test_duplicates_are_not_also_guid_collisions(self):
+    notes = located(
+      { 'kanji': '猫', 'kana': 'ねこ' },
+      { 'kanji': '猫', 'kana': 'ねこ', 'english': 'cat' },
+      { 'kanji': '猫', 'kana': 'ねこ', 'disabled': True },
+    )
+    self.assertEqual(summary(find_duplicates(notes)), [(DUPLICATE, [0, 1])])
+
+  def test_near_duplicates_and_homographs(self):
+    notes = located(
+      { 'kanji': '勉強', 'kana': 'べんきょう' },
+      { 'kanji': '勉強する', 'kana': 'べんきょうする' },
+      { 'kanji': '橋', 'kana': 'はし' },
+      { 'kanji': '箸', 'kana': 'はし' },
+    )
+    self.assertEqual(summary(find_duplicates(notes)), [(NEAR_DUPLICATE, [0, 1])])
+    self.assertEqual(summary(find_duplicates(notes, homographs=True)),
+        [(NEAR_DUPLICATE, [0, 1]), (HOMOGRAPH, [2, 3])])
+
+if __name__ == '__main__':
+  unittest.main()
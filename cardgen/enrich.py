@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+"""
+Fill in notes from the JMdict index (see jmdict.py).
+
+  python cardgen jmdict JMdict_e.xml
+  python cardgen enrich [files or directories]
+  python cardgen enrich --apply vocabulary/vocab_n3.toml
+
+Every note is looked up by kanji and kana in one join against the index,
+and gets:
+
+  english             if it has none, the first glosses of the entry
+  tags                if it has no part of speech tag, those of the entry
+  alternate-readings  if it has none, the entry's other readings of the kanji
+
+Changes are only printed, as `file:line: kanji (kana): change`, unless
+--apply is given. The line is the field's, or the note's `[[cards]]` header
+for a new field. Verb types and adjective group tags (i-adjective,
+na-adjective) are never filled in: they move a note into the verb or
+adjective deck, which need english-conjugated written by hand.
+"""
+
+import argparse
+from collections import OrderedDict
+
+from jmdict import Dictionary
+from library import INDEX_NAME
+from library import NoteLibrary
+from library import note_locations
+from normalize import fold_kana
+from toml_patch import TomlPatch
+
+ENGLISH = 'english'
+TAGS = 'tags'
+READINGS = 'alternate-readings'
+FIELDS = (ENGLISH, TAGS, READINGS)
+
+# Most glosses to join into a note's english
+MAX_GLOSSES = 3
+
+# Tag of each JMdict part of speech. Dumps expand the DTD entities (&n;) to
+# their descriptions, so both are listed. Parts of speech without a known
+# tag are left out, and so are adj-i and adj-na (see ADJECTIVE_GROUP_TAGS).
+POS_TAGS = {
+  'n': 'noun',
+  'noun (common) (futsuumeishi)': 'noun',
+  'pn': 'pronoun',
+  'pronoun': 'pronoun',
+  'n-adv': 'adverbial-noun',
+  'adverbial noun (fukushitekimeishi)': 'adverbial-noun',
+  'n-t': 'temporal-noun',
+  'noun (temporal) (jisoumeishi)': 'temporal-noun',
+  'n-pref': 'noun-prefix',
+  'noun, used as a prefix': 'noun-prefix',
+  'n-suf': 'noun-suffix',
+  'noun, used as a suffix': 'noun-suffix',
+  'adj-no': 'no-adjective',
+  "nouns which may take the genitive case particle 'no'": 'no-adjective',
+  'adj-pn': 'pre-noun-adjectival',
+  'pre-noun adjectival (rentaishi)': 'pre-noun-adjectival',
+  'adv': 'adverb',
+  'adverb (fukushi)': 'adverb',
+  'adv-to': 'adverb-to',
+  "adverb taking the 'to' particle": 'adverb-to',
+  'vs': 'suru-verb',
+  'noun or participle which takes the aux. verb suru': 'suru-verb',
+  'conj': 'conjunction',
+  'conjunction': 'conjunction',
+  'ctr': 'counter',
+  'counter': 'counter',
+  'exp': 'expression',
+  'expressions (phrases, clauses, etc.)': 'expression',
+  'num': 'number',
+  'numeric': 'number',
+  'prt': 'particle',
+  'particle': 'particle',
+  'pref': 'prefix',
+  'prefix': 'prefix',
+  'suf': 'suffix',
+  'suffix': 'suffix',
+}
+
+# NB: These move a note into the adjective deck, so they're never added, but
+# a note that has one already has its part of speech.
+ADJECTIVE_GROUP_TAGS = {'i-adjective', 'i-adjectives', 'na-adjective', 'na-adjectives'}
+
+PART_OF_SPEECH_TAGS = set(POS_TAGS.values()) | ADJECTIVE_GROUP_TAGS
+
+def lookup_form(word):
+  """
+  The spelling of a kanji or kana field to look up: the first alternative,
+  without ～.
+  """
+  return word.split('/')[0].replace('～', '').strip()
+
+def note_pair(note):
+  kanji = lookup_form(note.get('kanji') or note.get('kana', ''))
+  kana = lookup_form(note.get('kana') or note.get('kanji', ''))
+  return kanji, kana
+
+def best_entry(entries, kanji):
+  """
+  The entry a note most likely means: the first that spells it this way
+  first, else the first.
+  """
+  for entry in entries:
+    if entry['kanji'][:1] == [kanji]:
+      return entry
+  return entries[0]
+
+def entry_english(entry):
+  glosses = []
+  for position, sense in enumerate(entry['senses']):
+    # All of the first sense, then the first gloss of each of the others
+    for gloss in sense['glosses'] if position == 0 else sense['glosses'][:1]:
+      if gloss not in glosses:
+        glosses.append(gloss)
+  return '; '.join(glosses[:MAX_GLOSSES])
+
+def entry_tags(entry):
+  tags = []
+  for sense in entry['senses'][:1]:
+    for pos in sense['pos']:
+      tag = POS_TAGS.get(pos)
+      if tag and tag not in tags:
+        tags.append(tag)
+  return tags
+
+def entry_readings(entry, kanji, kana, forms):
+  """
+  Readings of the kanji other than the note's, in dictionary order. The
+  note's reading in the other kana (eg. ネコ for ねこ) isn't another reading.
+  """
+  readings = set(reading for spelling, reading in forms if spelling == kanji)
+  return [reading for reading in entry['readings'] \
+      if reading in readings and fold_kana(reading) != fold_kana(kana)]
+
+def propose_changes(note, entry, forms, fields=FIELDS):
+  """
+  OrderedDict of field => new value for a note.
+  """
+  changes = OrderedDict()
+  kanji, kana = note_pair(note)
+  if ENGLISH in fields and not note.get(ENGLISH):
+    english = entry_english(entry)
+    if english:
+      changes[ENGLISH] = english
+  tags = note.get(TAGS, [])
+  if TAGS in fields and 'verb-type' not in note and PART_OF_SPEECH_TAGS.isdisjoint(tags):
+    new_tags = [tag for tag in entry_tags(entry) if tag not in tags]
+    if new_tags:
+      changes[TAGS] = tags + new_tags
+  if READINGS in fields and READINGS not in note and kanji != kana:
+    readings = entry_readings(entry, kanji, kana, forms)
+    if readings:
+      changes[READINGS] = readings
+  return changes
+
+def enrich_files(dictionary, filenames, fields=FIELDS, apply=False):
+  """
+  Print the changes for the notes of each file, and write them with apply.
+  Returns (notes changed, notes not in the dictionary).
+  """
+  notes_by_file = OrderedDict()
+  for filename in filenames:
+    notes_by_file[filename] = NoteLibrary.read_notes_from_toml_file(filename)
+
+  # NB: One join for the whole library, rather than a query per note.
+  pairs = set(note_pair(note) for notes in notes_by_file.values() \
+      for note in notes[INDEX_NAME])
+  matches = dictionary.lookup_all(pairs)
+
+  entries = {}
+  changed = 0
+  missing = 0
+  for filename, notes in notes_by_file.items():
+    with open(filename, 'r') as f:
+      locations = note_locations(f.read())
+    patch = TomlPatch(filename) if apply else None
+    for position, note in enumerate(notes[INDEX_NAME]):
+      pair = note_pair(note)
+      if pair not in matches:
+        missing += 1
+        continue
+      for entry_id in matches[pair]:
+        if entry_id not in entries:
+          entries[entry_id] = (dictionary.entry(entry_id), dictionary.forms(entry_id))
+      entry, forms = entries[best_entry([entries[entry_id][0] for entry_id in matches[pair]],
+          pair[0])['id']]
+      changes = propose_changes(note, entry, forms, fields)
+      if not changes:
+        continue
+      changed += 1
+      lines = locations[position] if position < len(locations) else { '' : 1 }
+      for field, value in changes.items():
+        print(u'{}:{}: {} ({}): {} = {!r}'.format(filename, lines.get(field, lines['']),
+            note.get('kanji'), note.get('kana'), field, value))
+      if patch:
+        note.update(changes)
+        for field, value in changes.items():
+          patch.set_key(position, field, value)
+    if patch:
+      patch.write(notes[INDEX_NAME])
+  return changed, missing
+
+def main():
+  parser = argparse.ArgumentParser(description='Fill in notes from the JMdict index')
+  parser.add_argument('paths', nargs='*', help='files or directories (default: all notes)')
+  parser.add_argument('--field', dest='fields', action='append', choices=FIELDS,
+      help='only fill in this field (default: all of them)')
+  parser.add_argument('--apply', dest='apply', action='store_true',
+      help='write the changes instead of only printing them')
+  args = parser.parse_args()
+
+  dictionary = Dictionary()
+  if not len(dictionary):
+    raise Exception('The JMdict index is empty; run `python cardgen jmdict FILE` first')
+
+  if args.paths:
+    filenames = NoteLibrary.filenames_matching(paths=args.paths)
+  else:
+    filenames = NoteLibrary.note_filenames()
+  changed, missing = enrich_files(dictionary, filenames, args.fields or FIELDS, args.apply)
+  dictionary.close()
+  print('{} {} notes, {} notes not in the dictionary'.format(
+      'Changed' if args.apply else 'Would change', changed, missing))
+
+if __name__ == '__main__':
+  main()
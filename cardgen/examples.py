@@ -0,0 +1,164 @@
+"""
+Mine example sentences for notes from local text files.
+
+Text is streamed once and split into sentences, and every sentence is matched
+against the library scanner's automaton. Each note keeps a reservoir sample
+of at most k sentences, so every sentence containing the note is equally
+likely to be kept, and memory is bounded by notes x k however large the
+corpus is.
+
+Samples are cached per corpus file (by its content hash and those of the
+notes files), and merged across files in proportion to how many sentences
+each file had for the note. A file's superseded samples are removed.
+"""
+
+import os
+import random
+import re
+
+from cache import cache_path
+from cache import hash_file
+from cache import hash_strings
+from cache import load_json
+from cache import save_json
+from corpus_scan import corpus_filenames
+from corpus_scan import library_content_hash
+from corpus_scan import load_library_scanner
+from corpus_scan import read_text_chunks
+from library import NoteLibrary
+
+# Sentences kept per note
+DEFAULT_EXAMPLE_COUNT = 3
+
+# Mined when no corpus is given
+DEFAULT_CORPUS_PATHS = ['book']
+
+SENTENCE_END = re.compile('(?<=[。！？!?])|\n')
+
+# Sentences outside these lengths make poor examples.
+MIN_SENTENCE_LENGTH = 4
+MAX_SENTENCE_LENGTH = 60
+
+# Lines with latin text are markup, glosses or vocabulary lists, not sentences.
+LATIN = re.compile('[A-Za-z]')
+
+def split_sentences(chunks):
+  """
+  Sentences in a stream of text chunks. A sentence may span chunks.
+  """
+  remainder = ''
+  for chunk in chunks:
+    sentences = SENTENCE_END.split(remainder + chunk)
+    remainder = sentences.pop()
+    for sentence in sentences:
+      yield sentence.strip()
+  if remainder.strip():
+    yield remainder.strip()
+
+def is_example_sentence(sentence):
+  return MIN_SENTENCE_LENGTH <= len(sentence) <= MAX_SENTENCE_LENGTH \
+      and not LATIN.search(sentence)
+
+class Reservoir:
+  """
+  Uniform sample of at most k of the items offered to it.
+  """
+  def __init__(self, k, seen=0, samples=None):
+    self.k = k
+    self.seen = seen
+    self.samples = samples or []
+
+  def offer(self, item, rng):
+    self.seen += 1
+    if len(self.samples) < self.k:
+      self.samples.append(item)
+    else:
+      i = rng.randrange(self.seen)
+      if i < self.k:
+        self.samples[i] = item
+
+  def merge(self, other, rng):
+    """
+    Combine with a reservoir over different items, still uniformly.
+    """
+    ours = list(self.samples)
+    theirs = list(other.samples)
+    ours_seen = self.seen
+    theirs_seen = other.seen
+    samples = []
+    while len(samples) < self.k and (ours or theirs):
+      # Draw from each side in proportion to the items it stands for.
+      if ours and (not theirs or rng.random() * (ours_seen + theirs_seen) < ours_seen):
+        samples.append(ours.pop(rng.randrange(len(ours))))
+        ours_seen -= 1
+      else:
+        samples.append(theirs.pop(rng.randrange(len(theirs))))
+        theirs_seen -= 1
+    return Reservoir(self.k, self.seen + other.seen, samples)
+
+def note_key(kanji, kana):
+  return '{}\t{}'.format(kanji, kana)
+
+def sample_file(filename, scanner, k, seed):
+  """
+  { note key => Reservoir } for the sentences of one file.
+  """
+  rng = random.Random(seed)
+  reservoirs = {}
+  for sentence in split_sentences(read_text_chunks(filename, fold=False)):
+    if not is_example_sentence(sentence):
+      continue
+    note_ids = set()
+    for _, pattern_id in scanner.automaton.scan(sentence):
+      note_ids.update(scanner.pattern_notes[pattern_id])
+    for note_id in sorted(note_ids):
+      key = note_key(*scanner.notes[note_id])
+      if key not in reservoirs:
+        reservoirs[key] = Reservoir(k)
+      reservoirs[key].offer(sentence, rng)
+  return reservoirs
+
+def prune_samples(prefix, current):
+  """
+  Remove the cached samples starting with prefix, other than current.
+  """
+  directory = os.path.dirname(cache_path(current))
+  for name in os.listdir(directory):
+    if name.startswith(prefix) and name != current:
+      os.remove(os.path.join(directory, name))
+
+def load_file_samples(filename, scanner, k, library_hash):
+  """
+  sample_file(), cached by the file's contents, the library and k.
+  """
+  file_hash = hash_file(filename)
+  # NB: Named by the file, so samples of its old contents can be found.
+  prefix = 'examples_{}_'.format(hash_strings(filename))
+  cache_name = '{}{}.json'.format(prefix, hash_strings(file_hash, library_hash, str(k)))
+  cached = load_json(cache_name)
+  if cached is not None:
+    return { key : Reservoir(k, seen, samples) for key, (seen, samples) in cached.items() }
+
+  reservoirs = sample_file(filename, scanner, k, file_hash)
+  save_json(cache_name, { key : [reservoir.seen, reservoir.samples] \
+      for key, reservoir in reservoirs.items() })
+  prune_samples(prefix, cache_name)
+  return reservoirs
+
+def mine_examples(corpus_paths=DEFAULT_CORPUS_PATHS, k=DEFAULT_EXAMPLE_COUNT):
+  """
+  { (kanji, kana) => example sentences } across every corpus file.
+  """
+  scanner = load_library_scanner()
+  library_hash = library_content_hash(NoteLibrary.manifest())
+  rng = random.Random(library_hash)
+
+  reservoirs = {}
+  for filename in corpus_filenames(corpus_paths):
+    for key, reservoir in load_file_samples(filename, scanner, k, library_hash).items():
+      if key in reservoirs:
+        reservoirs[key] = reservoirs[key].merge(reservoir, rng)
+      else:
+        reservoirs[key] = reservoir
+
+  return { tuple(key.split('\t')) : reservoir.samples for key, reservoir in reservoirs.items() }
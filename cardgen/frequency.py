@@ -6,88 +6,124 @@ Determine which frequent words are missing
 
 import argparse
 import glob
-import statistics
-import string
 import sys
+from cached_property import cached_property
+from collections import OrderedDict
 
-from analysis import load_word_frequency_map
-from analysis import load_word_set
 from constants import DUPLICATE_WORDS
-from constants import HIRAGANA
 from constants import IGNORE_MISC
 from constants import IGNORE_SET
-from constants import IGNORE_SYMBOLS
-from constants import KATAKANA
 from constants import OTHER_FORMS
 from constants import PARTICLES
+from coverage import CoverageCurve
+from coverage import level_word_sets
+from coverage import print_coverage_report
+from coverage import word_mask
+from coverage import write_coverage_csv
+from frequency_index import load_frequency_index
+from frequency_scoring import CombinedScores
+from frequency_scoring import DEFAULT_METHOD
+from frequency_scoring import SCORE_METHODS
 from library import NoteLibrary
+from missing_words import COMBINED_SOURCE
+from missing_words import OUTPUT_FORMATS
+from missing_words import TEXT
+from missing_words import WordReadings
+from missing_words import is_ignored_word
+from missing_words import ranked_combined_words
+from missing_words import ranked_source_words
+from missing_words import top_missing_words
+from missing_words import write_missing_words
+from normalize import normalized_keys
+from note_filter import NoteIndex
+from sources import FREQUENCY_LISTS
+from sources import LazySources
+from sources import WORD_SETS
 
 class Reports:
-  def __init__(self):
-    self.note_library = NoteLibrary()
-    self.note_library.load_library()
-
-    # Word sets
-    # TODO: Anime 250 list: https://owlcation.com/humanities/250-anime-japanese-words-phrases
-    # TODO: 500 common verbs list: https://www.linguajunkie.com/japanese/japanese-verbs-list
-    self.vocabulary_sets = {
-      'jlpt_n5': load_word_set('lists/jlpt_n5_wiktionary.txt'),
-      'jlpt_n4': load_word_set('lists/jlpt_n4_wiktionary.txt'),
-      'jlpt_n3': load_word_set('lists/jlpt_n3_wiktionary.txt'),
-      'wanikani': load_word_set('lists/wanikani_vocab.txt'),
-    }
-
-    # Word => frequency maps
-    self.frequencies = {
-      'anime_45k': load_word_frequency_map('lists/anime_45k_relevant_words.txt'),
-      'leeds_15k' : load_word_frequency_map('lists/leeds_15k_frequency.txt'),
-      'novel_3k' : load_word_frequency_map('lists/Japanese-Word-Frequency-List-1-3000.txt'),
-      'wikipedia_10k' : load_word_frequency_map('lists/wikipedia_10k.txt'),
-    }
-
-    # Average frequency from all lists
-    self.averaged_frequency = {}
+  """
+  Every data source is loaded on first use, so each report only reads the
+  lists it needs.
+  """
+  def __init__(self, note_filter=None):
+    # Word sets, loaded individually on first access
+    self.vocabulary_sets = LazySources(WORD_SETS)
+    # Only notes matching this filter count as being in Anki (see note_filter)
+    self.note_filter = note_filter
+
+  @cached_property
+  def library_notes(self):
+    if not self.note_filter:
+      return NoteLibrary.import_all_notes()
+    filenames = NoteLibrary.filenames_matching(self.note_filter)
+    return NoteIndex(NoteLibrary.import_all_notes(filenames)).matching(self.note_filter)
+
+  @cached_property
+  def note_index(self):
+    # Tag, level and source => bitset of library notes
+    return NoteIndex(self.library_notes)
+
+  @cached_property
+  def note_library(self):
+    note_library = NoteLibrary()
+    NoteLibrary.add_notes_to_set(self.library_notes, note_library.notes)
+    return note_library
+
+  @cached_property
+  def frequency_index(self):
+    # Word => frequency in every list
+    return load_frequency_index()
+
+  @cached_property
+  def library_matches(self):
+    # Words in the frequency lists that match a note, exactly or normalized
+    index = self.frequency_index
+    return set(index.words[i] for i in index.matching_ids(self.note_library.notes))
 
   def build_ordered_frequency_list(self, list_name):
-    if list_name not in self.frequencies:
+    if list_name not in self.frequency_index.sources:
       raise Exception('List {} not in frequency sets.'.format(list_name))
-    unordered_list = []
-    for word, frequency in self.frequencies[list_name].items():
-      unordered_list.append((word, frequency))
-    #sorted_tuples = sorted(unordered_list, key=lambda tup: tup[1])
-    #return map(lambda tup: tup[0], sorted_tuples)
-    return sorted(unordered_list, key=lambda tup: tup[1])
-
-  def calculate_average_frequency(self):
-    # NB: Mathematically, this is a lie.
-    word_tally = {}
-    for frequency_map in self.frequencies.values():
-      for word, frequency in frequency_map.items():
-        if word not in word_tally:
-          word_tally[word] = []
-        word_tally[word].append(frequency)
-
-    # Unsorted (word,avg) tuples
-    averaged_frequencies = []
-    for word, frequencies in word_tally.items():
-      if word in HIRAGANA \
-          or word in KATAKANA \
-          or word in IGNORE_WORDS \
-          or word in IGNORE_SYMBOLS \
-          or word in string.ascii_letters \
-          or word in string.digits:
-        continue
-      avg = float(statistics.mean(frequencies))
-      averaged_frequencies.append((word, avg))
+    # NB: The index stores each list in rank order already.
+    return list(self.frequency_index.ordered(list_name))
 
-    sorted_frequencies = sorted(averaged_frequencies, key=lambda tup: tup[1])
+  @cached_property
+  def combined_scores(self):
+    # Word => normalized score across every frequency list
+    return CombinedScores(self.frequency_index)
 
-    for word, frequency in sorted_frequencies[0:500]:
-      print(word, frequency)
+  def print_combined_frequency(self, method=DEFAULT_METHOD, limit=500):
+    """
+    The most frequent words across every frequency list, by combined score.
+    """
+    printed = 0
+    for word, score in self.combined_scores.ordered(method):
+      if printed == limit:
+        break
+      if is_ignored_word(word):
+        continue
+      print(u'{:.5f} : {}'.format(score, word))
+      printed += 1
+
+  def missing_words(self, source, limit=None, method=DEFAULT_METHOD):
+    """
+    The `limit` most frequent (word, rank) pairs of a frequency list (or of
+    the combined score) that aren't in Anki yet.
+    """
+    if source == COMBINED_SOURCE:
+      ranked_words = ranked_combined_words(self.combined_scores, method)
+    elif source in self.frequency_index.sources:
+      ranked_words = ranked_source_words(self.frequency_index, source)
+    else:
+      raise Exception('List {} not in frequency sets.'.format(source))
+    return top_missing_words(ranked_words, self.library_matches, limit)
 
-    return word_tally
+  def print_missing_words(self, source, limit=None, output_format=TEXT,
+      method=DEFAULT_METHOD):
+    missing = self.missing_words(source, limit, method)
+    reading = WordReadings() if output_format != TEXT else None
+    write_missing_words(missing, output_format, self.vocabulary_sets, reading=reading)
 
-  def print_anime_not_in_anki(self, limit=None):
+  def print_anime_not_in_anki(self, limit=None, output_format=TEXT):
     """
     Cumulative frequency points (a steep curve with a very long tail)
       24.99% -  # 29 (number of words needed)
@@ -110,24 +146,91 @@ class Reports:
       95.00% -  # 11,275
       98.00% -  # 18,928
     """
-    word_frequencies = self.build_ordered_frequency_list('anime_45k')
-    for word, frequency in word_frequencies[0:limit]:
-      if word in IGNORE_SET:
-        continue
-      if word in self.note_library.notes:
-        continue
-      print(u'{:<5} : {}'.format(frequency, word))
+    self.print_missing_words('anime_45k', limit, output_format)
 
-  def print_set_not_in_anki(self, set_name):
+  def coverage_curves(self):
+    """
+    (curve, { level => curve }) per frequency list: the estimated share of
+    each corpus covered by the library, overall and through each JLPT level.
+    """
+    index = self.frequency_index
+    library_mask = word_mask(index, self.note_library.notes)
+    level_masks = { level : word_mask(index, words) \
+        for level, words in level_word_sets(self.library_notes).items() }
+
+    curves = []
+    for source in index.sources:
+      curve = CoverageCurve(index, source, library_mask)
+      level_curves = { level : CoverageCurve(index, source, mask) \
+          for level, mask in level_masks.items() }
+      curves.append((curve, level_curves))
+    return curves
+
+  def print_coverage(self, csv_filename=None):
+    curves = []
+    for curve, level_curves in self.coverage_curves():
+      print_coverage_report(curve, level_curves)
+      curves.append(curve)
+
+    if csv_filename:
+      write_coverage_csv(curves, csv_filename)
+      print('Wrote coverage curves to {}'.format(csv_filename))
+
+  def set_not_in_anki(self, set_name):
+    """
+    Words of a word set that aren't in Anki yet.
+    """
     if set_name not in self.vocabulary_sets:
       raise Exception('Set {} not in vocabulary sets.'.format(set_name))
+    words = []
     for word in self.vocabulary_sets[set_name]:
       if word in IGNORE_SET:
         continue
       if word in self.note_library.notes:
         continue
+      if any(key in self.note_library.notes for key in normalized_keys(word)):
+        continue
+      words.append(word)
+    return words
+
+  def print_set_not_in_anki(self, set_name):
+    for word in self.set_not_in_anki(set_name):
       print (word)
 
+  def lookup(self, word):
+    """
+    Everything known about a word: whether it's in Anki, its rank in each
+    frequency list, its combined rank and the word sets containing it.
+    """
+    keys = normalized_keys(word)
+    return OrderedDict([
+      ('word', word),
+      ('in_library', word in self.note_library.notes \
+          or any(key in self.note_library.notes for key in keys)),
+      ('scores', self.frequency_index.scores(word) \
+          or self.frequency_index.normalized_scores(keys)),
+      ('combined_rank', self.combined_scores.rank(word)),
+      ('word_sets', [name for name, word_set in self.vocabulary_sets.items() \
+          if word in word_set]),
+    ])
+
+  def count_notes(self, expressions):
+    """
+    (expression, number of library notes matching it) for each expression.
+    """
+    return [(expression, self.note_index.count(expression)) for expression in expressions]
+
+  def print_note_counts(self, expressions):
+    for expression, count in self.count_notes(expressions):
+      print(u'{:<6} : {}'.format(count, expression))
+
+  def reset(self, *names):
+    """
+    Forget cached data so it's reloaded on next use.
+    """
+    for name in names:
+      self.__dict__.pop(name, None)
+
 def main():
   import argparse
 
@@ -136,14 +239,33 @@ def main():
       help='show JLPT vocab not in Anki (n5, n4, etc.)')
   parser.add_argument('--anime', dest='anime', action='store_true',
       help='show anime vocab not in Anki (ordered by frequency)')
+  parser.add_argument('--missing', dest='missing',
+      choices=list(FREQUENCY_LISTS.keys()) + [COMBINED_SOURCE],
+      help='show the most frequent words of a list not in Anki')
+  parser.add_argument('--method', dest='method', default=DEFAULT_METHOD,
+      choices=SCORE_METHODS, help='score used by --missing combined')
+  parser.add_argument('--format', dest='format', default=TEXT, choices=OUTPUT_FORMATS,
+      help='output format of missing words (tsv can be fed to tsv_import.py)')
   parser.add_argument('--wanikani', dest='wanikani', action='store_true',
       help='show Wanikani not in Anki (ordered by frequency)')
+  parser.add_argument('--combined', dest='combined', nargs='?', const=DEFAULT_METHOD,
+      choices=SCORE_METHODS,
+      help='show the most frequent words across every list (default: {})'.format(
+        DEFAULT_METHOD))
+  parser.add_argument('--coverage', dest='coverage', action='store_true',
+      help='show how much of each frequency corpus the notes cover')
+  parser.add_argument('--coverage-csv', dest='coverage_csv', metavar='FILENAME',
+      help='also write the coverage curves to a CSV file')
   parser.add_argument('--limit', dest='limit', type=int,
-      help='limit the number of results')
+      help='limit the number of results (for missing words, the number shown)')
+  parser.add_argument('--filter', dest='filter',
+      help='only count notes matching a filter as in Anki, eg. "level:n5 | level:n4"')
+  parser.add_argument('--count', dest='count', nargs='+', default=[], metavar='FILTER',
+      help='count the notes matching each filter, eg. "tag:noun & !tag:common"')
   args = parser.parse_args()
   show_help = True
 
-  reports = Reports()
+  reports = Reports(args.filter)
 
   jlpt = {
     'n3': 'jlpt_n3',
@@ -152,13 +274,29 @@ def main():
   }
 
   if args.anime:
-    reports.print_anime_not_in_anki(args.limit)
+    reports.print_anime_not_in_anki(args.limit, args.format)
+    show_help = False
+
+  if args.coverage or args.coverage_csv:
+    reports.print_coverage(args.coverage_csv)
+    show_help = False
+
+  if args.missing:
+    reports.print_missing_words(args.missing, args.limit, args.format, args.method)
     show_help = False
 
   if args.wanikani:
     reports.print_set_not_in_anki('wanikani')
     show_help = False
 
+  if args.combined:
+    reports.print_combined_frequency(args.combined, args.limit or 500)
+    show_help = False
+
+  if args.count:
+    reports.print_note_counts(args.count)
+    show_help = False
+
   for n in args.jlpt:
     n = n.lower()
     if n in jlpt:
@@ -0,0 +1,192 @@
+"""
+Compiled index over every registered word frequency list.
+
+The rank files in lists/ are parsed and filtered once into a single cached
+index that maps each word to its rank in every source. Loading the index is
+one read of one file. It's rebuilt automatically whenever a source list (or
+the ignore list used to filter them) changes. Word set lists aren't indexed,
+but they're in the fingerprint too, so whatever is keyed on it (the report
+server's loaded word sets) reloads when they change.
+"""
+
+from array import array
+from collections import OrderedDict
+
+from analysis import load_word_frequency_map
+from cache import hash_strings
+from cache import load_pickle
+from cache import save_pickle
+from cache import stat_fingerprint
+from constants import IGNORE_SET
+from normalize import normalized_keys
+from normalize import rules_fingerprint
+from sources import FREQUENCY_LISTS
+from sources import WORD_SETS
+
+INDEX_CACHE_NAME = 'frequency_index.pickle'
+
+# Bump when the layout of the cached index changes.
+INDEX_VERSION = 2
+
+# Stored for words that aren't in a source.
+MISSING_RANK = -1
+
+class FrequencyIndex:
+  def __init__(self, sources, words, ranks, orders, key_ids):
+    """
+    `ranks` is a flat word-major array: the rank of words[i] in sources[j] is
+    ranks[i * len(sources) + j]. `orders` holds, per source, the word ids of
+    that source sorted by rank. `key_ids` maps each normalized key to the ids
+    of the words it matches.
+    """
+    self.sources = sources
+    self.words = words
+    self.ranks = ranks
+    self.orders = orders
+    self.key_ids = key_ids
+    self.word_ids = { word : i for i, word in enumerate(words) }
+    self.source_ids = { source : j for j, source in enumerate(sources) }
+
+  @staticmethod
+  def build(frequency_lists):
+    """
+    Parse every { name => path } frequency list into an index.
+    """
+    sources = list(frequency_lists.keys())
+    frequency_maps = [load_word_frequency_map(path) for path in frequency_lists.values()]
+
+    words = []
+    word_ids = {}
+    for frequency_map in frequency_maps:
+      for word in frequency_map:
+        if word not in word_ids:
+          word_ids[word] = len(words)
+          words.append(word)
+
+    ranks = array('l', [MISSING_RANK]) * (len(words) * len(sources))
+    orders = OrderedDict()
+    for j, (source, frequency_map) in enumerate(zip(sources, frequency_maps)):
+      for word, rank in frequency_map.items():
+        ranks[word_ids[word] * len(sources) + j] = rank
+      ordered = sorted(frequency_map.items(), key=lambda tup: tup[1])
+      orders[source] = array('l', [word_ids[word] for word, _ in ordered])
+
+    key_ids = {}
+    for i, word in enumerate(words):
+      for key in normalized_keys(word):
+        key_ids.setdefault(key, []).append(i)
+
+    return FrequencyIndex(sources, words, ranks, orders, key_ids)
+
+  def __contains__(self, word):
+    return word in self.word_ids
+
+  def __len__(self):
+    return len(self.words)
+
+  def rank(self, word, source):
+    """
+    The rank of a word in a source, or None.
+    """
+    i = self.word_ids.get(word)
+    if i is None:
+      return None
+    rank = self.ranks[i * len(self.sources) + self.source_ids[source]]
+    return None if rank == MISSING_RANK else rank
+
+  def scores(self, word):
+    """
+    { source => rank } for every source containing the word.
+    """
+    scores = OrderedDict()
+    i = self.word_ids.get(word)
+    if i is None:
+      return scores
+    offset = i * len(self.sources)
+    for j, source in enumerate(self.sources):
+      rank = self.ranks[offset + j]
+      if rank != MISSING_RANK:
+        scores[source] = rank
+    return scores
+
+  def normalized_scores(self, keys):
+    """
+    { source => best rank } over every word matching one of the normalized
+    keys (see normalize.normalized_keys).
+    """
+    scores = OrderedDict()
+    ids = set()
+    for key in keys:
+      ids.update(self.key_ids.get(key, ()))
+    for i in sorted(ids):
+      offset = i * len(self.sources)
+      for j, source in enumerate(self.sources):
+        rank = self.ranks[offset + j]
+        if rank != MISSING_RANK and (source not in scores or rank < scores[source]):
+          scores[source] = rank
+    return OrderedDict((source, scores[source]) for source in self.sources \
+        if source in scores)
+
+  def matching_ids(self, words):
+    """
+    Ids of the words matched by a set of words and normalized keys, such as
+    the note library's.
+    """
+    ids = set()
+    for word in words:
+      if word in self.word_ids:
+        ids.add(self.word_ids[word])
+      ids.update(self.key_ids.get(word, ()))
+    return ids
+
+  def items(self):
+    """
+    Every (word, { source => rank }) pair.
+    """
+    for word in self.words:
+      yield word, self.scores(word)
+
+  def ordered(self, source):
+    """
+    (word, rank) pairs of a source in rank order. Precomputed, so callers can
+    stop early without sorting anything.
+    """
+    j = self.source_ids[source]
+    for i in self.orders[source]:
+      yield self.words[i], self.ranks[i * len(self.sources) + j]
+
+  def frequency_map(self, source):
+    """
+    The { word => rank } map of a single source.
+    """
+    return OrderedDict(self.ordered(source))
+
+def index_fingerprint(frequency_lists):
+  word_set_paths = [source.path for source in WORD_SETS.values()]
+  return hash_strings(
+      str(INDEX_VERSION),
+      stat_fingerprint(list(frequency_lists.values()) + word_set_paths),
+      rules_fingerprint(),
+      *['{}={}'.format(name, path) for name, path in frequency_lists.items()],
+      *sorted(IGNORE_SET))
+
+def load_frequency_index(frequency_lists=FREQUENCY_LISTS):
+  """
+  Load the cached index, rebuilding it first if any source list changed.
+  """
+  fingerprint = index_fingerprint(frequency_lists)
+  cached = load_pickle(INDEX_CACHE_NAME)
+  if cached and cached['fingerprint'] == fingerprint:
+    return FrequencyIndex(cached['sources'], cached['words'], cached['ranks'], cached['orders'],
+        cached['key_ids'])
+
+  index = FrequencyIndex.build(frequency_lists)
+  save_pickle(INDEX_CACHE_NAME, {
+    'fingerprint': fingerprint,
+    'sources': index.sources,
+    'words': index.words,
+    'ranks': index.ranks,
+    'orders': index.orders,
+    'key_ids': index.key_ids,
+  })
+  return index
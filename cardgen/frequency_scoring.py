@@ -0,0 +1,116 @@
+"""
+Combined frequency scores across every frequency list.
+
+Raw ranks from lists of different lengths can't be averaged (a rank of 3,000
+is the tail of one list and the head of another), so each source's ranks are
+first normalized to percentiles: a word's position in that source divided by
+the source's length. Scores are then computed for every word at once on a
+word x source matrix, where NaN marks a word missing from a source.
+
+Lower scores mean more frequent words.
+"""
+
+import numpy as np
+from collections import OrderedDict
+
+from frequency_index import MISSING_RANK
+
+# The best percentile across sources
+MIN = 'min'
+
+# Harmonic mean of the percentiles the word has
+HARMONIC = 'harmonic'
+
+# Weighted mean of percentiles. Missing sources count as the worst percentile,
+# so that words found in a single list don't outrank words found in all of them.
+WEIGHTED = 'weighted'
+
+SCORE_METHODS = [MIN, HARMONIC, WEIGHTED]
+
+DEFAULT_METHOD = WEIGHTED
+
+class CombinedScores:
+  def __init__(self, index, weights=None):
+    """
+    `weights` maps source names to their weight in the WEIGHTED score.
+    Sources default to a weight of one.
+    """
+    self.index = index
+    weights = weights or {}
+
+    ranks = np.frombuffer(index.ranks, dtype=index.ranks.typecode)
+    ranks = ranks.reshape(len(index.words), len(index.sources))
+
+    # Percentile of each word within each source, or NaN if it's missing
+    percentiles = np.full(ranks.shape, np.nan)
+    for j, source in enumerate(index.sources):
+      order = np.frombuffer(index.orders[source], dtype=index.orders[source].typecode)
+      percentiles[order, j] = (np.arange(len(order)) + 1) / len(order)
+    self.percentiles = percentiles
+
+    present = ranks != MISSING_RANK
+    present_count = present.sum(axis=1)
+
+    source_weights = np.array([weights.get(source, 1.0) for source in index.sources])
+    filled = np.where(present, percentiles, 1.0)
+
+    self.scores = OrderedDict()
+    with np.errstate(divide='ignore', invalid='ignore'):
+      self.scores[MIN] = np.nanmin(percentiles, axis=1)
+      self.scores[HARMONIC] = present_count / np.nansum(1.0 / percentiles, axis=1)
+      self.scores[WEIGHTED] = (filled * source_weights).sum(axis=1) / source_weights.sum()
+
+    self._orders = {}
+    self._positions = {}
+
+  def score(self, word, method=DEFAULT_METHOD):
+    """
+    A word's combined score, or None if it isn't in any list.
+    """
+    i = self.index.word_ids.get(word)
+    if i is None:
+      return None
+    return float(self.scores[method][i])
+
+  def order(self, method=DEFAULT_METHOD):
+    """
+    Word ids sorted from most to least frequent. Computed once per method.
+    """
+    if method not in self._orders:
+      self._orders[method] = np.argsort(self.scores[method], kind='stable')
+    return self._orders[method]
+
+  def head(self, count, method=DEFAULT_METHOD):
+    """
+    Word ids of the `count` most frequent words, in the same order as order().
+    Selects with a partition instead of sorting every word.
+    """
+    scores = self.scores[method]
+    if method in self._orders or count >= len(scores):
+      return self.order(method)[:count]
+    threshold = scores[np.argpartition(scores, count - 1)[count - 1]]
+    # NB: Take every word tied at the threshold so the stable order matches.
+    ids = np.flatnonzero(scores <= threshold)
+    ids = ids[np.lexsort((ids, scores[ids]))]
+    return ids[:count]
+
+  def rank(self, word, method=DEFAULT_METHOD):
+    """
+    A word's 1-based position in the combined ordering, or None.
+    """
+    i = self.index.word_ids.get(word)
+    if i is None:
+      return None
+    if method not in self._positions:
+      positions = np.empty(len(self.index.words), dtype=np.int64)
+      positions[self.order(method)] = np.arange(1, len(self.index.words) + 1)
+      self._positions[method] = positions
+    return int(self._positions[method][i])
+
+  def ordered(self, method=DEFAULT_METHOD):
+    """
+    (word, score) pairs from most to least frequent.
+    """
+    scores = self.scores[method]
+    for i in self.order(method):
+      yield self.index.words[i], float(scores[i])
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+"""
+Generate Anki deck for adjective conjugations.
+
+Only adjectives with an english-conjugated table (eg. { base = 'quiet',
+adverb = 'quietly' }) are in the deck. Their English isn't made up from
+the english summary, which gives cards like "is danger" for 危険.
+
+With --verbs, the verb conjugation deck is built from the same pass over the
+library.
+"""
+
+import genanki
+import sys
+from argparse import ArgumentParser
+from collections import OrderedDict
+
+from gloss import ADJECTIVE_GLOSSES
+from inflection import CARD_CSS
+from inflection import Conjugation as BaseConjugation
+from inflection import EndingTable
+from inflection import load_model_definition
+from library import NoteLibrary
+
+OUTPUT_FILENAME = 'adjective_card_deck_output.apkg'
+
+I_ADJECTIVE = 'i-adjective'
+NA_ADJECTIVE = 'na-adjective'
+
+# Tags (as used in the vocabulary) that mark each adjective group
+ADJECTIVE_GROUP_TAGS = {
+  'i-adjective': I_ADJECTIVE,
+  'i-adjectives': I_ADJECTIVE,
+  'na-adjective': NA_ADJECTIVE,
+  'na-adjectives': NA_ADJECTIVE,
+}
+
+def adjective_group(note):
+  """
+  The adjective group of a note, or None if it isn't a conjugatable adjective.
+  """
+  for tag in note.get('tags', []):
+    group = ADJECTIVE_GROUP_TAGS.get(tag)
+    if group == I_ADJECTIVE and not note['kana'].endswith('い'):
+      continue
+    if group:
+      return group
+  return None
+
+def has_english_conjugated(note):
+  """
+  Whether a note has every English field the adjective glosses use.
+  """
+  english = note.get('english-conjugated', {})
+  return all(str(english.get(key, '')).strip() for key in ADJECTIVE_GLOSSES.keys())
+
+def partition_notes(notes):
+  """
+  Split library notes into {kanji => note} maps of verbs and adjectives.
+  """
+  verbs = OrderedDict()
+  adjectives = OrderedDict()
+  for note in notes:
+    if 'disabled' in note and note['disabled']:
+      continue
+    # NB: Keyed by kanji, so later duplicates replace earlier ones.
+    if 'verb-type' in note:
+      verbs[note['kanji']] = note
+    elif adjective_group(note):
+      adjectives[note['kanji']] = note
+  return verbs, adjectives
+
+class Adjective:
+  # Irregular i-adjectives conjugate from another dictionary form.
+  # eg. いい -> よくない, かっこいい -> かっこよくない
+  IRREGULAR_I_ENDINGS = EndingTable({
+    'っこいい' : 'っこよい',
+    '好いい' : '好よい',
+  })
+
+  IRREGULAR_I_WORDS = {
+    'いい' : 'よい',
+  }
+
+  I_STEM = EndingTable({
+    'い' : '',
+  })
+
+  # (form, polite, positive) -> (i-adjective suffix, na-adjective suffix)
+  # Suffixes are attached to the stem: 高い -> 高, 静か -> 静か
+  SUFFIXES = {
+    ('present', False, True) : ('い', 'だ'),
+    ('present', True, True) : ('いです', 'です'),
+    ('present', False, False) : ('くない', 'じゃない'),
+    ('present', True, False) : ('くないです', 'じゃありません'),
+    ('past', False, True) : ('かった', 'だった'),
+    ('past', True, True) : ('かったです', 'でした'),
+    ('past', False, False) : ('くなかった', 'じゃなかった'),
+    ('past', True, False) : ('くなかったです', 'じゃありませんでした'),
+    ('te_form', False, True) : ('くて', 'で'),
+    ('te_form', False, False) : ('くなくて', 'じゃなくて'),
+    ('adverbial', False, True) : ('く', 'に'),
+    ('conditional', False, True) : ('ければ', 'なら'),
+    ('conditional', False, False) : ('くなければ', 'じゃなければ'),
+  }
+
+  def __init__(self, adjective_dict, group=None):
+    self.level = adjective_dict['level'] if 'level' in adjective_dict else ''
+    self.group = group or adjective_group(adjective_dict)
+    self.kanji = adjective_dict['kanji']
+    self.kana = adjective_dict['kana']
+
+    self.english_summary = adjective_dict['english']
+
+    if not has_english_conjugated(adjective_dict):
+      raise Exception("Adjective {} needs 'english-conjugated' with {}".format(
+          self.kanji, ', '.join(ADJECTIVE_GLOSSES.keys())))
+    self.english = dict(adjective_dict['english-conjugated'])
+
+    # (form, positive) -> English gloss
+    self._glosses = {}
+
+  def present(self, polite=False, positive=False, kanji=False):
+    """
+    Return the adjective in Present form.
+    Means "Is [Adjective]" or "Isn't [Adjective]"
+    """
+    return self._inflect('present', polite, positive, kanji)
+
+  def english_present(self, positive=False):
+    return self._gloss('present', positive)
+
+  def past(self, polite=False, positive=False, kanji=False):
+    """
+    Return the adjective in Past form.
+    Means "Was [Adjective]" or "Wasn't [Adjective]"
+    """
+    return self._inflect('past', polite, positive, kanji)
+
+  def english_past(self, positive=False):
+    return self._gloss('past', positive)
+
+  def te_form(self, positive=False, kanji=False):
+    """
+    Return the adjective in Te form, used to join clauses.
+    Means "Is [Adjective] and..." or "Isn't [Adjective] and..."
+    """
+    return self._inflect('te_form', False, positive, kanji)
+
+  def english_te_form(self, positive=False):
+    return self._gloss('te_form', positive)
+
+  def adverbial(self, kanji=False):
+    """
+    Return the adjective in Adverbial form.
+    Means "[Adjective]ly". There is no negative.
+    """
+    return self._inflect('adverbial', False, True, kanji)
+
+  def english_adverbial(self):
+    return self._gloss('adverbial')
+
+  def conditional(self, positive=False, kanji=False):
+    """
+    Return the adjective in Conditional form.
+    Means "If [Adjective]" or "If Not [Adjective]"
+    """
+    return self._inflect('conditional', False, positive, kanji)
+
+  def english_conditional(self, positive=False):
+    return self._gloss('conditional', positive)
+
+  def _inflect(self, form, polite, positive, kanji):
+    word = self.kanji if kanji else self.kana
+    if self.group == I_ADJECTIVE:
+      if form == 'present' and positive:
+        # NB: The dictionary form is kept as-is, even for irregulars (いい).
+        return word + 'です' if polite else word
+      suffix = Adjective.SUFFIXES[(form, polite, positive)][0]
+      return self._i_stem(word) + suffix
+    else:
+      suffix = Adjective.SUFFIXES[(form, polite, positive)][1]
+      return word + suffix
+
+  def _i_stem(self, word):
+    if word in Adjective.IRREGULAR_I_WORDS:
+      word = Adjective.IRREGULAR_I_WORDS[word]
+    else:
+      word = Adjective.IRREGULAR_I_ENDINGS.inflect(word) or word
+    return Adjective.I_STEM.inflect(word)
+
+  def _gloss(self, form, positive=True):
+    key = (form, positive)
+    if key not in self._glosses:
+      self._glosses[key] = ADJECTIVE_GLOSSES.gloss(form, self.english, positive)
+    return self._glosses[key]
+
+class Conjugation(BaseConjugation):
+  word_class = Adjective
+
+# NB: DO NOT CHANGE THE ORDER. APPEND ONLY.
+# The ordering here directly maps to field numberings.
+CONJUGATIONS = [
+  Conjugation('Present', Adjective.present, Adjective.english_present),
+  Conjugation('Past', Adjective.past, Adjective.english_past),
+  Conjugation('Te Form', Adjective.te_form, Adjective.english_te_form, has_polite=False),
+  Conjugation('Adverbial', Adjective.adverbial, Adjective.english_adverbial,
+      has_negative=False, has_polite=False),
+  Conjugation('Conditional', Adjective.conditional, Adjective.english_conditional,
+      has_polite=False),
+]
+
+# use random.randrange(1 << 30, 1 << 31) to generate a suitable model_id,
+# and hardcode it into your Model definition.
+
+ADJECTIVE_CARD_DECK = genanki.Deck(
+  2000003000, # XXX: DO NOT CHANGE
+  'Generated Japanese Adjective Conjugation') # XXX: DO NOT CHANGE
+
+# NB: Make changes to the Anki deck model fields using the
+# Anki interface first, or imports won't work as expected.
+BASE_MODEL_FIELDS = [
+  {'name': 'base_kanji'},
+  {'name': 'base_kana'},
+  {'name': 'base_english'},
+  {'name': 'group'},
+  {'name': 'level'},
+]
+
+# Generated fields and templates are cached here, keyed by a hash of CONJUGATIONS.
+MODEL_CACHE_NAME = 'adjective_card_model.json'
+
+# Field and template names of the model as committed. Anki numbers fields and
+# cards by position, so the model may only grow at the end.
+MODEL_SNAPSHOT_FILENAME = 'config/adjective-card-model.json'
+
+_adjective_card_model = None
+
+def adjective_card_model(update_snapshot=False):
+  """
+  The adjective conjugation Anki model. Built lazily on first use, and only
+  then is the committed snapshot updated if `update_snapshot` is given.
+  """
+  global _adjective_card_model
+  if _adjective_card_model:
+    return _adjective_card_model
+
+  definition = load_model_definition(MODEL_CACHE_NAME, MODEL_SNAPSHOT_FILENAME,
+      BASE_MODEL_FIELDS, CONJUGATIONS, update_snapshot)
+
+  _adjective_card_model = genanki.Model(
+    # XXX: DO NOT CHANGE
+    2000003001,
+
+    # The name of the model can change.
+    'Generated Japanese Adjective Conjugation Model',
+
+    # NB: Make changes to the Anki deck model fields using the
+    # Anki interface first, or imports won't work as expected.
+    fields=definition['fields'],
+
+    # NB: Add or remove templates (with the same names) using the
+    # Anki interface first, or imports won't work as expected.
+    templates=definition['templates'],
+
+    css=CARD_CSS)
+
+  return _adjective_card_model
+
+def note_fields(adjective):
+  """
+  Every field of an adjective's note, in model order.
+  """
+  # NB: Must match order of model.
+  fields = [
+    adjective.kanji,
+    adjective.kana,
+    adjective.english_summary,
+    adjective.group,
+    adjective.level,
+  ]
+
+  for conjugation in CONJUGATIONS:
+    fields.extend(conjugation.map_fields(adjective))
+
+  return fields
+
+class Note(genanki.Note):
+  def __init__(self, adjective):
+    self.kanji = adjective.kanji
+    self.kana = adjective.kana
+    self.group = adjective.group
+    self.tags = ['adjective', adjective.group]
+
+    super().__init__(model=adjective_card_model(),
+        fields=note_fields(adjective),
+        sort_field=self.kana,
+        tags=self.tags,
+        guid=None)
+
+  @property
+  def guid(self):
+    # These can actually match across decks and models, so be careful! If you use the
+    # same guid for notes in another model/deck, you'll confuse Anki on import.
+    return genanki.guid_for('adjective_conjugation', self.kanji, self.kana, self.group)
+
+def main(with_verbs=False, update_snapshot=False):
+  adjective_card_model(update_snapshot)
+  # One pass over the library feeds both decks.
+  verbs, adjectives = partition_notes(NoteLibrary.import_all_notes())
+
+  added = 0
+  for adjective_dict in adjectives.values():
+    if has_english_conjugated(adjective_dict):
+      ADJECTIVE_CARD_DECK.add_note(Note(Adjective(adjective_dict)))
+      added += 1
+
+  genanki.Package(ADJECTIVE_CARD_DECK).write_to_file(OUTPUT_FILENAME)
+  print('Adjective notes: {0} ({1}), skipped {2} without english-conjugated'.format(
+      added, OUTPUT_FILENAME, len(adjectives) - added))
+
+  if with_verbs:
+    import generate_verb_deck
+    count = generate_verb_deck.main(verbs=list(verbs.values()), update_snapshot=update_snapshot)
+    print('Verb notes: {0} ({1})'.format(count, generate_verb_deck.OUTPUT_FILENAME))
+
+if __name__ == '__main__':
+  parser = ArgumentParser()
+  parser.add_argument('--test', help='run the unit tests', action="store_true")
+  parser.add_argument('--verbs', help='also build the verb deck from the same pass',
+      action="store_true")
+  parser.add_argument('--update-model-snapshot', dest='update_snapshot', action="store_true",
+      help='write new fields and templates to the committed model snapshots')
+  args = parser.parse_args()
+
+  if args.test:
+    from generate_adjective_deck_tests import *
+
+    sys.argv.remove('--test') # passed to unittest module and blows up
+    unittest.main()
+  else:
+    main(with_verbs=args.verbs, update_snapshot=args.update_snapshot)
@@ -0,0 +1,195 @@
+import unittest
+
+from generate_adjective_deck import Adjective
+from generate_adjective_deck import BASE_MODEL_FIELDS
+from generate_adjective_deck import CONJUGATIONS
+from generate_adjective_deck import I_ADJECTIVE
+from generate_adjective_deck import MODEL_SNAPSHOT_FILENAME
+from generate_adjective_deck import NA_ADJECTIVE
+from generate_adjective_deck import adjective_group
+from generate_adjective_deck import has_english_conjugated
+from generate_adjective_deck import note_fields
+from generate_adjective_deck import partition_notes
+from inflection import build_model_definition
+from inflection import load_model_snapshot
+from library import NoteLibrary
+
+ADJECTIVES = {
+  '高い': Adjective({
+    'kanji': '高い',
+    'kana': 'たかい',
+    'english': 'tall; high; expensive',
+    'english-conjugated': { 'base': 'tall', 'adverb': 'highly' },
+    'level': 'n5',
+    'tags': ['i-adjective'],
+  }),
+  'いい': Adjective({
+    'kanji': 'いい',
+    'kana': 'いい',
+    'english': 'good',
+    'english-conjugated': { 'base': 'good', 'adverb': 'well' },
+    'tags': ['i-adjectives'],
+  }),
+  '格好いい': Adjective({
+    'kanji': '格好いい',
+    'kana': 'かっこいい',
+    'english': 'cool (looking)',
+    'english-conjugated': { 'base': 'cool', 'adverb': 'coolly' },
+    'tags': ['i-adjective'],
+  }),
+  '可愛い': Adjective({
+    'kanji': '可愛い',
+    'kana': 'かわいい',
+    'english': 'cute',
+    'english-conjugated': { 'base': 'cute', 'adverb': 'cutely' },
+    'tags': ['i-adjective'],
+  }),
+  '静か': Adjective({
+    'kanji': '静か',
+    'kana': 'しずか',
+    'english': 'quiet',
+    'english-conjugated': { 'base': 'quiet', 'adverb': 'quietly' },
+    'tags': ['na-adjective'],
+  }),
+  '簡単': Adjective({
+    'kanji': '簡単',
+    'kana': 'かんたん',
+    'english': 'simple; easy',
+    'english-conjugated': { 'base': 'simple', 'adverb': 'simply' },
+    'tags': ['na-adjective'],
+  }),
+}
+
+class TestJapaneseAdjectiveConjugation(unittest.TestCase):
+
+  def test_present(self):
+    def a(adjective, polite, positive, kanji):
+      return ADJECTIVES[adjective].present(polite, positive, kanji)
+    # Polite
+    self.assertEqual(a('高い', True, True, True), '高いです')
+    self.assertEqual(a('高い', True, False, False), 'たかくないです')
+    self.assertEqual(a('静か', True, True, True), '静かです')
+    self.assertEqual(a('静か', True, False, False), 'しずかじゃありません')
+    # Plain
+    self.assertEqual(a('高い', False, True, True), '高い')
+    self.assertEqual(a('高い', False, False, True), '高くない')
+    self.assertEqual(a('静か', False, True, True), '静かだ')
+    self.assertEqual(a('静か', False, False, False), 'しずかじゃない')
+
+  def test_past(self):
+    def a(adjective, polite, positive, kanji):
+      return ADJECTIVES[adjective].past(polite, positive, kanji)
+    self.assertEqual(a('高い', False, True, True), '高かった')
+    self.assertEqual(a('高い', False, False, False), 'たかくなかった')
+    self.assertEqual(a('高い', True, True, True), '高かったです')
+    self.assertEqual(a('静か', False, True, True), '静かだった')
+    self.assertEqual(a('静か', False, False, True), '静かじゃなかった')
+    self.assertEqual(a('静か', True, True, False), 'しずかでした')
+    self.assertEqual(a('静か', True, False, False), 'しずかじゃありませんでした')
+
+  def test_te_form(self):
+    def a(adjective, positive, kanji):
+      return ADJECTIVES[adjective].te_form(positive, kanji)
+    self.assertEqual(a('高い', True, True), '高くて')
+    self.assertEqual(a('高い', False, False), 'たかくなくて')
+    self.assertEqual(a('静か', True, True), '静かで')
+    self.assertEqual(a('静か', False, False), 'しずかじゃなくて')
+
+  def test_adverbial(self):
+    def a(adjective, kanji):
+      return ADJECTIVES[adjective].adverbial(kanji)
+    self.assertEqual(a('高い', True), '高く')
+    self.assertEqual(a('静か', False), 'しずかに')
+
+  def test_conditional(self):
+    def a(adjective, positive, kanji):
+      return ADJECTIVES[adjective].conditional(positive, kanji)
+    self.assertEqual(a('高い', True, True), '高ければ')
+    self.assertEqual(a('高い', False, False), 'たかくなければ')
+    self.assertEqual(a('静か', True, True), '静かなら')
+    self.assertEqual(a('静か', False, False), 'しずかじゃなければ')
+
+  def test_irregular(self):
+    self.assertEqual(ADJECTIVES['いい'].present(False, True, False), 'いい')
+    self.assertEqual(ADJECTIVES['いい'].present(False, False, False), 'よくない')
+    self.assertEqual(ADJECTIVES['いい'].past(False, True, False), 'よかった')
+    self.assertEqual(ADJECTIVES['格好いい'].past(False, False, True), '格好よくなかった')
+    self.assertEqual(ADJECTIVES['格好いい'].te_form(True, False), 'かっこよくて')
+    # Not irregular, despite ending in いい
+    self.assertEqual(ADJECTIVES['可愛い'].present(False, False, False), 'かわいくない')
+
+class TestEnglishAdjectiveConjugation(unittest.TestCase):
+
+  def test_english(self):
+    tall = ADJECTIVES['高い']
+    self.assertEqual(tall.english_present(True), 'is tall')
+    self.assertEqual(tall.english_present(False), 'isn\'t tall')
+    self.assertEqual(tall.english_past(False), 'wasn\'t tall')
+    self.assertEqual(tall.english_te_form(True), 'is tall and...')
+    self.assertEqual(tall.english_conditional(False), 'if not tall')
+
+  def test_adverbs(self):
+    self.assertEqual(ADJECTIVES['静か'].english_adverbial(), 'quietly')
+    self.assertEqual(ADJECTIVES['簡単'].english_adverbial(), 'simply')
+
+  def test_english_is_never_made_up(self):
+    danger = {'kanji': '危険', 'kana': 'きけん', 'english': 'danger; peril',
+        'tags': ['na-adjective']}
+    self.assertFalse(has_english_conjugated(danger))
+    with self.assertRaises(Exception):
+      Adjective(danger)
+    danger['english-conjugated'] = { 'base': 'dangerous' }
+    self.assertFalse(has_english_conjugated(danger))
+
+class TestAdjectiveDeck(unittest.TestCase):
+
+  def test_adjective_group(self):
+    self.assertEqual(adjective_group({'kana': 'たかい', 'tags': ['i-adjectives']}), I_ADJECTIVE)
+    self.assertEqual(adjective_group({'kana': 'しずか', 'tags': ['na-adjective']}), NA_ADJECTIVE)
+    self.assertIsNone(adjective_group({'kana': 'いろいろ', 'tags': ['i-adjective']}))
+    self.assertIsNone(adjective_group({'kana': 'ねこ', 'tags': ['noun']}))
+
+  def test_partition_notes(self):
+    verbs, adjectives = partition_notes([
+      {'kanji': '会う', 'kana': 'あう', 'verb-type': 'godan-u'},
+      {'kanji': '高い', 'kana': 'たかい', 'tags': ['i-adjective']},
+      {'kanji': '猫', 'kana': 'ねこ', 'tags': ['noun']},
+      {'kanji': '静か', 'kana': 'しずか', 'tags': ['na-adjective'], 'disabled': True},
+    ])
+    self.assertListEqual(list(verbs.keys()), ['会う'])
+    self.assertListEqual(list(adjectives.keys()), ['高い'])
+
+  def test_extends_committed_snapshot(self):
+    snapshot = load_model_snapshot(MODEL_SNAPSHOT_FILENAME)
+    definition = build_model_definition(BASE_MODEL_FIELDS, CONJUGATIONS)
+    for kind in ('fields', 'templates'):
+      names = [item['name'] for item in definition[kind]]
+      self.assertListEqual(names[:len(snapshot[kind])], snapshot[kind])
+
+  def test_field_count_matches_model(self):
+    fields = build_model_definition(BASE_MODEL_FIELDS, CONJUGATIONS)['fields']
+    for adjective in ADJECTIVES.values():
+      values = note_fields(adjective)
+      self.assertEqual(len(values), len(fields))
+      for value in values:
+        self.assertIsInstance(value, str)
+
+class TestLibraryAdjectives(unittest.TestCase):
+
+  def test_library_adjectives_build(self):
+    _, adjectives = partition_notes(NoteLibrary.import_all_notes())
+    fields = build_model_definition(BASE_MODEL_FIELDS, CONJUGATIONS)['fields']
+    names = [field['name'] for field in fields]
+    for adjective_dict in adjectives.values():
+      if not has_english_conjugated(adjective_dict):
+        continue
+      values = dict(zip(names, note_fields(Adjective(adjective_dict))))
+      english = adjective_dict['english-conjugated']
+      for name, value in values.items():
+        if '_english_' in name:
+          self.assertTrue(value, name)
+      self.assertEqual(values['adverbial_english_positive'], english['adverb'])
+      self.assertEqual(values['present_english_positive'], 'is ' + english['base'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -6,7 +6,8 @@ Generate Anki deck for verb conjugations.
 
 import genanki
 import glob
-import re
+import multiprocessing
+import os
 import sys
 import toml
 from argparse import ArgumentParser
@@ -14,6 +15,13 @@ from collections import OrderedDict
 from toml.decoder import TomlDecoder
 from toml.encoder import TomlEncoder
 
+from gloss import VERB_GLOSSES
+from inflection import CARD_CSS
+from inflection import Conjugation as BaseConjugation
+from inflection import EndingTable
+from inflection import load_model_definition
+from inflection import replace_ending
+
 OUTPUT_FILENAME = 'verb_card_deck_output.apkg'
 
 def read_verbs():
@@ -35,12 +43,17 @@ def read_verbs():
       all_notes.append(n)
   return all_notes
 
-verbs = read_verbs()
+def verbs_by_kanji(verbs):
+  """
+  { kanji => verb note } of verb notes.
+  """
+  # NB: Keyed by kanji, so later duplicates replace earlier ones.
+  return { verb['kanji'] : verb for verb in verbs }
 
 class Verb:
   # Godan Ending -> Masu Stem
   # 'u' -> 'i' sound
-  GODAN_TO_MASU_STEM = {
+  GODAN_TO_MASU_STEM = EndingTable({
     'う' : 'い',
     'く' : 'き',
     'ぐ' : 'ぎ',
@@ -50,11 +63,11 @@ class Verb:
     'ぶ' : 'び',
     'む' : 'み',
     'る' : 'り',
-  }
+  })
 
   # 'u' -> 'a' sound
   # Used for present indicative plain negative
-  GODAN_TO_NAI = {
+  GODAN_TO_NAI = EndingTable({
     'う' : 'わ', # exception!
     'く' : 'か',
     'ぐ' : 'が',
@@ -64,9 +77,9 @@ class Verb:
     'ぶ' : 'ば',
     'む' : 'ま',
     'る' : 'ら', # godan-ru, not ichidan!
-  }
+  })
 
-  GODAN_TO_TE = {
+  GODAN_TO_TE = EndingTable({
     'う' : 'って',
     'く' : 'いて',
     'ぐ' : 'いで',
@@ -76,9 +89,9 @@ class Verb:
     'ぶ' : 'んで',
     'む' : 'んで',
     'る' : 'って', # godan-ru, not ichidan!
-  }
+  })
 
-  GODAN_TO_TA = {
+  GODAN_TO_TA = EndingTable({
     'う' : 'った',
     'く' : 'いた',
     'ぐ' : 'いだ', # what
@@ -88,9 +101,9 @@ class Verb:
     'ぶ' : 'んだ',
     'む' : 'んだ',
     'る' : 'った', # godan-ru, not ichidan!
-  }
+  })
 
-  GODAN_TO_PLAIN_VOLITIONAL = {
+  GODAN_TO_PLAIN_VOLITIONAL = EndingTable({
     'う' : 'おう',
     'く' : 'こう',
     'ぐ' : 'ごう',
@@ -100,11 +113,11 @@ class Verb:
     'ぶ' : 'ぼう',
     'む' : 'もう',
     'る' : 'ろう', # godan-ru, not ichidan!
-  }
+  })
 
   # NB/NOTE: The 'ru' here is 'godan-ru', not 'ichidan'!
   # In the case of provisional verbs, it does not matter.
-  ENDING_U_TO_E = {
+  ENDING_U_TO_E = EndingTable({
     'う' : 'え',
     'く' : 'け',
     'ぐ' : 'げ',
@@ -114,10 +127,10 @@ class Verb:
     'ぶ' : 'べ',
     'む' : 'め',
     'る' : 'れ', # godan-ru
-  }
+  })
 
   def __init__(self, verb_dict):
-    self.level = verb_dict['level'] if 'level' in verb_dict else None
+    self.level = verb_dict['level'] if 'level' in verb_dict else ''
     self.group = verb_dict['verb-type']
     self.kanji = verb_dict['kanji']
     self.kana = verb_dict['kana']
@@ -130,6 +143,9 @@ class Verb:
 
     self.english = english
 
+    # (form, positive) -> English gloss
+    self._glosses = {}
+
   def present_indicative(self, polite=False, positive=False, kanji=False):
     """
     Return the verb in Present Indicative form.
@@ -147,10 +163,7 @@ class Verb:
         return self._nai(kanji=kanji)
 
   def english_present_indicative(self, positive=False):
-    if positive:
-      return 'will ' + self.english['base']
-    else:
-      return 'won\'t ' + self.english['base']
+    return self._gloss('present_indicative', positive)
 
   def presumptive(self, polite=False, positive=False, kanji=False):
     """
@@ -162,10 +175,7 @@ class Verb:
     return verb + suffix
 
   def english_presumptive(self, positive=False):
-    if positive:
-      return 'will probably ' + self.english['base']
-    else:
-      return 'probably won\'t ' + self.english['base']
+    return self._gloss('presumptive', positive)
 
   def volitional(self, polite=False, kanji=False):
     """
@@ -174,17 +184,15 @@ class Verb:
     """
     verb = self.present_indicative(positive=True, polite=polite, kanji=kanji)
     if polite:
-      return re.sub('ます$', 'ましょう', verb)
+      return replace_ending(verb, 'ます', 'ましょう')
     else:
       if self.group == 'ichidan':
-        return re.sub('る$', 'よう', verb)
+        return replace_ending(verb, 'る', 'よう')
       else:
-        for godan_end, ending in Verb.GODAN_TO_PLAIN_VOLITIONAL.items():
-          if verb.endswith(godan_end):
-            return re.sub(godan_end + '$', ending, verb)
+        return Verb.GODAN_TO_PLAIN_VOLITIONAL.inflect(verb)
 
   def english_volitional(self):
-    return 'let\'s ' + self.english['base']
+    return self._gloss('volitional')
 
   def imperative(self, polite=False, positive=False, kanji=False):
     """
@@ -203,20 +211,15 @@ class Verb:
       if positive:
         verb = self.present_indicative(polite=polite, positive=positive, kanji=kanji)
         if self.group == 'ichidan':
-          return re.sub('る$', 'ろ', verb)
+          return replace_ending(verb, 'る', 'ろ')
         else:
-          for godan_end, ending in Verb.ENDING_U_TO_E.items():
-            if verb.endswith(godan_end):
-              return re.sub(godan_end + '$', ending, verb)
+          return Verb.ENDING_U_TO_E.inflect(verb)
       else:
         dictionary = self.kanji if kanji else self.kana
         return dictionary + 'な'
 
   def english_imperative(self, positive=False):
-    if positive:
-      return 'do {}!'.format(self.english['base'])
-    else:
-      return 'don\'t {}!'.format(self.english['base'])
+    return self._gloss('imperative', positive)
 
   def past_indicative(self, polite=False, positive=False, kanji=False):
     """
@@ -226,7 +229,7 @@ class Verb:
     if polite:
       verb = self.present_indicative(polite=True, positive=positive, kanji=kanji)
       if positive:
-        return re.sub('ます$', 'ました', verb)
+        return replace_ending(verb, 'ます', 'ました')
       else:
         return verb + 'でした'
     else:
@@ -234,16 +237,10 @@ class Verb:
         return self._ta(kanji=kanji)
       else:
         verb = self.present_indicative(positive=False, polite=False, kanji=kanji)
-        return re.sub('い$', 'かった', verb)
+        return replace_ending(verb, 'い', 'かった')
 
   def english_past_indicative(self, positive=False):
-    if positive:
-      return self.english['past']
-    else:
-      past = 'didn\'t {}'.format(self.english['base'])
-      # fix bad grammar
-      past = re.sub("didn't be\\b", "wasn't", past)
-      return past
+    return self._gloss('past_indicative', positive)
 
   def past_presumptive(self, polite=False, positive=False, kanji=False):
     """
@@ -255,14 +252,7 @@ class Verb:
     return verb + suffix
 
   def english_past_presumptive(self, positive=False):
-    if positive:
-      past = 'probably {}'.format(self.english['past'])
-      past = re.sub('probably was\\b', 'was probably', past) # better wording
-      return past
-    else:
-      past = 'probably didn\'t {}'.format(self.english['base'])
-      past = re.sub('didn\'t be\\b', 'wasn\'t', past) # fix bad grammar
-      return past
+    return self._gloss('past_presumptive', positive)
 
   def present_progressive(self, polite=False, positive=False, kanji=False):
     """
@@ -277,10 +267,7 @@ class Verb:
     return te_form_base + suffix
 
   def english_present_progressive(self, positive=False):
-    if positive:
-      return self.english['continuous']
-    else:
-      return 'not {}'.format(self.english['continuous'])
+    return self._gloss('present_progressive', positive)
 
   def past_progressive(self, polite=False, positive=False, kanji=False):
     """
@@ -295,10 +282,7 @@ class Verb:
     return te_form_base + suffix
 
   def english_past_progressive(self, positive=False):
-    if positive:
-      return 'was {}'.format(self.english['continuous'])
-    else:
-      return 'wasn\'t {}'.format(self.english['continuous'])
+    return self._gloss('past_progressive', positive)
 
   def provisional(self, positive=False, kanji=False):
     """
@@ -307,22 +291,15 @@ class Verb:
     """
     if positive:
       verb = self.kanji if kanji else self.kana
-      for before, after in Verb.ENDING_U_TO_E.items():
-        if verb.endswith(before):
-          base = re.sub(before + '$', after, verb)
-          return base + 'ば'
+      base = Verb.ENDING_U_TO_E.inflect(verb)
+      if base:
+        return base + 'ば'
     else:
       verb = self.present_indicative(polite=False, positive=False, kanji=kanji)
-      return re.sub('い$', 'ければ', verb)
+      return replace_ending(verb, 'い', 'ければ')
 
   def english_provisional(self, positive=False):
-    # NB: Currently the same as english_conditional
-    if positive:
-      provisional = 'if one {}'.format(self.english['plural'])
-      return re.sub('one are\\b', 'one is', provisional) # fix bad grammar
-    else:
-      provisional = 'if one doesn\'t {}'.format(self.english['base'])
-      return re.sub('doesn\'t be\\b', 'isn\'t', provisional) # fix bad grammar
+    return self._gloss('provisional', positive)
 
   def conditional(self, polite=False, positive=False, kanji=False):
     """
@@ -333,13 +310,7 @@ class Verb:
     return base + 'ら'
 
   def english_conditional(self, positive=False):
-    # NB: Currently the same as english_provisional
-    if positive:
-      conditional= 'if one {}'.format(self.english['plural'])
-      return re.sub('one are\\b', 'one is', conditional) # fix bad grammar
-    else:
-      conditional = 'if one doesn\'t {}'.format(self.english['base'])
-      return re.sub('doesn\'t be\\b', 'isn\'t', conditional) # fix bad grammar
+    return self._gloss('conditional', positive)
 
   def potential(self, polite=False, positive=False, kanji=False):
     """
@@ -348,22 +319,16 @@ class Verb:
     """
     verb = self.kanji if kanji else self.kana
     if self.group == 'ichidan':
-      base = re.sub('る$', 'られ', verb)
+      base = replace_ending(verb, 'る', 'られ')
     else:
-      for before, after in Verb.ENDING_U_TO_E.items():
-        if verb.endswith(before):
-          base = re.sub(before + '$', after, verb)
-          break
+      base = Verb.ENDING_U_TO_E.inflect(verb)
     if polite:
       return base + 'ます' if positive else base + 'ません'
     else:
       return base + 'る' if positive else base + 'ない'
 
   def english_potential(self, positive=False):
-    if positive:
-      return 'can {}'.format(self.english['base'])
-    else:
-      return 'can\'t {}'.format(self.english['base'])
+    return self._gloss('potential', positive)
 
   def causative(self, polite=False, positive=False, kanji=False):
     """
@@ -372,10 +337,10 @@ class Verb:
     """
     if self.group == 'ichidan':
       base = self.kanji if kanji else self.kana
-      base = re.sub('る$', 'さ', base)
+      base = replace_ending(base, 'る', 'さ')
     else:
       nai_form = self._nai(kanji=kanji)
-      base = re.sub('ない$', '', nai_form)
+      base = replace_ending(nai_form, 'ない', '')
     if polite:
       suffix = 'せます' if positive else 'せません'
     else:
@@ -383,11 +348,7 @@ class Verb:
     return base + suffix
 
   def english_causative(self, positive=False):
-    if positive:
-      causative = 'make {}'.format(self.english['base'])
-    else:
-      causative = 'not make {}'.format(self.english['base'])
-    return re.sub('\\sbe\\s', ' ', causative) # fix bad grammar
+    return self._gloss('causative', positive)
 
   def passive(self, polite=False, positive=False, kanji=False):
     """
@@ -396,10 +357,10 @@ class Verb:
     """
     if self.group == 'ichidan':
       base = self.kanji if kanji else self.kana
-      base = re.sub('る$', 'ら', base)
+      base = replace_ending(base, 'る', 'ら')
     else:
       nai_form = self._nai(kanji=kanji)
-      base = re.sub('ない$', '', nai_form)
+      base = replace_ending(nai_form, 'ない', '')
     if polite:
       suffix = 'れます' if positive else 'れません'
     else:
@@ -407,258 +368,56 @@ class Verb:
     return base + suffix
 
   def english_passive(self, positive=False):
-    if positive:
-      passive = 'be {}'.format(self.english['past'])
-      return re.sub('be was\\b', 'be', passive) # fix bad grammar
-    else:
-      passive = 'not be {}'.format(self.english['past'])
-      return re.sub('be was\\b', 'be', passive) # fix bad grammar
+    return self._gloss('passive', positive)
+
+  def _gloss(self, form, positive=True):
+    key = (form, positive)
+    if key not in self._glosses:
+      self._glosses[key] = VERB_GLOSSES.gloss(form, self.english, positive)
+    return self._glosses[key]
 
   def _masu(self, kanji=False):
     base = self.kanji if kanji else self.kana
-    replaced = None
     if self.group == 'ichidan':
-      replaced = re.sub('る$', '', base)
+      replaced = replace_ending(base, 'る', '')
     else:
-      for godan_end, stem in Verb.GODAN_TO_MASU_STEM.items():
-        if base.endswith(godan_end):
-          regex = re.compile(godan_end + '$')
-          replaced = regex.sub(stem, base)
-          break
+      replaced = Verb.GODAN_TO_MASU_STEM.inflect(base)
     if replaced:
       return replaced + 'ます'
 
   def _masen(self, kanji=False):
     masu = self._masu(kanji=kanji)
     if masu:
-      return re.sub('ます$', 'ません', masu)
+      return replace_ending(masu, 'ます', 'ません')
 
   def _nai(self, kanji=False):
     base = self.kanji if kanji else self.kana
-    replaced = None
     if self.group == 'ichidan':
-      replaced = re.sub('る$', '', base)
+      replaced = replace_ending(base, 'る', '')
     else:
-      for godan_end, nai in Verb.GODAN_TO_NAI.items():
-        if base.endswith(godan_end):
-          regex = re.compile(godan_end + '$')
-          replaced = regex.sub(nai, base)
-          break
+      replaced = Verb.GODAN_TO_NAI.inflect(base)
     if replaced:
       return replaced + 'ない'
 
   def _te(self, kanji=False):
     base = self.kanji if kanji else self.kana
     if self.group == 'ichidan':
-      return re.sub('る$', 'て', base)
+      return replace_ending(base, 'る', 'て')
     else:
-      for godan_end, te_form in Verb.GODAN_TO_TE.items():
-        if base.endswith(godan_end):
-          return re.sub(godan_end + '$', te_form, base)
+      return Verb.GODAN_TO_TE.inflect(base)
 
   def _ta(self, kanji=False):
     base = self.kanji if kanji else self.kana
     if self.group == 'ichidan':
-      return re.sub('る$', 'た', base)
+      return replace_ending(base, 'る', 'た')
     else:
-      for godan_end, te_form in Verb.GODAN_TO_TA.items():
-        if base.endswith(godan_end):
-          return re.sub(godan_end + '$', te_form, base)
-
-VERB_HASH = { verb['kanji'] : Verb(verb) for verb in verbs }
-
-class Conjugation:
-  def __init__(self, name, has_negative=True, has_polite=True):
-    self.name = name
-    self.has_negative = has_negative
-    self.has_polite = has_polite
-
-  def conjugation_name(self):
-    return self.name.strip().lower().replace(' ', '_')
-
-  # TODO: Test
-  def field_names(self):
-    # NB: DO NOT CHANGE THE ORDER. APPEND ONLY.
-    # I have not tested this, but Anki has the potential to lose SRS data
-    # or get cards/fields out of sync if the field numbers change. The
-    # ordering here directly maps to field numberings.
-    fields = []
-
-    prefix = self.conjugation_name() + '_'
-
-    fields.append(prefix + 'english_positive')
-    if self.has_negative:
-      fields.append(prefix + 'english_negative')
-
-    fields.extend([
-      prefix + 'plain_positive_kanji',
-      prefix + 'plain_positive_kana',
-    ])
-
-    if self.has_negative:
-      fields.extend([
-        prefix + 'plain_negative_kanji',
-        prefix + 'plain_negative_kana',
-      ])
-
-    if self.has_polite:
-      fields.extend([
-        prefix + 'polite_positive_kanji',
-        prefix + 'polite_positive_kana',
-      ])
-      if self.has_negative:
-        fields.extend([
-          prefix + 'polite_negative_kanji',
-          prefix + 'polite_negative_kana',
-        ])
-
-    return fields
-
-  def map_verb_fields(self, verb):
-    # NB: DO NOT CHANGE THE ORDER. APPEND ONLY.
-    # I have not tested this, but Anki has the potential to lose SRS data
-    # or get cards/fields out of sync if the field numbers change. The
-    # ordering here directly maps to field numberings.
-    field_values = []
-
-    # TODO: Instead of having one monolithic class 'Verb', have a base class
-    # and then subclasses that implement each conjugation's rules. Then we
-    # don't need to dynamic dispatch, you can just call `conjugate(...)`.
-    method_name = self.conjugation_name()
-    english_method_name = 'english_' + method_name
-    method = getattr(verb, method_name)
-    english_method = getattr(verb, english_method_name)
-
-    if self.has_polite:
-      if self.has_negative:
-        field_values.extend([
-          english_method(positive=True),
-          english_method(positive=False),
-          method(polite=False, positive=True, kanji=True),
-          method(polite=False, positive=True, kanji=False),
-          method(polite=False, positive=False, kanji=True),
-          method(polite=False, positive=False, kanji=False),
-          method(polite=True, positive=True, kanji=True),
-          method(polite=True, positive=True, kanji=False),
-          method(polite=True, positive=False, kanji=True),
-          method(polite=True, positive=False, kanji=False),
-        ])
-      else:
-        field_values.extend([
-          english_method(),
-          method(polite=False, kanji=True),
-          method(polite=False, kanji=False),
-          method(polite=True, kanji=True),
-          method(polite=True, kanji=False),
-        ])
-    else:
-      if self.has_negative:
-        field_values.extend([
-          english_method(positive=True),
-          english_method(positive=False),
-          method(positive=True, kanji=True),
-          method(positive=True, kanji=False),
-          method(positive=False, kanji=True),
-          method(positive=False, kanji=False),
-        ])
-      else:
-        field_values.extend([
-          english_method(),
-          method(kanji=True),
-          method(kanji=False),
-        ])
-
-    return field_values
-
-  # TODO: Test
-  # FIXME: cleanup
-  def templates(self):
-    # NB: DO NOT CHANGE THE ORDER. APPEND ONLY.
-    templates = []
-
-    prefix = self.conjugation_name() + '_'
-
-    templates.extend(self.card_templates(prefix + 'english_positive', prefix + 'plain_positive_'))
-
-    if self.has_negative:
-      templates.extend(self.card_templates(prefix + 'english_negative', prefix + 'plain_negative_'))
-
+      return Verb.GODAN_TO_TA.inflect(base)
 
-    if self.has_polite:
-      templates.extend(self.card_templates(prefix + 'english_positive', prefix + 'polite_positive_'))
+class Conjugation(BaseConjugation):
+  word_class = Verb
 
-      if self.has_negative:
-        templates.extend(self.card_templates(prefix + 'english_negative',
-          prefix + 'polite_negative_'))
-
-    return templates
-
-  def card_templates(self, question_field, answer_field):
-    templates = []
-    templates.append(self.card_template(question_field, answer_field))
-    templates.append(self.card_template(answer_field, question_field))
-    return templates
-
-  # TODO/FIXME: This is really gross, but I want to finish this...
-  def card_template(self, question_field, answer_field):
-    card_name = question_field # FIXME: Gross.
-
-    question = question_field
-    if question_field.endswith('_'): # FIXME: Awful heuristic
-      question = '<span class="kanji">{{{{{}kanji}}}}</span> '.format(question) + \
-          '<span class="kana">{{{{{}kana}}}}</span>'.format(question)
-
-    answer = answer_field
-    if answer_field.endswith('_'):
-      answer = '<span class="kanji">{{{{{}kanji}}}}</span> '.format(answer) + \
-          '<span class="kana">{{{{{}kana}}}}</span>'.format(answer)
-    else:
-      # English
-      answer = '{{{{{}}}}}'.format(answer)
-
-    # English prompts
-    if 'polite' in answer:
-      question = '{{{{{}}}}} (polite)'.format(question)
-    elif 'plain' in answer:
-      question = '{{{{{}}}}} (plain)'.format(question)
-
-    return {
-      'name': card_name,
-      'qfmt': '<span class="question">' + question + '</span>',
-      'afmt': '''
-<span class="question">{question}</span>
-
-<hr id="answer">
-
-{answer}
-
-<br>
-<br>
-
-<table>
-  <tr>
-    <th>kanji</th>
-    <td>{{{{base_kanji}}}}</td>
-  </tr>
-  <tr>
-    <th>kana</th>
-    <td>{{{{base_kana}}}}</td>
-  </tr>
-  <tr>
-    <th>group</th>
-    <td>{{{{base_kana}}}}</td>
-  </tr>
-  <tr>
-    <th>def</th>
-    <td>{{{{base_english}}}}</td>
-  </tr>
-  <tr>
-    <th>level</th>
-    <td>{{{{level}}}}</td>
-  </tr>
-</table>
-'''.format(question=question, answer=answer),
-  }
+  def map_verb_fields(self, verb):
+    return self.map_fields(verb)
 
 
 # TODO: Test that order does not change.
@@ -667,19 +426,20 @@ class Conjugation:
 # or get cards/fields out of sync if the field numbers change. The
 # ordering here directly maps to field numberings.
 CONJUGATIONS = [
-  Conjugation('Present Indicative'),
-  Conjugation('Presumptive'),
-  Conjugation('Volitional', has_negative=False),
-  Conjugation('Imperative'),
-  Conjugation('Past Indicative'),
-  Conjugation('Past Presumptive'),
-  Conjugation('Present Progressive'),
-  Conjugation('Past Progressive'),
-  Conjugation('Provisional', has_polite=False),
-  Conjugation('Conditional'),
-  Conjugation('Potential'),
-  Conjugation('Causative'),
-  Conjugation('Passive'),
+  Conjugation('Present Indicative', Verb.present_indicative, Verb.english_present_indicative),
+  Conjugation('Presumptive', Verb.presumptive, Verb.english_presumptive),
+  Conjugation('Volitional', Verb.volitional, Verb.english_volitional, has_negative=False),
+  Conjugation('Imperative', Verb.imperative, Verb.english_imperative),
+  Conjugation('Past Indicative', Verb.past_indicative, Verb.english_past_indicative),
+  Conjugation('Past Presumptive', Verb.past_presumptive, Verb.english_past_presumptive),
+  Conjugation('Present Progressive', Verb.present_progressive,
+      Verb.english_present_progressive),
+  Conjugation('Past Progressive', Verb.past_progressive, Verb.english_past_progressive),
+  Conjugation('Provisional', Verb.provisional, Verb.english_provisional, has_polite=False),
+  Conjugation('Conditional', Verb.conditional, Verb.english_conditional),
+  Conjugation('Potential', Verb.potential, Verb.english_potential),
+  Conjugation('Causative', Verb.causative, Verb.english_causative),
+  Conjugation('Passive', Verb.passive, Verb.english_passive),
 ]
 
 # use random.randrange(1 << 30, 1 << 31) to generate a suitable model_id,
@@ -689,9 +449,9 @@ VERB_CARD_DECK = genanki.Deck(
   2000002000, # XXX: DO NOT CHANGE
   'Generated Japanese Verb Conjugation') # XXX: DO NOT CHANGE
 
-MODEL_FIELDS = [
-  # NB: Make changes to the Anki deck model fields using the
-  # Anki interface first, or imports won't work as expected.
+# NB: Make changes to the Anki deck model fields using the
+# Anki interface first, or imports won't work as expected.
+BASE_MODEL_FIELDS = [
   {'name': 'base_kanji'},
   {'name': 'base_kana'},
   {'name': 'base_english'},
@@ -699,66 +459,76 @@ MODEL_FIELDS = [
   {'name': 'level'},
 ]
 
-TEMPLATES = []
+# Generated fields and templates are cached here, keyed by a hash of CONJUGATIONS.
+MODEL_CACHE_NAME = 'verb_card_model.json'
 
-for conjugation in CONJUGATIONS:
-  fields = [{'name': field_name } for field_name in conjugation.field_names()]
-  MODEL_FIELDS.extend(fields)
+# Field and template names of the model as committed. Anki numbers fields and
+# cards by position, so the model may only grow at the end.
+MODEL_SNAPSHOT_FILENAME = 'config/verb-card-model.json'
 
-  TEMPLATES.extend(conjugation.templates())
+_verb_card_model = None
 
+def verb_card_model(update_snapshot=False):
+  """
+  The verb conjugation Anki model. Built lazily on first use, and only
+  then is the committed snapshot updated if `update_snapshot` is given.
+  """
+  global _verb_card_model
+  if _verb_card_model:
+    return _verb_card_model
 
-VERB_CARD_MODEL = genanki.Model(
-  # XXX: DO NOT CHANGE
-  2000002001,
+  definition = load_model_definition(MODEL_CACHE_NAME, MODEL_SNAPSHOT_FILENAME,
+      BASE_MODEL_FIELDS, CONJUGATIONS, update_snapshot)
 
-  # The name of the model can change.
-  'Generated Japanese Verb Conjugation Model',
+  _verb_card_model = genanki.Model(
+    # XXX: DO NOT CHANGE
+    2000002001,
 
-  # NB: Make changes to the Anki deck model fields using the
-  # Anki interface first, or imports won't work as expected.
-  fields=MODEL_FIELDS,
+    # The name of the model can change.
+    'Generated Japanese Verb Conjugation Model',
 
-  # NB: Add or remove templates (with the same names) using the
-  # Anki interface first, or imports won't work as expected.
-  templates=TEMPLATES,
+    # NB: Make changes to the Anki deck model fields using the
+    # Anki interface first, or imports won't work as expected.
+    fields=definition['fields'],
 
-  css = '''
-.card {
-  font-family: arial;
-  font-size: 20px;
-  text-align: center;
-  color: black;
-  background-color: white;
-}
+    # NB: Add or remove templates (with the same names) using the
+    # Anki interface first, or imports won't work as expected.
+    templates=definition['templates'],
 
-#hint {
-  color: #00f;
-}
+    css=CARD_CSS)
 
-#hint div {
-  display: inline;
-}
+  return _verb_card_model
 
-.question {
-  font-size: 1.5em;
-}
+def note_fields(verb):
+  """
+  Every field of a verb's note, in model order.
+  """
+  # NB: Must match order of model.
+  fields = [
+    verb.kanji,
+    verb.kana,
+    verb.english_summary,
+    verb.group,
+    verb.level,
+  ]
 
-.kana {
-  color: #00f;
-}
+  for conjugation in CONJUGATIONS:
+    fields.extend(conjugation.map_verb_fields(verb))
 
-.kana:before { content: '(' }
-.kana:after { content: ')' }
+  return fields
 
-table {
-  border: 1px solid #ccc;
-  margin: auto;
-}
-''')
+def verb_dict_note_fields(verb_dict):
+  """
+  Same as `note_fields`, but from the plain TOML dict so that it can be
+  shipped to pool workers cheaply.
+  """
+  return note_fields(Verb(verb_dict))
 
 class Note(genanki.Note):
-  def __init__(self, verb):
+  def __init__(self, verb, fields=None):
+    """
+    Pass precomputed `fields` (eg. from a process pool) to skip conjugation.
+    """
     self.kanji = verb.kanji
     self.kana = verb.kana
     self.group = verb.group
@@ -770,19 +540,10 @@ class Note(genanki.Note):
     #if self.level:
     #  self.tags.append(self.level)
 
-    # NB: Must match order of model.
-    fields = [
-      self.kanji,
-      self.kana,
-      self.english_summary,
-      self.group,
-      self.level,
-    ]
+    if fields is None:
+      fields = note_fields(verb)
 
-    for conjugation in CONJUGATIONS:
-      fields.extend(conjugation.map_verb_fields(verb))
-
-    super().__init__(model=VERB_CARD_MODEL,
+    super().__init__(model=verb_card_model(),
         fields=fields,
         sort_field=self.kana,
         tags=self.tags,
@@ -802,16 +563,50 @@ class Note(genanki.Note):
   #      return 2
   #  return 2
 
-def main():
-  for verb in VERB_HASH.values():
-    note = Note(verb)
+def build_all_note_fields(verbs, processes=None):
+  """
+  Compute the note fields of verb notes on a process pool. Results come back
+  in the order of the notes, so the deck's note order is deterministic.
+  """
+  # NB: The TOML decoder's inline tables are local classes that can't be pickled.
+  verb_dicts = [{ key : dict(value) if isinstance(value, dict) else value
+      for key, value in verb.items() } for verb in verbs]
+  processes = processes or os.cpu_count() or 1
+  chunksize = max(1, len(verb_dicts) // (processes * 4))
+  with multiprocessing.Pool(processes) as pool:
+    return pool.map(verb_dict_note_fields, verb_dicts, chunksize=chunksize)
+
+def main(parallel=False, processes=None, verbs=None, update_snapshot=False):
+  """
+  Build the deck from verb notes, read from vocabulary/verbs/ if not given.
+  Returns the number of notes.
+  """
+  verb_card_model(update_snapshot)
+  if verbs is None:
+    verbs = read_verbs()
+  verb_dicts = list(verbs_by_kanji(verbs).values())
+
+  if parallel:
+    all_fields = build_all_note_fields(verb_dicts, processes)
+  else:
+    all_fields = [None] * len(verb_dicts)
+
+  for verb_dict, fields in zip(verb_dicts, all_fields):
+    note = Note(Verb(verb_dict), fields=fields)
     VERB_CARD_DECK.add_note(note)
 
   genanki.Package(VERB_CARD_DECK).write_to_file(OUTPUT_FILENAME)
+  return len(verb_dicts)
 
 if __name__ == '__main__':
   parser = ArgumentParser()
   parser.add_argument('--test', help='run the unit tests', action="store_true")
+  parser.add_argument('--parallel', help='conjugate verbs on a process pool',
+      action="store_true")
+  parser.add_argument('--processes', type=int,
+      help='number of worker processes for --parallel (default: all cores)')
+  parser.add_argument('--update-model-snapshot', dest='update_snapshot', action="store_true",
+      help='write new fields and templates to {}'.format(MODEL_SNAPSHOT_FILENAME))
   args = parser.parse_args()
 
   if args.test:
@@ -820,5 +615,5 @@ if __name__ == '__main__':
     sys.argv.remove('--test') # passed to unittest module and blows up
     unittest.main()
   else:
-    main()
+    main(parallel=args.parallel, processes=args.processes, update_snapshot=args.update_snapshot)
 
@@ -1,7 +1,9 @@
 import genanki
 import glob
+import os
 import re
 import sys
+import tempfile
 import toml
 import unittest
 from argparse import ArgumentParser
@@ -11,7 +13,27 @@ from toml.encoder import TomlEncoder
 
 from generate_verb_deck import CONJUGATIONS
 from generate_verb_deck import Conjugation
-from generate_verb_deck import VERB_HASH
+from generate_verb_deck import Verb
+from generate_verb_deck import build_all_note_fields
+from generate_verb_deck import BASE_MODEL_FIELDS
+from generate_verb_deck import MODEL_CACHE_NAME
+from generate_verb_deck import MODEL_SNAPSHOT_FILENAME
+from generate_verb_deck import note_fields
+from generate_verb_deck import read_verbs
+from generate_verb_deck import verbs_by_kanji
+from gloss import GlossRule
+from gloss import GlossTable
+from inflection import EndingTable
+from inflection import build_model_definition
+from inflection import check_append_only
+from inflection import check_model_snapshot
+from inflection import load_model_definition
+from inflection import load_model_snapshot
+from inflection import save_model_snapshot
+
+VERB_DICTS = verbs_by_kanji(read_verbs())
+
+VERB_HASH = { kanji : Verb(verb) for kanji, verb in VERB_DICTS.items() }
 
 class TestJapaneseVerbConjugation(unittest.TestCase):
 
@@ -590,6 +612,8 @@ class TestConjugator(unittest.TestCase):
   def test_field_ordering(self):
     c = Conjugation('Present Indicative')
     self.assertListEqual(c.field_names(), [
+        'present_indicative_english_positive',
+        'present_indicative_english_negative',
         'present_indicative_plain_positive_kanji',
         'present_indicative_plain_positive_kana',
         'present_indicative_plain_negative_kanji',
@@ -602,6 +626,7 @@ class TestConjugator(unittest.TestCase):
 
     c = Conjugation('Volitional', has_negative=False)
     self.assertListEqual(c.field_names(), [
+        'volitional_english_positive',
         'volitional_plain_positive_kanji',
         'volitional_plain_positive_kana',
         'volitional_polite_positive_kanji',
@@ -610,6 +635,8 @@ class TestConjugator(unittest.TestCase):
 
     c = Conjugation('Provisional', has_polite=False)
     self.assertListEqual(c.field_names(), [
+        'provisional_english_positive',
+        'provisional_english_negative',
         'provisional_plain_positive_kanji',
         'provisional_plain_positive_kana',
         'provisional_plain_negative_kanji',
@@ -618,6 +645,7 @@ class TestConjugator(unittest.TestCase):
 
     c = Conjugation('Fake Verb Form', has_polite=False, has_negative=False)
     self.assertListEqual(c.field_names(), [
+        'fake_verb_form_english_positive',
         'fake_verb_form_plain_positive_kanji',
         'fake_verb_form_plain_positive_kana',
       ])
@@ -625,6 +653,8 @@ class TestConjugator(unittest.TestCase):
   def test_field_mapping(self):
     c = Conjugation('Present Indicative')
     self.assertListEqual(c.map_verb_fields(VERB_HASH['歩く']), [
+        'will walk',
+        'won\'t walk',
         '歩く',
         'あるく',
         '歩かない',
@@ -637,6 +667,7 @@ class TestConjugator(unittest.TestCase):
 
     c = Conjugation('Volitional', has_negative=False)
     self.assertListEqual(c.map_verb_fields(VERB_HASH['信じる']), [
+        'let\'s believe in',
         '信じよう',
         'しんじよう',
         '信じましょう',
@@ -645,12 +676,23 @@ class TestConjugator(unittest.TestCase):
 
     c = Conjugation('Provisional', has_polite=False)
     self.assertListEqual(c.map_verb_fields(VERB_HASH['合う']), [
+        'if one does together',
+        'if one doesn\'t do together',
         '合えば',
         'あえば',
         '合わなければ',
         'あわなければ',
       ])
 
+  def test_explicit_bindings(self):
+    c = Conjugation('Present Indicative', Verb.potential, Verb.english_potential)
+    self.assertListEqual(c.map_verb_fields(VERB_HASH['歩く'])[:4], [
+        'can walk',
+        'can\'t walk',
+        '歩ける',
+        'あるける',
+      ])
+
   def test_all_verbs_can_conjugate(self):
     tested_cases = 0
     for conjugation in CONJUGATIONS:
@@ -659,3 +701,79 @@ class TestConjugator(unittest.TestCase):
         tested_cases += 1
 
     self.assertGreater(tested_cases, 200)
+
+class TestGlossTable(unittest.TestCase):
+
+  def test_rules_apply_only_to_their_forms(self):
+    table = GlossTable({
+        'a': ('be {base}', 'not be {base}'),
+        'b': ('be {base}', None),
+      }, [
+        GlossRule(('a',), 'be was\\b', 'be'),
+        GlossRule(('a',), 'not\\b', 'never'),
+      ])
+    english = {'base': 'was born'}
+    self.assertEqual(table.gloss('a', english, positive=True), 'be born')
+    self.assertEqual(table.gloss('a', english, positive=False), 'never be born')
+    self.assertEqual(table.gloss('b', english), 'be was born')
+
+class TestEndingTable(unittest.TestCase):
+
+  def test_longest_ending_wins(self):
+    table = EndingTable({'い': 'く', 'いい': 'よく'})
+    self.assertEqual(table.inflect('いい'), 'よく')
+    self.assertEqual(table.inflect('高い'), '高く')
+    self.assertIsNone(table.inflect('静か'))
+
+  def test_empty_ending(self):
+    table = EndingTable({'': 'だ'})
+    self.assertEqual(table.inflect('静か'), '静かだ')
+
+class TestModelDefinition(unittest.TestCase):
+
+  def test_cached_definition_matches_generated(self):
+    generated = build_model_definition(BASE_MODEL_FIELDS, CONJUGATIONS)
+    cached = load_model_definition(MODEL_CACHE_NAME, MODEL_SNAPSHOT_FILENAME,
+        BASE_MODEL_FIELDS, CONJUGATIONS)
+    self.assertListEqual(cached['fields'], generated['fields'])
+    self.assertListEqual(cached['templates'], generated['templates'])
+
+  def test_extends_committed_snapshot(self):
+    snapshot = load_model_snapshot(MODEL_SNAPSHOT_FILENAME)
+    definition = build_model_definition(BASE_MODEL_FIELDS, CONJUGATIONS)
+    for kind in ('fields', 'templates'):
+      names = [item['name'] for item in definition[kind]]
+      self.assertListEqual(names[:len(snapshot[kind])], snapshot[kind])
+
+  def test_field_names_are_unique(self):
+    fields = build_model_definition(BASE_MODEL_FIELDS, CONJUGATIONS)['fields']
+    names = [field['name'] for field in fields]
+    self.assertEqual(len(names), len(set(names)))
+
+  def test_append_only(self):
+    before = [{'name': 'a'}, {'name': 'b'}]
+    check_append_only(before, before, 'field')
+    check_append_only(before, before + [{'name': 'c'}], 'field')
+    with self.assertRaises(Exception):
+      check_append_only(before, [{'name': 'b'}, {'name': 'a'}], 'field')
+    with self.assertRaises(Exception):
+      check_append_only(before, [{'name': 'a'}], 'field')
+
+  def test_snapshot_is_only_written_on_update(self):
+    with tempfile.TemporaryDirectory() as directory:
+      filename = os.path.join(directory, 'card-model.json')
+      definition = { 'fields': [{'name': 'a'}], 'templates': [{'name': 't'}] }
+      save_model_snapshot(filename, definition)
+      appended = { 'fields': [{'name': 'a'}, {'name': 'b'}], 'templates': [{'name': 't'}] }
+      with self.assertRaises(Exception):
+        check_model_snapshot(filename, appended)
+      self.assertEqual(load_model_snapshot(filename)['fields'], ['a'])
+      check_model_snapshot(filename, appended, update=True)
+      self.assertEqual(load_model_snapshot(filename)['fields'], ['a', 'b'])
+
+class TestParallelNoteFields(unittest.TestCase):
+
+  def test_parallel_matches_serial(self):
+    serial = [note_fields(verb) for verb in VERB_HASH.values()]
+    parallel = build_all_note_fields(list(VERB_DICTS.values()), processes=2)
+    self.assertListEqual(parallel, serial)
@@ -2,10 +2,16 @@
 
 """
 Generate Anki deck for vocabulary.
+
+With --examples, notes also get example sentences mined from local text
+files (see examples.py), in the model's Examples field. Without it the
+field is left empty; it's one model and one guid per note either way, so
+switching between the two never makes Anki skip or duplicate notes.
 """
 
 import genanki
 import glob
+import html
 import re
 import sys
 import toml
@@ -15,6 +21,16 @@ from collections import OrderedDict
 from toml.decoder import TomlDecoder
 from toml.encoder import TomlEncoder
 
+from duplicates import ERROR_KINDS
+from duplicates import NoteLocation
+from duplicates import find_duplicates
+from duplicates import print_findings
+from examples import DEFAULT_CORPUS_PATHS
+from examples import mine_examples
+from library import NoteLibrary
+from library import read_set
+from note_filter import NoteIndex
+from note_filter import bit_positions
 from update_frequencies import ANIME_FREQUENCY_SUBFIELD
 from update_frequencies import FREQUENCY_FIELD
 from update_frequencies import calculate_highest_frequency
@@ -46,6 +62,9 @@ KANJI_CARD_MODEL = genanki.Model(
     {'name': 'Highest Frequency'},
     {'name': 'Highest Frequency Source'},
     {'name': 'Frequency Anime'},
+    # Empty unless the deck is built with --examples. Add it in Anki's UI
+    # (as the last field) before importing a deck with it.
+    {'name': 'Examples'},
   ],
   # NB: Add or remove templates (with the same names) using the
   # Anki interface first, or imports won't work as expected.
@@ -77,6 +96,10 @@ KANJI_CARD_MODEL = genanki.Model(
 <div>{{Kanji}}</div>
 <div id="hint">{{Kana}}</div>
 
+{{#Examples}}
+  <div class="examples">{{Examples}}</div>
+{{/Examples}}
+
 <footer>
   <div class="level level-{{Level}}">{{Level}}</div>
   {{#Highest Frequency}}
@@ -129,6 +152,10 @@ KANJI_CARD_MODEL = genanki.Model(
 
 <div>{{English}}</div>
 
+{{#Examples}}
+  <div class="examples">{{Examples}}</div>
+{{/Examples}}
+
 <footer>
   <div class="level level-{{Level}}">{{Level}}</div>
   {{#Highest Frequency}}
@@ -173,6 +200,10 @@ KANJI_CARD_MODEL = genanki.Model(
 
 <div>{{English}}</div>
 
+{{#Examples}}
+  <div class="examples">{{Examples}}</div>
+{{/Examples}}
+
 <footer>
   <div class="level level-{{Level}}">{{Level}}</div>
   {{#Highest Frequency}}
@@ -217,6 +248,10 @@ KANJI_CARD_MODEL = genanki.Model(
 
 <div>{{English}}</div>
 
+{{#Examples}}
+  <div class="examples">{{Examples}}</div>
+{{/Examples}}
+
 <footer>
   <div class="level level-{{Level}}">{{Level}}</div>
   {{#Highest Frequency}}
@@ -264,10 +299,19 @@ footer {
   float: right;
   text-transform: capitalize;
 }
+
+.examples {
+  color: #444;
+  font-size: 16px;
+  margin-top: 1em;
+}
   ''')
 
 class Note(genanki.Note):
-  def __init__(self, verb_dict, suspended=False):
+  def __init__(self, verb_dict, suspended=False, examples=None):
+    """
+    `examples` holds the note's sentences, if the deck is built with them.
+    """
     # These fields are always populated:
     self.kanji = verb_dict['kanji']
     self.kana = verb_dict['kana']
@@ -332,6 +376,7 @@ class Note(genanki.Note):
       self.frequency_highest,
       self.frequency_highest_source,
       self.frequency_anime,
+      '<br />'.join(html.escape(example) for example in examples or []),
     ]
 
     super().__init__(model=KANJI_CARD_MODEL,
@@ -363,14 +408,6 @@ class Note(genanki.Note):
         return 2
     return 2
 
-def read_set(filename):
-  lines = []
-  with open(filename, 'r') as f:
-    lines = f.readlines()
-    lines = map(lambda x: x.strip(), lines)
-    lines = filter(None, lines)
-  return set(lines)
-
 KANJI_ONLY_VOCAB = read_set('config/kanji-only-vocab.txt')
 SUSPENDED_VOCAB = read_set('config/suspended.txt')
 
@@ -380,18 +417,50 @@ def read_vocabulary_notes(filename):
     toml_dict = toml.loads(contents)
     return toml_dict['cards']
 
-total_notes = 0
-total_cards = 0
-total_disabled = 0 # TODO: Deprecate and remove
-total_suspended = 0
-total_kanji_only = 0
-total_hiragana_only = 0
-
-for filename in glob.glob('**/*.toml', recursive=True):
-  if 'cardgen' in filename or 'temp/' in filename:
-    continue # XXX: Things here shouldn't be processed for now.
-  print('Loading file: {0}'.format(filename))
-  notes = read_vocabulary_notes(filename)
+def main(examples=False, corpus_paths=DEFAULT_CORPUS_PATHS, note_filter=None, paths=None,
+    strict_duplicates=False):
+  examples_map = None
+  if examples:
+    examples_map = mine_examples(corpus_paths)
+    print('Mined examples for {0} notes'.format(len(examples_map)))
+
+  total_notes = 0
+  total_cards = 0
+  total_disabled = 0 # TODO: Deprecate and remove
+  total_suspended = 0
+  total_kanji_only = 0
+  total_hiragana_only = 0
+
+  if note_filter or paths:
+    # Skip the files the manifest says can't match
+    filenames = NoteLibrary.filenames_matching(note_filter, paths)
+  else:
+    filenames = NoteLibrary.note_filenames()
+
+  located_notes = []
+  for filename in filenames:
+    print('Loading file: {0}'.format(filename))
+    for position, note in enumerate(read_vocabulary_notes(filename)):
+      located_notes.append(NoteLocation(filename, position, note))
+
+  if note_filter:
+    note_count = len(located_notes)
+    matching = NoteIndex([located.note for located in located_notes]).select(note_filter)
+    located_notes = [located_notes[i] for i in bit_positions(matching)]
+    print('Filter "{0}" matches {1} of {2} notes'.format(note_filter, len(located_notes),
+        note_count))
+
+  # Notes sharing a guid overwrite each other when the deck is imported.
+  clashes = [finding for finding in find_duplicates(located_notes) \
+      if finding.kind in ERROR_KINDS]
+  if clashes:
+    print('Warning: {0} sets of notes share a guid:'.format(len(clashes)))
+    print_findings(clashes)
+    if strict_duplicates:
+      raise Exception('Not building a deck with clashing notes (see above)')
+
+  notes = [located.note for located in located_notes]
+
   for n in notes:
     if 'disabled' in n and n['disabled']:
       total_disabled += 1 # TODO: Deprecate and remove
@@ -409,7 +478,11 @@ for filename in glob.glob('**/*.toml', recursive=True):
       suspended = True
       total_suspended += 1
 
-    note = Note(n, suspended=suspended)
+    note_examples = None
+    if examples_map is not None:
+      note_examples = examples_map.get((n['kanji'], n['kana']), [])
+
+    note = Note(n, suspended=suspended, examples=note_examples)
     for card in note.cards:
       card.suspend = True
 
@@ -422,13 +495,29 @@ for filename in glob.glob('**/*.toml', recursive=True):
     total_notes += 1
     total_cards += note.card_count()
 
-print('Total cards: {0}'.format(total_cards))
-print('Total notes: {0}'.format(total_notes))
-print('  > notes disabled (deprecated): {0}'.format(total_disabled))
-print('  > notes suspended: {0}'.format(total_suspended))
-print('  > notes /w kanji-only cards: {0}'.format(total_kanji_only))
-print('  > notes w/ hiragana-only cards: {0}'.format(total_hiragana_only))
-print('Output file: {0}'.format(OUTPUT_FILENAME))
-
-genanki.Package(KANJI_CARD_DECK).write_to_file(OUTPUT_FILENAME)
-
+  print('Total cards: {0}'.format(total_cards))
+  print('Total notes: {0}'.format(total_notes))
+  print('  > notes disabled (deprecated): {0}'.format(total_disabled))
+  print('  > notes suspended: {0}'.format(total_suspended))
+  print('  > notes /w kanji-only cards: {0}'.format(total_kanji_only))
+  print('  > notes w/ hiragana-only cards: {0}'.format(total_hiragana_only))
+  print('Output file: {0}'.format(OUTPUT_FILENAME))
+
+  genanki.Package(KANJI_CARD_DECK).write_to_file(OUTPUT_FILENAME)
+
+if __name__ == '__main__':
+  parser = ArgumentParser()
+  parser.add_argument('--examples', help='add example sentences mined from the corpus',
+      action='store_true')
+  parser.add_argument('--corpus', dest='corpus', nargs='+', default=DEFAULT_CORPUS_PATHS,
+      help='text files or directories to mine examples from (default: {})'.format(
+        ' '.join(DEFAULT_CORPUS_PATHS)))
+  parser.add_argument('--filter', dest='filter',
+      help='only build notes matching a filter, eg. "level:n5 & tag:food & !tag:uncommon"')
+  parser.add_argument('paths', nargs='*',
+      help='only build notes from these files or directories, eg. vocabulary/food')
+  parser.add_argument('--strict-duplicates', dest='strict_duplicates', action='store_true',
+      help='fail instead of warning when notes share a guid (see duplicates.py)')
+  args = parser.parse_args()
+  main(examples=args.examples, corpus_paths=args.corpus, note_filter=args.filter,
+      paths=args.paths, strict_duplicates=args.strict_duplicates)
@@ -0,0 +1,105 @@
+"""
+English glosses for conjugated forms.
+
+Glosses are built from a per-form template and then run through a table of
+grammar fixes ("didn't be" -> "wasn't", etc). The fixes are declared once,
+grouped by form, and compiled into a single alternation per form so each
+gloss needs exactly one regex pass.
+"""
+
+import re
+from collections import namedtuple
+from string import Formatter
+
+# A grammar fix. `forms` names the conjugations it applies to.
+GlossRule = namedtuple('GlossRule', ['forms', 'pattern', 'replacement'])
+
+class GlossTable:
+  def __init__(self, templates, rules):
+    """
+    `templates` maps a form name to a (positive, negative) pair of format
+    strings that are filled in from the word's English fields. Forms without
+    a negative use None.
+    """
+    self.templates = templates
+    self.patterns = {}
+    for form in templates:
+      form_rules = [rule for rule in rules if form in rule.forms]
+      self.patterns[form] = GlossTable.compile_rules(form_rules)
+
+  def keys(self):
+    """
+    Every English field the templates are filled in from, sorted.
+    """
+    return sorted(set(name for templates in self.templates.values() \
+        for template in templates if template \
+        for _, name, _, _ in Formatter().parse(template) if name))
+
+  @staticmethod
+  def compile_rules(rules):
+    """
+    Compile rules into one (pattern, [(group, replacement)]) pair, or None.
+    """
+    if not rules:
+      return None
+    groups = []
+    alternatives = []
+    for i, rule in enumerate(rules):
+      group = 'rule{}'.format(i)
+      groups.append((group, rule.replacement))
+      alternatives.append('(?P<{}>{})'.format(group, rule.pattern))
+    return re.compile('|'.join(alternatives)), groups
+
+  def gloss(self, form, english, positive=True):
+    template = self.templates[form][0 if positive else 1]
+    text = template.format_map(english)
+    compiled = self.patterns[form]
+    if not compiled:
+      return text
+    pattern, groups = compiled
+    def replace(match):
+      for group, replacement in groups:
+        if match.group(group) is not None:
+          return replacement
+    return pattern.sub(replace, text)
+
+VERB_GLOSS_TEMPLATES = {
+  'present_indicative': ('will {base}', 'won\'t {base}'),
+  'presumptive': ('will probably {base}', 'probably won\'t {base}'),
+  'volitional': ('let\'s {base}', None),
+  'imperative': ('do {base}!', 'don\'t {base}!'),
+  'past_indicative': ('{past}', 'didn\'t {base}'),
+  'past_presumptive': ('probably {past}', 'probably didn\'t {base}'),
+  'present_progressive': ('{continuous}', 'not {continuous}'),
+  'past_progressive': ('was {continuous}', 'wasn\'t {continuous}'),
+  'provisional': ('if one {plural}', 'if one doesn\'t {base}'),
+  'conditional': ('if one {plural}', 'if one doesn\'t {base}'),
+  'potential': ('can {base}', 'can\'t {base}'),
+  'causative': ('make {base}', 'not make {base}'),
+  'passive': ('be {past}', 'not be {past}'),
+}
+
+VERB_GLOSS_RULES = [
+  # Fix bad grammar
+  GlossRule(('past_indicative', 'past_presumptive'), 'didn\'t be\\b', 'wasn\'t'),
+  GlossRule(('provisional', 'conditional'), 'doesn\'t be\\b', 'isn\'t'),
+  GlossRule(('provisional', 'conditional'), 'one are\\b', 'one is'),
+  GlossRule(('causative',), '\\sbe\\s', ' '),
+  GlossRule(('passive',), 'be was\\b', 'be'),
+  # Better wording
+  GlossRule(('past_presumptive',), 'probably was\\b', 'was probably'),
+]
+
+VERB_GLOSSES = GlossTable(VERB_GLOSS_TEMPLATES, VERB_GLOSS_RULES)
+
+ADJECTIVE_GLOSS_TEMPLATES = {
+  'present': ('is {base}', 'isn\'t {base}'),
+  'past': ('was {base}', 'wasn\'t {base}'),
+  'te_form': ('is {base} and...', 'isn\'t {base} and...'),
+  'adverbial': ('{adverb}', None),
+  'conditional': ('if {base}', 'if not {base}'),
+}
+
+# NB: The fields come from a note's english-conjugated, written by hand.
+# Nothing to fix: they're never made up from the english summary.
+ADJECTIVE_GLOSSES = GlossTable(ADJECTIVE_GLOSS_TEMPLATES, [])
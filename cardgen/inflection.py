@@ -0,0 +1,331 @@
+"""
+Shared, table-driven inflection core for the conjugation decks.
+
+Word classes (eg. Verb, Adjective) implement their forms by swapping word
+endings through EndingTables, and declare their forms with Conjugation,
+which also produces the Anki fields and card templates for each form.
+"""
+
+import inspect
+import json
+import os
+
+from cache import hash_strings
+from cache import load_json
+from cache import save_json
+
+# Shared by every conjugation deck's model.
+CARD_CSS = '''
+.card {
+  font-family: arial;
+  font-size: 20px;
+  text-align: center;
+  color: black;
+  background-color: white;
+}
+
+#hint {
+  color: #00f;
+}
+
+#hint div {
+  display: inline;
+}
+
+.question {
+  font-size: 1.5em;
+}
+
+.kana {
+  color: #00f;
+}
+
+.kana:before { content: '(' }
+.kana:after { content: ')' }
+
+table {
+  border: 1px solid #ccc;
+  margin: auto;
+}
+'''
+
+class EndingTable:
+  def __init__(self, replacements):
+    """
+    `replacements` maps a word ending to the text that replaces it. When
+    several endings match, the longest one wins.
+    """
+    self.replacements = dict(replacements)
+    self.lengths = sorted(set(len(ending) for ending in self.replacements), reverse=True)
+
+  def inflect(self, word):
+    """
+    Replace the ending of `word`, or return None if no ending matches.
+    """
+    for length in self.lengths:
+      stem = word[:len(word) - length]
+      ending = word[len(word) - length:]
+      if ending in self.replacements:
+        return stem + self.replacements[ending]
+    return None
+
+  def items(self):
+    return self.replacements.items()
+
+def replace_ending(word, ending, replacement):
+  """
+  Replace a single known ending. Words without the ending are returned as-is.
+  """
+  if word.endswith(ending):
+    return word[:len(word) - len(ending)] + replacement
+  return word
+
+class Conjugation:
+  # The class whose methods provide default form and gloss functions.
+  word_class = None
+
+  def __init__(self, name, form=None, gloss=None, has_negative=True, has_polite=True):
+    """
+    `form` and `gloss` are the functions producing the Japanese form and its
+    English gloss. They default to the `word_class` methods named after the
+    conjugation, eg. `present_indicative` and `english_present_indicative`.
+    """
+    self.name = name
+    self.has_negative = has_negative
+    self.has_polite = has_polite
+
+    method_name = self.conjugation_name()
+    self.form = form or getattr(self.word_class, method_name, None)
+    self.gloss = gloss or getattr(self.word_class, 'english_' + method_name, None)
+
+    # Every (field suffix, function, keyword arguments) of this conjugation.
+    # These are bound once here so that field generation is a flat loop.
+    self.slots = self.bind_slots()
+
+  def conjugation_name(self):
+    return self.name.strip().lower().replace(' ', '_')
+
+  def bind_slots(self):
+    # NB: DO NOT CHANGE THE ORDER. APPEND ONLY.
+    # I have not tested this, but Anki has the potential to lose SRS data
+    # or get cards/fields out of sync if the field numbers change. The
+    # ordering here directly maps to field numberings.
+    polarities = [('positive', True), ('negative', False)]
+    if not self.has_negative:
+      polarities = polarities[:1]
+
+    politeness = [('plain', False), ('polite', True)]
+    if not self.has_polite:
+      politeness = politeness[:1]
+
+    slots = []
+
+    for polarity, positive in polarities:
+      arguments = { 'positive': positive } if self.has_negative else {}
+      slots.append(('english_' + polarity, self.gloss, arguments))
+
+    for register, polite in politeness:
+      for polarity, positive in polarities:
+        for script, kanji in [('kanji', True), ('kana', False)]:
+          arguments = { 'kanji': kanji }
+          if self.has_polite:
+            arguments['polite'] = polite
+          if self.has_negative:
+            arguments['positive'] = positive
+          suffix = '{}_{}_{}'.format(register, polarity, script)
+          slots.append((suffix, self.form, arguments))
+
+    return slots
+
+  def field_names(self):
+    prefix = self.conjugation_name() + '_'
+    return [prefix + suffix for suffix, _, _ in self.slots]
+
+  def map_fields(self, word):
+    return [function(word, **arguments) for _, function, arguments in self.slots]
+
+  # TODO: Test
+  # FIXME: cleanup
+  def templates(self):
+    # NB: DO NOT CHANGE THE ORDER. APPEND ONLY.
+    templates = []
+
+    prefix = self.conjugation_name() + '_'
+
+    templates.extend(self.card_templates(prefix + 'english_positive', prefix + 'plain_positive_'))
+
+    if self.has_negative:
+      templates.extend(self.card_templates(prefix + 'english_negative', prefix + 'plain_negative_'))
+
+
+    if self.has_polite:
+      templates.extend(self.card_templates(prefix + 'english_positive', prefix + 'polite_positive_'))
+
+      if self.has_negative:
+        templates.extend(self.card_templates(prefix + 'english_negative',
+          prefix + 'polite_negative_'))
+
+    return templates
+
+  def card_templates(self, question_field, answer_field):
+    templates = []
+    templates.append(self.card_template(question_field, answer_field))
+    templates.append(self.card_template(answer_field, question_field))
+    return templates
+
+  # TODO/FIXME: This is really gross, but I want to finish this...
+  def card_template(self, question_field, answer_field):
+    card_name = question_field # FIXME: Gross.
+
+    question = question_field
+    if question_field.endswith('_'): # FIXME: Awful heuristic
+      question = '<span class="kanji">{{{{{}kanji}}}}</span> '.format(question) + \
+          '<span class="kana">{{{{{}kana}}}}</span>'.format(question)
+
+    answer = answer_field
+    if answer_field.endswith('_'):
+      answer = '<span class="kanji">{{{{{}kanji}}}}</span> '.format(answer) + \
+          '<span class="kana">{{{{{}kana}}}}</span>'.format(answer)
+    else:
+      # English
+      answer = '{{{{{}}}}}'.format(answer)
+
+    # English prompts
+    if 'polite' in answer:
+      question = '{{{{{}}}}} (polite)'.format(question)
+    elif 'plain' in answer:
+      question = '{{{{{}}}}} (plain)'.format(question)
+
+    return {
+      'name': card_name,
+      'qfmt': '<span class="question">' + question + '</span>',
+      'afmt': '''
+<span class="question">{question}</span>
+
+<hr id="answer">
+
+{answer}
+
+<br>
+<br>
+
+<table>
+  <tr>
+    <th>kanji</th>
+    <td>{{{{base_kanji}}}}</td>
+  </tr>
+  <tr>
+    <th>kana</th>
+    <td>{{{{base_kana}}}}</td>
+  </tr>
+  <tr>
+    <th>group</th>
+    <td>{{{{base_kana}}}}</td>
+  </tr>
+  <tr>
+    <th>def</th>
+    <td>{{{{base_english}}}}</td>
+  </tr>
+  <tr>
+    <th>level</th>
+    <td>{{{{level}}}}</td>
+  </tr>
+</table>
+'''.format(question=question, answer=answer),
+  }
+
+def model_definition_key(base_fields, conjugations):
+  """
+  Hash of everything a generated model depends on: the conjugation list and
+  the template source. Any change to these invalidates the cached model.
+  """
+  names = ['{}:{}:{}'.format(c.name, c.has_negative, c.has_polite) for c in conjugations]
+  base_names = [field['name'] for field in base_fields]
+  return hash_strings(inspect.getsource(Conjugation), *base_names, *names)
+
+def build_model_definition(base_fields, conjugations):
+  """
+  Generate the model fields and card templates from a list of conjugations.
+  """
+  fields = list(base_fields)
+  templates = []
+  for conjugation in conjugations:
+    fields.extend([{'name': field_name } for field_name in conjugation.field_names()])
+    templates.extend(conjugation.templates())
+  return {
+    'fields': fields,
+    'templates': templates,
+  }
+
+def check_append_only(previous, current, kind):
+  """
+  Fail if `current` is not `previous` with new entries appended. Field and
+  template order maps directly to Anki's field and card numbering.
+  """
+  previous_names = [item['name'] for item in previous]
+  current_names = [item['name'] for item in current]
+  if current_names[:len(previous_names)] != previous_names:
+    for i, (before, after) in enumerate(zip(previous_names, current_names)):
+      if before != after:
+        raise Exception('Model {} #{} changed from {} to {}. '
+            'Conjugations are APPEND ONLY.'.format(kind, i, before, after))
+    raise Exception('Model {}s were removed ({} -> {}). '
+        'Conjugations are APPEND ONLY.'.format(kind, len(previous_names), len(current_names)))
+
+def load_model_snapshot(filename):
+  """
+  { 'fields', 'templates' } names of the committed model, or None.
+  """
+  if not os.path.exists(filename):
+    return None
+  with open(filename, 'r') as f:
+    return json.load(f)
+
+def _names(items):
+  return [item['name'] for item in items]
+
+def save_model_snapshot(filename, definition):
+  snapshot = {
+    'fields': _names(definition['fields']),
+    'templates': _names(definition['templates']),
+  }
+  with open(filename, 'w') as f:
+    json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    f.write('\n')
+
+def check_model_snapshot(filename, definition, update=False):
+  """
+  Fail if the definition isn't the committed snapshot, or with `update`, if
+  it isn't the snapshot with new fields and templates appended. Only an
+  update writes the snapshot, to be committed with the change.
+  """
+  snapshot = load_model_snapshot(filename)
+  if snapshot:
+    for kind in ('field', 'template'):
+      check_append_only([{ 'name': name } for name in snapshot[kind + 's']],
+          definition[kind + 's'], kind)
+  if snapshot and snapshot['fields'] == _names(definition['fields']) \
+      and snapshot['templates'] == _names(definition['templates']):
+    return
+  if not update:
+    raise Exception('The model no longer matches {}. If the new fields and templates '
+        'are intended, run with --update-model-snapshot and commit it.'.format(filename))
+  save_model_snapshot(filename, definition)
+  print('Updated {}; commit it with the new conjugations'.format(filename))
+
+def load_model_definition(cache_name, snapshot_filename, base_fields, conjugations,
+    update_snapshot=False):
+  """
+  Return the (possibly cached) model definition. It's always checked against
+  the snapshot committed in config/, so reordering or removing fields fails
+  immediately, whether or not there's a cache.
+  """
+  key = model_definition_key(base_fields, conjugations)
+  definition = load_json(cache_name)
+  if not definition or definition.get('key') != key:
+    definition = build_model_definition(base_fields, conjugations)
+    definition['key'] = key
+    save_json(cache_name, definition)
+
+  check_model_snapshot(snapshot_filename, definition, update_snapshot)
+  return definition
@@ -6,18 +6,20 @@ Insert blank notes at the top of every set of cards.
 Useful for creating new cards in bulk with an editor.
 
 This is undone by running the normalization code, `sort.py`.
+
+The blank notes are patched in (see toml_patch), so files are not parsed
+or re-serialized. Files without a `[[cards]]` block are skipped, since
+there's no first note to put the blank one above.
 """
 
 import glob
 from collections import OrderedDict
 
 from library import DynamicInlineTableDict
-from library import NoteLibrary
 from sort import INDEX_NAME
-from sort import write_toml
+from toml_patch import TomlPatch
 
-def insert_blanks(notes, filename):
-  blank_note = OrderedDict()
+def blank_note(filename):
   keys = [
     ('kanji', ''),
     ('kana', ''),
@@ -47,13 +49,10 @@ def insert_blanks(notes, filename):
     ('tags', []),
   ])
 
-  blank_note['source'] = ''
-  blank_note['level'] = ''
-  blank_note['explain'] = ''
-  blank_note['tags'] = []
+  return OrderedDict(keys)
 
-  blank_note = OrderedDict(keys)
-  notes[INDEX_NAME].insert(0, blank_note)
+def insert_blanks(notes, filename):
+  notes[INDEX_NAME].insert(0, blank_note(filename))
 
 def main():
   for filename in glob.glob('**/*.toml', recursive=True):
@@ -63,9 +62,11 @@ def main():
       continue # XXX: Things here shouldn't be processed for now.
 
     try:
-      notes = NoteLibrary.read_notes_from_toml_file(filename)
-      insert_blanks(notes, filename)
-      write_toml(notes, filename)
+      patch = TomlPatch(filename)
+      if not len(patch):
+        continue
+      patch.insert_note(0, blank_note(filename))
+      patch.write()
     except Exception as e:
       print('Error processing file: {0}'.format(filename))
       print(e)
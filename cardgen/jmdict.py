@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+"""
+Index a local JMdict XML dump (eg. JMdict_e) for lookups by kanji and reading.
+
+  python cardgen jmdict JMdict_e.xml
+
+The dump is parsed with iterparse, one <entry> at a time, so memory doesn't
+grow with its size. Entries go into an SQLite database in .cache/ with an
+index on every (kanji, reading) form, so lookups never scan the dump. The
+dump's hash is recorded, and ingesting an unchanged dump is a no-op.
+
+See enrich.py for filling in notes from the index.
+"""
+
+import argparse
+import json
+import sqlite3
+import xml.etree.ElementTree as ElementTree
+
+from cache import cache_path
+from cache import hash_file
+
+DATABASE_NAME = 'jmdict.sqlite'
+
+# Bump when the schema or parsing changes. Old databases are rebuilt.
+SCHEMA_VERSION = 1
+
+BATCH_SIZE = 5000
+
+SCHEMA = '''
+CREATE TABLE meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+
+CREATE TABLE entries (
+  id INTEGER PRIMARY KEY, -- ent_seq
+  kanji TEXT NOT NULL, -- JSON list, in dictionary order
+  readings TEXT NOT NULL, -- JSON list, in dictionary order
+  senses TEXT NOT NULL -- JSON list of { pos, glosses }
+);
+
+-- Every kanji spelling and reading pair an entry allows. Kana only entries
+-- have a NULL kanji.
+CREATE TABLE forms (
+  entry_id INTEGER NOT NULL REFERENCES entries(id),
+  kanji TEXT,
+  reading TEXT NOT NULL
+);
+
+CREATE INDEX forms_kanji_reading ON forms(kanji, reading);
+CREATE INDEX forms_reading ON forms(reading);
+'''
+
+def _texts(element, path):
+  return [child.text for child in element.findall(path) if child.text]
+
+def parse_entry(element):
+  """
+  (id, kanji, readings, senses, forms) of an <entry>.
+  """
+  entry_id = int(element.findtext('ent_seq'))
+  kanji = _texts(element, 'k_ele/keb')
+
+  readings = []
+  forms = []
+  for r_ele in element.findall('r_ele'):
+    reading = r_ele.findtext('reb')
+    readings.append(reading)
+    if not kanji or r_ele.find('re_nokanji') is not None:
+      forms.append((None, reading))
+      continue
+    # NB: A reading applies to every spelling unless it's restricted.
+    for spelling in _texts(r_ele, 're_restr') or kanji:
+      forms.append((spelling, reading))
+
+  senses = []
+  pos = []
+  for sense in element.findall('sense'):
+    # NB: A sense without <pos> has the parts of speech of the one before.
+    pos = _texts(sense, 'pos') or pos
+    glosses = _texts(sense, 'gloss')
+    if glosses:
+      senses.append({ 'pos': pos, 'glosses': glosses })
+
+  return entry_id, kanji, readings, senses, forms
+
+def iter_entries(filename):
+  """
+  parse_entry() of every entry in the dump, in constant memory.
+  """
+  events = ElementTree.iterparse(filename, events=('start', 'end'))
+  root = None
+  for event, element in events:
+    if root is None:
+      root = element
+    if event == 'end' and element.tag == 'entry':
+      yield parse_entry(element)
+      # Drop the parsed entries, or the tree grows to the size of the dump.
+      root.clear()
+
+class Dictionary:
+  def __init__(self, filename=None):
+    self.filename = filename or cache_path(DATABASE_NAME)
+    self.connection = sqlite3.connect(self.filename)
+    version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+    if version != SCHEMA_VERSION:
+      self._create()
+
+  def _create(self):
+    with self.connection:
+      for (table,) in self.connection.execute(
+          "SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+        self.connection.execute('DROP TABLE {}'.format(table))
+      self.connection.executescript(SCHEMA)
+      self.connection.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+
+  def close(self):
+    self.connection.close()
+
+  def source_hash(self):
+    row = self.connection.execute("SELECT value FROM meta WHERE key = 'hash'").fetchone()
+    return row[0] if row else None
+
+  def __len__(self):
+    return self.connection.execute('SELECT count(*) FROM entries').fetchone()[0]
+
+  def ingest(self, filename, force=False):
+    """
+    Replace the index with the entries of a dump. Returns the number of
+    entries, or None if the dump was already ingested.
+    """
+    dump_hash = hash_file(filename)
+    if not force and dump_hash == self.source_hash():
+      return None
+
+    self._create()
+    count = 0
+    entries = []
+    forms = []
+    with self.connection:
+      for entry_id, kanji, readings, senses, entry_forms in iter_entries(filename):
+        entries.append((entry_id, json.dumps(kanji, ensure_ascii=False),
+            json.dumps(readings, ensure_ascii=False), json.dumps(senses, ensure_ascii=False)))
+        forms.extend((entry_id, spelling, reading) for spelling, reading in entry_forms)
+        count += 1
+        if len(entries) == BATCH_SIZE:
+          self._insert(entries, forms)
+          entries = []
+          forms = []
+      self._insert(entries, forms)
+      self.connection.execute("INSERT INTO meta (key, value) VALUES ('hash', ?)", (dump_hash,))
+    return count
+
+  def _insert(self, entries, forms):
+    self.connection.executemany(
+        'INSERT OR REPLACE INTO entries (id, kanji, readings, senses) VALUES (?, ?, ?, ?)',
+        entries)
+    self.connection.executemany(
+        'INSERT INTO forms (entry_id, kanji, reading) VALUES (?, ?, ?)', forms)
+
+  def entry(self, entry_id):
+    """
+    { id, kanji, readings, senses } of an entry.
+    """
+    row = self.connection.execute(
+        'SELECT id, kanji, readings, senses FROM entries WHERE id = ?', (entry_id,)).fetchone()
+    if not row:
+      return None
+    return {
+      'id': row[0],
+      'kanji': json.loads(row[1]),
+      'readings': json.loads(row[2]),
+      'senses': json.loads(row[3]),
+    }
+
+  def forms(self, entry_id):
+    """
+    (kanji, reading) of each form of an entry.
+    """
+    return self.connection.execute(
+        'SELECT kanji, reading FROM forms WHERE entry_id = ?', (entry_id,)).fetchall()
+
+  def readings(self, kanji):
+    """
+    Readings of a kanji spelling, in dictionary order.
+    """
+    rows = self.connection.execute(
+        'SELECT reading FROM forms WHERE kanji = ? ORDER BY entry_id, rowid', (kanji,)).fetchall()
+    return [row[0] for row in rows]
+
+  def lookup(self, kanji, reading):
+    """
+    Ids of the entries with this spelling and reading. Pass the reading as
+    the kanji too for kana only words.
+    """
+    rows = self.connection.execute(
+        'SELECT entry_id FROM forms WHERE kanji = ? AND reading = ?', (kanji, reading)).fetchall()
+    if not rows and kanji == reading:
+      rows = self.connection.execute(
+          'SELECT entry_id FROM forms WHERE kanji IS NULL AND reading = ?', (reading,)).fetchall()
+    return sorted(set(row[0] for row in rows))
+
+  def lookup_all(self, pairs):
+    """
+    { (kanji, reading) => [entry id] } for many pairs in one indexed join.
+    """
+    with self.connection:
+      self.connection.execute('DROP TABLE IF EXISTS temp.wanted')
+      self.connection.execute('CREATE TEMP TABLE wanted (kanji TEXT, reading TEXT)')
+      self.connection.executemany('INSERT INTO temp.wanted (kanji, reading) VALUES (?, ?)',
+          set(pairs))
+      rows = self.connection.execute('''
+          SELECT wanted.kanji, wanted.reading, forms.entry_id FROM temp.wanted
+          JOIN forms ON forms.reading = wanted.reading
+            AND (forms.kanji = wanted.kanji
+              OR (forms.kanji IS NULL AND wanted.kanji = wanted.reading))
+          ''').fetchall()
+      self.connection.execute('DROP TABLE temp.wanted')
+
+    matches = {}
+    for kanji, reading, entry_id in rows:
+      matches.setdefault((kanji, reading), set()).add(entry_id)
+    return { pair : sorted(entry_ids) for pair, entry_ids in matches.items() }
+
+def main():
+  parser = argparse.ArgumentParser(description='Index a JMdict XML dump')
+  parser.add_argument('filename', help='JMdict XML file, eg. JMdict_e')
+  parser.add_argument('--force', dest='force', action='store_true',
+      help='re-index even if the dump is unchanged')
+  args = parser.parse_args()
+
+  dictionary = Dictionary()
+  count = dictionary.ingest(args.filename, args.force)
+  if count is None:
+    print('Already indexed {} ({} entries)'.format(args.filename, len(dictionary)))
+  else:
+    print('Indexed {} entries from {}'.format(count, args.filename))
+  dictionary.close()
+
+if __name__ == '__main__':
+  main()
@@ -3,6 +3,8 @@ Common utilities for managing the TOML note library.
 """
 
 import glob
+import os
+import re
 import sys
 import toml
 
@@ -12,6 +14,18 @@ from collections import OrderedDict
 from toml.decoder import TomlDecoder
 from toml.encoder import TomlEncoder
 
+from cache import hash_file
+from manifest import entry_can_match
+from manifest import is_library_filename
+from manifest import load_manifest
+from manifest import note_keys
+from manifest import record_file
+from manifest import remove_entry
+from manifest import save_entry
+from manifest import stat_key
+from manifest import summarize_notes
+from note_filter import parse_filter
+
 INDEX_NAME = 'cards'
 
 class DynamicInlineTableDict(dict, InlineTableDict):
@@ -28,6 +42,8 @@ def write_toml(note_toml_data, filename):
   toml_contents = toml.dumps(note_toml_data, encoder=encoder)
   with open(filename, 'w') as f:
     f.write(toml_contents)
+  if INDEX_NAME in note_toml_data:
+    record_file(filename, note_toml_data[INDEX_NAME])
 
 unicode = str
 
@@ -85,6 +101,66 @@ class CustomTomlEncoder(TomlEncoder):
     retval = retval[:-2]
     return '[{0}]'.format(retval)
 
+KEY_LINE = re.compile(r'^([A-Za-z0-9_-]+)\s*=')
+
+def note_locations(contents):
+  """
+  { field => line number } of each note's lines, in order. The `[[cards]]`
+  header line is recorded under ''.
+  """
+  header = '[[{}]]'.format(INDEX_NAME)
+  locations = []
+  for number, line in enumerate(contents.split('\n'), 1):
+    if line.strip() == header:
+      locations.append({ '' : number })
+      continue
+    match = KEY_LINE.match(line)
+    if match and locations:
+      locations[-1].setdefault(match.group(1), number)
+  return locations
+
+# A shard of a notes file: vocab.001.toml is part of vocab.toml
+SHARD_FILENAME = re.compile(r'^(.*)\.([0-9]{3})(\.toml)$')
+
+def logical_filename(filename):
+  """
+  The notes file a shard is part of, or the filename if it isn't a shard.
+  """
+  match = SHARD_FILENAME.match(filename)
+  return match.group(1) + match.group(3) if match else filename
+
+def shard_filename(filename, number):
+  path, extension = os.path.splitext(filename)
+  return '{}.{:03d}{}'.format(path, number, extension)
+
+def logical_files(filenames):
+  """
+  { logical filename => [filename] } with each file's shards in order.
+  """
+  files = OrderedDict()
+  for filename in sorted(filenames):
+    files.setdefault(logical_filename(filename), []).append(filename)
+  return files
+
+def filename_under(filename, paths):
+  """
+  Whether a notes file is one of the paths, a shard of one, or in one of
+  the directories. The paths should be normalized.
+  """
+  return any(filename == path or logical_filename(filename) == path \
+      or filename.startswith(path + os.sep) for path in paths)
+
+def read_set(filename):
+  """
+  The non-blank lines of a file, eg. a list of words in config/.
+  """
+  lines = []
+  with open(filename, 'r') as f:
+    lines = f.readlines()
+    lines = map(lambda x: x.strip(), lines)
+    lines = filter(None, lines)
+  return set(lines)
+
 class NoteLibrary:
   def __init__(self):
     self.notes = set()
@@ -109,27 +185,83 @@ class NoteLibrary:
 
   @staticmethod
   def do_load_library():
-    all_notes = NoteLibrary.import_all_notes()
+    # NB: The manifest records each file's keys, so only changed files are parsed.
     note_word_set = set()
-    NoteLibrary.add_notes_to_set(all_notes, note_word_set)
+    for entry in NoteLibrary.manifest().values():
+      note_word_set.update(entry['keys'])
     return note_word_set
 
   @staticmethod
   def add_notes_to_set(notes, set_):
     for note in notes:
-      # NB: Words might be recorded as kanji or kana in frequency data
-      set_.add(note['kanji'])
-      set_.add(note['kana'])
-      # Also get rid of characters we might not match on
-      set_.add(note['kanji'].replace('～', ''))
-      set_.add(note['kana'].replace('～', ''))
+      # NB: Words might be recorded as kanji or kana in frequency data, and
+      # we also record them without ～ and normalized, to match variants.
+      set_.update(note_keys(note))
 
   @staticmethod
-  def import_all_notes():
-    all_notes = []
+  def note_filenames():
+    """
+    Every TOML file holding notes.
+    """
+    filenames = []
     for filename in glob.glob('**/*.toml', recursive=True):
-      if 'cardgen' in filename or 'temp/' in filename:
-        continue # XXX: Things here shouldn't be processed for now.
+      if not is_library_filename(filename):
+        continue # XXX: Things in cardgen/ and temp/ shouldn't be processed for now.
+      filenames.append(filename)
+    return filenames
+
+  @staticmethod
+  def manifest():
+    """
+    { filename => manifest entry } for every notes file, up to date. Only
+    files changed since the manifest was last saved are parsed.
+    """
+    entries = load_manifest()
+    updated = {}
+    for filename in NoteLibrary.note_filenames():
+      entry = entries.get(filename)
+      if entry and entry['stat'] == stat_key(filename):
+        updated[filename] = entry
+        continue
+      if entry and entry['hash'] == hash_file(filename):
+        entry['stat'] = stat_key(filename) # Touched, not changed
+      else:
+        try:
+          notes = NoteLibrary.read_notes_from_toml_file(filename)[INDEX_NAME]
+        except Exception as e:
+          print('Error processing file: {0}'.format(filename))
+          print(e)
+          continue
+        entry = summarize_notes(filename, notes)
+      save_entry(filename, entry)
+      updated[filename] = entry
+    for filename in set(entries) - set(updated):
+      remove_entry(filename)
+    return updated
+
+  @staticmethod
+  def filenames_matching(note_filter=None, paths=None):
+    """
+    Notes files under any of the paths holding notes that might match the
+    filter (see note_filter), from the manifest.
+    """
+    tree = parse_filter(note_filter) if note_filter else None
+    paths = [os.path.normpath(path) for path in paths or []]
+    filenames = []
+    for filename, entry in NoteLibrary.manifest().items():
+      if paths and not filename_under(filename, paths):
+        continue
+      if tree and not entry_can_match(entry, tree):
+        continue
+      filenames.append(filename)
+    return filenames
+
+  @staticmethod
+  def import_all_notes(filenames=None):
+    all_notes = []
+    if filenames is None:
+      filenames = NoteLibrary.note_filenames()
+    for filename in filenames:
       try:
         notes = NoteLibrary.read_notes_from_toml_file(filename)
         notes = notes[INDEX_NAME]
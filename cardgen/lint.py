@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+"""
+Check every note against the schema the deck generators expect.
+
+  python cardgen lint [files or directories]
+
+Problems are printed as `file:line: severity: message`. The exit status is 1
+if there are errors (or, with --strict, warnings). Files are checked in
+parallel and results are cached by file hash, so a pre-commit hook only
+re-checks the files that changed.
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import toml
+from collections import namedtuple
+
+from cache import hash_file
+from cache import hash_strings
+from cache import load_json
+from cache import save_json
+from cache import source_fingerprint
+from gloss import ADJECTIVE_GLOSSES
+from gloss import VERB_GLOSSES
+from library import INDEX_NAME
+from library import filename_under
+from library import NoteLibrary
+from library import note_locations
+from library import read_set
+
+LINT_CACHE_NAME = 'lint.json'
+
+KNOWN_TAGS_FILENAME = 'config/known-tags.txt'
+
+ERROR = 'error'
+WARNING = 'warning'
+
+Problem = namedtuple('Problem', ['filename', 'line', 'severity', 'message'])
+
+REQUIRED_FIELDS = ('kanji', 'kana', 'english')
+
+# Every field a note may have, and its type
+FIELD_TYPES = {
+  'kanji': str,
+  'kana': str,
+  'english': str,
+  'source': str,
+  'level': str,
+  'explain': str,
+  'tags': list,
+  'frequency_scores': dict,
+  'disabled': bool,
+  'note': str,
+  'alternate-readings': list,
+  # Verbs
+  'verb-type': str,
+  'verb-type2': str,
+  'transitive': bool,
+  'english-conjugated': dict,
+  # Grammar
+  'type': str,
+  'question': str,
+}
+
+LEVELS = ('n1', 'n2', 'n3', 'n4', 'n5')
+
+# The kana ending of each verb type
+VERB_TYPE_ENDINGS = {
+  'ichidan': re.compile('[いきぎしじちぢにひびぴみりえけげせぜてでねへべぺめれ]る$'),
+  'godan-u': re.compile('う$'),
+  'godan-ku': re.compile('く$'),
+  'godan-gu': re.compile('ぐ$'),
+  'godan-su': re.compile('す$'),
+  'godan-tsu': re.compile('つ$'),
+  'godan-nu': re.compile('ぬ$'),
+  'godan-bu': re.compile('ぶ$'),
+  'godan-mu': re.compile('む$'),
+  'godan-ru': re.compile('る$'),
+  'godan-aru-special': re.compile('る$'),
+  'irregular': re.compile('る$'),
+  'suru-verb': re.compile('する$'),
+}
+
+# Every {field} the verb glosses are built from
+ENGLISH_CONJUGATED_KEYS = VERB_GLOSSES.keys()
+
+# ...and the adjective glosses, for notes that aren't verbs
+ADJECTIVE_ENGLISH_CONJUGATED_KEYS = ADJECTIVE_GLOSSES.keys()
+
+def check_note(note, known_tags):
+  """
+  (field, severity, message) for every problem with a note. Problems not
+  about one field use ''.
+  """
+  problems = []
+
+  for field in REQUIRED_FIELDS:
+    if field not in note:
+      problems.append(('', ERROR, "missing required field '{}'".format(field)))
+    elif isinstance(note[field], str) and not note[field].strip():
+      problems.append((field, ERROR, "empty '{}'".format(field)))
+
+  for field, value in note.items():
+    if field not in FIELD_TYPES:
+      problems.append((field, WARNING, "unknown field '{}'".format(field)))
+    elif not isinstance(value, FIELD_TYPES[field]):
+      problems.append((field, ERROR, "'{}' should be a {}, not {!r}".format(
+          field, FIELD_TYPES[field].__name__, value)))
+
+  level = note.get('level')
+  if isinstance(level, str) and level not in LEVELS:
+    problems.append(('level', ERROR, "level {!r} is not one of {}".format(
+        level, ', '.join(LEVELS))))
+
+  verb_type = note.get('verb-type')
+  if isinstance(verb_type, str):
+    kana = str(note.get('kana', '')).replace('～', '').strip()
+    if verb_type not in VERB_TYPE_ENDINGS:
+      problems.append(('verb-type', ERROR, "unknown verb-type {!r}".format(verb_type)))
+    elif kana and not VERB_TYPE_ENDINGS[verb_type].search(kana):
+      problems.append(('verb-type', ERROR, "kana {!r} can't be a {} verb".format(
+          kana, verb_type)))
+    if 'english-conjugated' not in note:
+      problems.append(('verb-type', ERROR, "verb has no 'english-conjugated'"))
+
+  conjugated = note.get('english-conjugated')
+  if isinstance(conjugated, dict):
+    keys = ENGLISH_CONJUGATED_KEYS if 'verb-type' in note else ADJECTIVE_ENGLISH_CONJUGATED_KEYS
+    for key in keys:
+      if not str(conjugated.get(key, '')).strip():
+        problems.append(('english-conjugated', ERROR,
+            "'english-conjugated' has no '{}'".format(key)))
+    for key in conjugated:
+      if key not in keys:
+        problems.append(('english-conjugated', WARNING,
+            "unknown 'english-conjugated' key '{}'".format(key)))
+
+  tags = note.get('tags')
+  if isinstance(tags, list):
+    for tag in tags:
+      if not isinstance(tag, str) or re.search(r'\s', tag):
+        problems.append(('tags', ERROR, "tag {!r} has whitespace (Anki splits it)".format(tag)))
+      elif tag not in known_tags:
+        problems.append(('tags', WARNING, "unknown tag '{}' (see {})".format(
+            tag, KNOWN_TAGS_FILENAME)))
+
+  return problems
+
+def lint_file(filename, known_tags):
+  """
+  Every Problem in a notes file.
+  """
+  with open(filename, 'r') as f:
+    contents = f.read()
+  try:
+    notes = toml.loads(contents)
+  except toml.TomlDecodeError as e:
+    return [Problem(filename, e.lineno, ERROR, 'invalid TOML: {}'.format(e.msg))]
+  if INDEX_NAME not in notes:
+    return [Problem(filename, 1, ERROR, "no [[{}]]".format(INDEX_NAME))]
+
+  locations = note_locations(contents)
+  problems = []
+  for i, note in enumerate(notes[INDEX_NAME]):
+    lines = locations[i] if i < len(locations) else { '' : 1 }
+    for field, severity, message in check_note(note, known_tags):
+      line = lines.get(field, lines[''])
+      problems.append(Problem(filename, line, severity, message))
+  return problems
+
+# Set in each pool worker by _init_worker()
+_known_tags = None
+
+def _init_worker(known_tags):
+  global _known_tags
+  _known_tags = known_tags
+
+def _lint_file(filename):
+  return filename, lint_file(filename, _known_tags)
+
+def lint_fingerprint():
+  """
+  Changes whenever the checks, the modules they use (eg. the glosses) or the
+  known tags do.
+  """
+  return hash_strings(source_fingerprint(__file__), hash_file(KNOWN_TAGS_FILENAME))
+
+def lint_files(filenames, processes=None):
+  """
+  { filename => [Problem] }. Only files that changed since they were last
+  checked are read.
+  """
+  fingerprint = lint_fingerprint()
+  cache = load_json(LINT_CACHE_NAME)
+  if not cache or cache.get('fingerprint') != fingerprint:
+    cache = { 'fingerprint': fingerprint, 'files': {} }
+
+  results = {}
+  hashes = {}
+  stale = []
+  for filename in filenames:
+    hashes[filename] = hash_file(filename)
+    cached = cache['files'].get(filename)
+    if cached and cached['hash'] == hashes[filename]:
+      results[filename] = [Problem(*problem) for problem in cached['problems']]
+    else:
+      stale.append(filename)
+
+  if stale:
+    known_tags = read_set(KNOWN_TAGS_FILENAME)
+    if len(stale) == 1:
+      results[stale[0]] = lint_file(stale[0], known_tags)
+    else:
+      with multiprocessing.Pool(processes, _init_worker, (known_tags,)) as pool:
+        for filename, problems in pool.imap_unordered(_lint_file, stale):
+          results[filename] = problems
+    for filename in stale:
+      cache['files'][filename] = {
+        'hash': hashes[filename],
+        'problems': [list(problem) for problem in results[filename]],
+      }
+    save_json(LINT_CACHE_NAME, cache)
+
+  return results
+
+def lint_filenames(paths):
+  """
+  Notes files under the paths, or every notes file.
+  """
+  filenames = NoteLibrary.note_filenames()
+  if not paths:
+    return filenames
+  paths = [os.path.normpath(path) for path in paths]
+  return [filename for filename in filenames if filename_under(filename, paths)]
+
+def main():
+  parser = argparse.ArgumentParser(description='Check notes files for problems')
+  parser.add_argument('paths', nargs='*',
+      help='notes files or directories to check (default: all)')
+  parser.add_argument('--strict', dest='strict', action='store_true',
+      help='fail on warnings as well as errors')
+  parser.add_argument('--processes', dest='processes', type=int,
+      help='number of worker processes (default: all cores)')
+  args = parser.parse_args()
+
+  filenames = lint_filenames(args.paths)
+  results = lint_files(filenames, args.processes)
+
+  counts = { ERROR: 0, WARNING: 0 }
+  for filename in filenames:
+    for problem in sorted(results[filename], key=lambda problem: problem.line):
+      print('{}:{}: {}: {}'.format(*problem))
+      counts[problem.severity] += 1
+
+  print('{} files, {} errors, {} warnings'.format(len(filenames), counts[ERROR],
+      counts[WARNING]))
+  if counts[ERROR] or (args.strict and counts[WARNING]):
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,154 @@
+"""
+A summary of every notes file, so work that only needs some of the files can
+skip parsing the rest.
+
+Each entry records a file's content hash, note count, the levels, tags and
+sources present (with the number of notes for each), and the keys the file
+adds to a NoteLibrary. library.write_toml updates a file's entry as it
+writes it, if it's a library file (not an export or temporary file). Files
+changed any other way are re-summarized on the next NoteLibrary.manifest().
+"""
+
+import os
+
+from cache import cache_path
+from cache import hash_file
+from cache import hash_strings
+from cache import load_json
+from cache import save_json
+from normalize import normalized_keys
+from normalize import rules_fingerprint
+
+# One JSON entry per notes file, so writing a file only rewrites its entry
+MANIFEST_DIRECTORY = 'manifest'
+
+# Bump when entries change shape. Old manifests are rebuilt.
+MANIFEST_VERSION = 1
+
+def is_library_filename(filename):
+  """
+  Whether NoteLibrary.note_filenames() lists a file: a TOML file under the
+  working directory, outside of hidden directories, cardgen/ and temp/.
+  """
+  filename = os.path.normpath(filename)
+  if not filename.endswith('.toml') or os.path.isabs(filename):
+    return False
+  if any(part.startswith('.') for part in filename.split(os.sep)):
+    return False # Also outside the working directory
+  return 'cardgen' not in filename and 'temp/' not in filename
+
+def stat_key(filename):
+  stat = os.stat(filename)
+  return [stat.st_size, stat.st_mtime_ns]
+
+def note_keys(note):
+  """
+  Every word NoteLibrary.add_notes_to_set records for a note.
+  """
+  keys = set()
+  for field in ('kanji', 'kana'):
+    if field in note:
+      keys.add(note[field])
+      keys.add(note[field].replace('～', ''))
+      keys.update(normalized_keys(note[field]))
+  return keys
+
+def _count(counts, value):
+  counts[value] = counts.get(value, 0) + 1
+
+def summarize_notes(filename, notes):
+  """
+  Manifest entry of a file as it is on disk, which holds the notes.
+  """
+  levels = {}
+  tags = {}
+  sources = {}
+  keys = set()
+  for note in notes:
+    if note.get('level'):
+      _count(levels, note['level'])
+    for tag in set(note.get('tags', [])):
+      _count(tags, tag)
+    if note.get('source'):
+      _count(sources, note['source'])
+    keys.update(note_keys(note))
+  return {
+    'hash': hash_file(filename),
+    'stat': stat_key(filename),
+    'notes': len(notes),
+    'levels': levels,
+    'tags': tags,
+    'sources': sources,
+    'keys': sorted(keys),
+  }
+
+def entry_name(filename):
+  return '{}/{}.json'.format(MANIFEST_DIRECTORY, hash_strings(filename))
+
+def load_manifest():
+  """
+  { filename => entry }, possibly stale. See NoteLibrary.manifest().
+  """
+  entries = {}
+  rules = rules_fingerprint()
+  directory = cache_path(MANIFEST_DIRECTORY)
+  if not os.path.isdir(directory):
+    return entries
+  for name in sorted(os.listdir(directory)):
+    if not name.endswith('.json'):
+      continue
+    entry = load_json('{}/{}'.format(MANIFEST_DIRECTORY, name))
+    # NB: Entries hold normalized keys, so they're stale when the rules change.
+    if entry and entry.get('version') == MANIFEST_VERSION and entry.get('rules') == rules:
+      entries[entry['filename']] = entry
+  return entries
+
+def save_entry(filename, entry):
+  os.makedirs(cache_path(MANIFEST_DIRECTORY), exist_ok=True)
+  entry['filename'] = filename
+  entry['version'] = MANIFEST_VERSION
+  entry['rules'] = rules_fingerprint()
+  save_json(entry_name(filename), entry)
+
+def remove_entry(filename):
+  try:
+    os.remove(cache_path(entry_name(filename)))
+  except FileNotFoundError:
+    pass
+
+def record_file(filename, notes):
+  """
+  Update the entry of a file that was just written. Files outside the
+  library, like exports, aren't recorded.
+  """
+  if not is_library_filename(filename):
+    return
+  # NB: Keyed by the path as NoteLibrary.note_filenames() spells it.
+  filename = os.path.normpath(filename)
+  save_entry(filename, summarize_notes(filename, notes))
+
+# Manifest field of each filter field (see note_filter)
+FILTER_FIELDS = {
+  'level': 'levels',
+  'tag': 'tags',
+  'source': 'sources',
+}
+
+def entry_can_match(entry, tree):
+  """
+  Whether any note of the file might match a parsed filter. Never wrongly
+  False, but sometimes wrongly True: the entry doesn't say which notes
+  share tags.
+  """
+  if tree[0] == 'term':
+    return entry[FILTER_FIELDS[tree[1]]].get(tree[2], 0) > 0
+  if tree[0] == 'not':
+    if tree[1][0] == 'term':
+      # Unless every note has the term
+      return entry[FILTER_FIELDS[tree[1][1]]].get(tree[1][2], 0) < entry['notes']
+    return entry['notes'] > 0
+  if tree[0] == 'and':
+    return entry_can_match(entry, tree[1]) and entry_can_match(entry, tree[2])
+  if tree[0] == 'or':
+    return entry_can_match(entry, tree[1]) or entry_can_match(entry, tree[2])
+  raise Exception('Bad filter node: {}'.format(tree))
@@ -0,0 +1,166 @@
+"""
+Find the most frequent words that aren't in the note library yet.
+
+Words are streamed in rank order and filtered as they go, so asking for the
+top K missing words only reads as far into a list as it has to, and always
+returns K words (unless the list runs out).
+"""
+
+import csv
+import json
+import os
+import string
+import sys
+from collections import OrderedDict
+from itertools import islice
+
+from cache import cache_path
+from constants import IGNORE_SET
+from frequency_scoring import DEFAULT_METHOD
+
+# Pseudo-source for the combined score across every frequency list
+COMBINED_SOURCE = 'combined'
+
+TEXT = 'text'
+TSV = 'tsv'
+JSON = 'json'
+
+OUTPUT_FORMATS = [TEXT, TSV, JSON]
+
+# Word sets checked, in order, to fill in a missing word's JLPT level
+JLPT_LEVELS = OrderedDict([
+  ('n5', 'jlpt_n5'),
+  ('n4', 'jlpt_n4'),
+  ('n3', 'jlpt_n3'),
+])
+
+# Lists with a reading for each word, as kanji, kana, ... rows
+READING_LISTS = [
+  'lists/jlpt_n5_n4_wiktionary.tsv',
+  'lists/jlpt_n4_tanos.tsv',
+  'lists/jlpt_n3_wiktionary.tsv',
+]
+
+# Smallest batch pulled from the combined scores at a time
+MIN_BATCH_SIZE = 64
+
+def ranked_source_words(frequency_index, source):
+  """
+  (word, rank) pairs of one frequency list, in its precomputed rank order.
+  """
+  return frequency_index.ordered(source)
+
+def ranked_combined_words(combined_scores, method=DEFAULT_METHOD, batch_size=MIN_BATCH_SIZE):
+  """
+  (word, score) pairs by combined score. The head of the ordering is selected
+  in batches that double in size, so only a few batches are ever sorted.
+  """
+  words = combined_scores.index.words
+  scores = combined_scores.scores[method]
+  yielded = 0
+  while yielded < len(words):
+    batch_size = max(batch_size, yielded * 2)
+    for i in combined_scores.head(batch_size, method)[yielded:]:
+      yield words[i], float(scores[i])
+      yielded += 1
+
+def is_ignored_word(word, ignore=IGNORE_SET):
+  """
+  Whether a word is never worth a note: single kana, symbols and the rest of
+  `ignore`, and latin letters or digits.
+  """
+  return word in ignore \
+      or word in string.ascii_letters \
+      or word in string.digits
+
+def top_missing_words(ranked_words, library_words, limit=None, ignore=IGNORE_SET):
+  """
+  The first `limit` (word, rank) pairs whose word isn't in the library.
+  """
+  missing = ((word, rank) for word, rank in ranked_words \
+      if not is_ignored_word(word, ignore) and word not in library_words)
+  return list(islice(missing, limit))
+
+def is_kana(word):
+  return all('぀' <= c <= 'ヿ' for c in word)
+
+def load_readings(filenames=READING_LISTS):
+  """
+  { word => kana } from the reading lists. The first list with a word wins.
+  """
+  readings = {}
+  for filename in filenames:
+    with open(filename, newline='') as fd:
+      for row in csv.reader(fd, delimiter='\t', quotechar='"'):
+        if len(row) >= 2 and row[0].strip() and row[1].strip():
+          readings.setdefault(row[0].strip(), row[1].strip())
+  return readings
+
+class WordReadings:
+  """
+  The kana of a word: the word itself if it's kana, else from the reading
+  lists, else from the JMdict index if one has been built (see jmdict.py).
+  Words with no known reading get ''.
+  """
+  def __init__(self, readings=None, dictionary=None):
+    self.readings = load_readings() if readings is None else readings
+    self.dictionary = dictionary
+    if dictionary is None:
+      # NB: Imported here, so the index is optional.
+      from jmdict import DATABASE_NAME
+      from jmdict import Dictionary
+      if os.path.exists(cache_path(DATABASE_NAME)):
+        self.dictionary = Dictionary()
+
+  def __call__(self, word):
+    if is_kana(word):
+      return word
+    if word in self.readings:
+      return self.readings[word]
+    if self.dictionary:
+      readings = self.dictionary.readings(word)
+      if readings:
+        return readings[0]
+    return ''
+
+def jlpt_level(word, vocabulary_sets):
+  for level, set_name in JLPT_LEVELS.items():
+    if word in vocabulary_sets[set_name]:
+      return level
+  return ''
+
+def write_missing_words(missing, output_format=TEXT, vocabulary_sets=None, out=sys.stdout,
+    reading=None):
+  """
+  Write (word, rank) pairs as plain text, as JSON, or as TSV rows that
+  tsv_import.py can turn into blank notes (kanji, kana, english, level).
+  reading gives each word's kana (see WordReadings). Kanji words with no
+  known reading are written with an empty kana, to fill in by hand.
+  """
+  if output_format == TEXT:
+    for word, rank in missing:
+      if isinstance(rank, float):
+        out.write(u'{:.5f} : {}\n'.format(rank, word))
+      else:
+        out.write(u'{:<5} : {}\n'.format(rank, word))
+    return
+
+  rows = []
+  for word, rank in missing:
+    rows.append(OrderedDict([
+      ('kanji', word),
+      ('kana', reading(word) if reading else (word if is_kana(word) else '')),
+      ('english', ''),
+      ('level', jlpt_level(word, vocabulary_sets) if vocabulary_sets else ''),
+      ('rank', rank),
+    ]))
+
+  if output_format == JSON:
+    json.dump(rows, out, ensure_ascii=False, indent=2)
+    out.write('\n')
+  elif output_format == TSV:
+    writer = csv.writer(out, delimiter='\t', quotechar='"', lineterminator='\n')
+    for row in rows:
+      writer.writerow([row['kanji'], row['kana'], row['english'], row['level']])
+  else:
+    raise Exception('Unknown output format: {}'.format(output_format))
@@ -0,0 +1,16 @@
+import unittest
+
+from missing_words import top_missing_words
+
+class TestTopMissingWords(unittest.TestCase):
+
+  def test_skips_library_words(self):
+    ranked = [('猫', 1), ('犬', 2), ('鳥', 3)]
+    self.assertEqual(top_missing_words(ranked, {'犬'}, limit=2), [('猫', 1), ('鳥', 3)])
+
+  def test_skips_kana_latin_letters_and_digits(self):
+    ranked = [('e', 0.9), ('の', 0.8), ('o', 0.7), ('1', 0.6), ('猫', 0.5), ('A', 0.4)]
+    self.assertEqual(top_missing_words(ranked, set()), [('猫', 0.5)])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,81 @@
+"""
+Normalized keys for matching words across notes and word lists.
+
+The same word is written differently across sources: with katakana for some
+of its kana (ゴミ箱, ごみ箱), with an honorific お/ご, as a `～` counter, or as a
+`・する` verb. Every word is reduced to a set of keys once (when the index or
+the library is built), and two words match when they share a key.
+
+Words written only in kana keep their script: katakana words are mostly
+loanwords and names, which clash with unrelated hiragana words (マン, まん).
+They keep their `～` too, so a counter (～はい) never matches a word (はい).
+"""
+
+import re
+
+from cache import hash_file
+
+# ァ..ヶ fold to ぁ..ゖ. Marks like ー and ・ are kept.
+KANA_FOLD = str.maketrans({ chr(c) : chr(c - 0x60) for c in range(0x30A1, 0x30F7) })
+
+# Characters that are dropped everywhere (wave dashes mark counters and affixes)
+STRIP_CHARACTERS = str.maketrans('', '', '～〜 ')
+
+# Words written only in kana keep their wave dash, in one form
+KANA_STRIP_CHARACTERS = str.maketrans({ '〜' : '～', ' ' : None })
+
+# Alternate forms are separated with `/`, as in the JLPT lists.
+ALTERNATE_SEPARATOR = '/'
+
+KANJI = '[㐀-䶿一-鿿々]'
+
+# (pattern, replacement, minimum stem length), applied to the folded word. A
+# rule only produces a key if it changed the word and the stem is long enough.
+AFFIX_RULES = [
+  # する verbs: 勉強・する, 勉強する -> 勉強 (but not 愛する -> 愛)
+  (re.compile('・?する$'), '', 2),
+  # Honorific prefixes before kanji: お茶 -> 茶, ご飯 -> 飯
+  (re.compile('^[おご](?={})'.format(KANJI)), '', 1),
+]
+
+# Stems written only in kana need to be longer to stay distinctive
+# (eg. たいする -> たい would match the たい of 飲みたい).
+MIN_KANA_STEM = 3
+
+KANA_ONLY = re.compile('^[぀-ゟ゠-ヿ]+$')
+
+def fold_kana(word):
+  """
+  Katakana folded to hiragana, with affix markers removed.
+  """
+  return word.translate(STRIP_CHARACTERS).translate(KANA_FOLD)
+
+def normalized_keys(word):
+  """
+  Every key a word can be matched by. The first key is the folded word, or
+  for kana only words, the word as written.
+  """
+  keys = []
+  for alternate in word.split(ALTERNATE_SEPARATOR):
+    folded = alternate.strip().translate(STRIP_CHARACTERS)
+    if KANA_ONLY.match(folded):
+      folded = alternate.strip().translate(KANA_STRIP_CHARACTERS)
+    else:
+      folded = folded.translate(KANA_FOLD)
+    if not folded:
+      continue
+    if folded not in keys:
+      keys.append(folded)
+    for pattern, replacement, min_stem in AFFIX_RULES:
+      stem = pattern.sub(replacement, folded)
+      if KANA_ONLY.match(stem):
+        min_stem = max(min_stem, MIN_KANA_STEM)
+      if stem != folded and len(stem) >= min_stem and stem not in keys:
+        keys.append(stem)
+  return keys
+
+def rules_fingerprint():
+  """
+  Changes whenever the normalization rules do, for caches of normalized keys.
+  """
+  return hash_file(__file__)
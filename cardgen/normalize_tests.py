@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from frequency_index import FrequencyIndex
+from normalize import normalized_keys
+
+class TestNormalizedKeys(unittest.TestCase):
+
+  def test_kana_only_words_keep_their_script(self):
+    self.assertEqual(normalized_keys('マン'), ['マン'])
+    self.assertEqual(normalized_keys('まん'), ['まん'])
+    self.assertEqual(normalized_keys('～さん'), ['～さん'])
+
+  def test_kana_counters_dont_match_words(self):
+    self.assertEqual(normalized_keys('～はい'), ['～はい'])
+    self.assertEqual(normalized_keys('〜ひき'), ['～ひき'])
+    self.assertNotIn('はい', normalized_keys('～はい'))
+    self.assertEqual(normalized_keys('～匹'), ['匹'])
+
+  def test_words_with_kanji_fold_katakana(self):
+    self.assertEqual(normalized_keys('ゴミ箱'), ['ごみ箱'])
+    self.assertEqual(normalized_keys('お茶'), ['お茶', '茶'])
+    self.assertEqual(normalized_keys('勉強する'), ['勉強する', '勉強'])
+
+class TestFrequencyIndexMatching(unittest.TestCase):
+
+  def setUp(self):
+    fd, self.filename = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(fd, 'w') as f:
+      f.write('マン\n万\nごみ箱\n')
+    self.index = FrequencyIndex.build(OrderedDict([('test', self.filename)]))
+
+  def tearDown(self):
+    os.remove(self.filename)
+
+  def test_hiragana_note_doesnt_match_katakana_word(self):
+    # 万 (まん) must not be scored as マン
+    self.assertEqual(dict(self.index.normalized_scores(normalized_keys('まん'))), {})
+    self.assertEqual(self.index.matching_ids(set(normalized_keys('まん'))), set())
+
+  def test_katakana_in_kanji_words_still_matches(self):
+    self.assertEqual(dict(self.index.normalized_scores(normalized_keys('ゴミ箱'))), { 'test': 2 })
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,161 @@
+"""
+Filter notes by tag, level and source with expressions like
+
+  level:n5 & tag:food & !tag:uncommon
+  (level:n4 | level:n5) & tag:noun
+
+`&` binds tighter than `|`, and `!` negates. Values run up to the next
+space, operator or parenthesis.
+
+NoteIndex maps every tag, level and source to a bitset of note positions
+(a Python int), so an expression is evaluated with a handful of bitwise
+operations however many notes it matches.
+"""
+
+import re
+
+FIELDS = ('tag', 'level', 'source')
+
+TOKEN = re.compile(r'\s*(?:([&|!()])|(\w+):([^\s&|!()]+))')
+
+def parse_filter(expression):
+  """
+  Parse an expression into a tree of tuples:
+    ('term', field, value), ('not', a), ('and', a, b), ('or', a, b)
+  """
+  tokens = []
+  position = 0
+  expression = expression.strip()
+  while position < len(expression):
+    match = TOKEN.match(expression, position)
+    if not match:
+      raise Exception('Bad filter at "{}": {}'.format(expression[position:], expression))
+    if match.group(1):
+      tokens.append(match.group(1))
+    else:
+      field = match.group(2)
+      if field not in FIELDS:
+        raise Exception('Unknown filter field "{}" (expected one of {})'.format(
+            field, ', '.join(FIELDS)))
+      tokens.append(('term', field, match.group(3)))
+    position = match.end()
+
+  def peek():
+    return tokens[0] if tokens else None
+
+  def parse_or():
+    node = parse_and()
+    while peek() == '|':
+      tokens.pop(0)
+      node = ('or', node, parse_and())
+    return node
+
+  def parse_and():
+    node = parse_not()
+    while peek() == '&':
+      tokens.pop(0)
+      node = ('and', node, parse_not())
+    return node
+
+  def parse_not():
+    token = tokens.pop(0) if tokens else None
+    if token == '!':
+      return ('not', parse_not())
+    if token == '(':
+      node = parse_or()
+      if not tokens or tokens.pop(0) != ')':
+        raise Exception('Missing ")" in filter: {}'.format(expression))
+      return node
+    if isinstance(token, tuple):
+      return token
+    raise Exception('Expected a term in filter: {}'.format(expression))
+
+  tree = parse_or()
+  if tokens:
+    token = tokens[0]
+    if isinstance(token, tuple):
+      token = '{}:{}'.format(*token[1:])
+    raise Exception('Unexpected "{}" in filter (join terms with & or |): {}'.format(
+        token, expression))
+  return tree
+
+def note_terms(note):
+  """
+  Every (field, value) term a note matches.
+  """
+  terms = [('tag', tag) for tag in note.get('tags', [])]
+  if note.get('level'):
+    terms.append(('level', note['level']))
+  if note.get('source'):
+    terms.append(('source', note['source']))
+  return terms
+
+def bit_count(bits):
+  return bin(bits).count('1')
+
+def bit_positions(bits):
+  """
+  Positions of the set bits, lowest first.
+  """
+  data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+  for byte_index, byte in enumerate(data):
+    if not byte:
+      continue
+    for bit in range(8):
+      if byte & (1 << bit):
+        yield byte_index * 8 + bit
+
+class NoteIndex:
+  def __init__(self, notes):
+    """
+    Inverted index of notes, which are referred to by their position.
+    """
+    self.notes = notes
+    self.all_bits = (1 << len(notes)) - 1
+    # (field, value) => bitset of notes
+    self.postings = {}
+    bitmaps = {}
+    size = (len(notes) + 7) // 8
+    for i, note in enumerate(notes):
+      for term in note_terms(note):
+        if term not in bitmaps:
+          bitmaps[term] = bytearray(size)
+        bitmaps[term][i >> 3] |= 1 << (i & 7)
+    for term, bitmap in bitmaps.items():
+      self.postings[term] = int.from_bytes(bitmap, 'little')
+
+  def __len__(self):
+    return len(self.notes)
+
+  def evaluate(self, tree):
+    """
+    Bitset of the notes matching a parsed filter.
+    """
+    if tree[0] == 'term':
+      return self.postings.get(tree[1:], 0)
+    if tree[0] == 'not':
+      return self.all_bits & ~self.evaluate(tree[1])
+    if tree[0] == 'and':
+      return self.evaluate(tree[1]) & self.evaluate(tree[2])
+    if tree[0] == 'or':
+      return self.evaluate(tree[1]) | self.evaluate(tree[2])
+    raise Exception('Bad filter node: {}'.format(tree))
+
+  def select(self, expression):
+    return self.evaluate(parse_filter(expression))
+
+  def count(self, expression):
+    return bit_count(self.select(expression))
+
+  def matching(self, expression):
+    """
+    Notes matching an expression, in their original order.
+    """
+    return [self.notes[i] for i in bit_positions(self.select(expression))]
+
+  def values(self, field):
+    """
+    Every value of a field, with its note count.
+    """
+    return sorted((value, bit_count(bits)) \
+        for (term_field, value), bits in self.postings.items() if term_field == field)
@@ -0,0 +1,80 @@
+import unittest
+
+from manifest import entry_can_match
+from manifest import summarize_notes
+from note_filter import NoteIndex
+from note_filter import parse_filter
+
+NOTES = [
+  { 'kanji': '猫', 'level': 'n5', 'tags': ['noun', 'animal'] },
+  { 'kanji': '犬', 'level': 'n5', 'tags': ['noun', 'animal', 'uncommon'] },
+  { 'kanji': '食べる', 'level': 'n5', 'tags': ['verb'] },
+  { 'kanji': '鯨', 'level': 'n3', 'tags': ['noun', 'animal'] },
+]
+
+def kanji(notes):
+  return [note['kanji'] for note in notes]
+
+class TestParseFilter(unittest.TestCase):
+
+  def test_and_binds_tighter_than_or(self):
+    self.assertEqual(parse_filter('level:n3 | tag:noun & !tag:animal'),
+        ('or', ('term', 'level', 'n3'),
+            ('and', ('term', 'tag', 'noun'), ('not', ('term', 'tag', 'animal')))))
+    self.assertEqual(parse_filter('tag:noun & tag:animal | level:n3'),
+        ('or', ('and', ('term', 'tag', 'noun'), ('term', 'tag', 'animal')),
+            ('term', 'level', 'n3')))
+
+  def test_not_binds_tightest(self):
+    self.assertEqual(parse_filter('!tag:noun & tag:verb'),
+        ('and', ('not', ('term', 'tag', 'noun')), ('term', 'tag', 'verb')))
+    self.assertEqual(parse_filter('!(tag:noun & tag:verb)'),
+        ('not', ('and', ('term', 'tag', 'noun'), ('term', 'tag', 'verb'))))
+
+  def test_operators_are_left_associative(self):
+    self.assertEqual(parse_filter('tag:a | tag:b | tag:c'),
+        ('or', ('or', ('term', 'tag', 'a'), ('term', 'tag', 'b')), ('term', 'tag', 'c')))
+
+  def test_bad_filters(self):
+    for expression in ['tag:noun tag:verb', '(tag:noun', 'tag:noun &', 'kind:noun', '!']:
+      with self.assertRaises(Exception):
+        parse_filter(expression)
+
+class TestNoteIndex(unittest.TestCase):
+
+  def test_precedence(self):
+    index = NoteIndex(NOTES)
+    self.assertEqual(kanji(index.matching('tag:verb | tag:animal & !tag:uncommon')),
+        ['猫', '食べる', '鯨'])
+    self.assertEqual(kanji(index.matching('(tag:verb | tag:animal) & level:n3')), ['鯨'])
+    self.assertEqual(kanji(index.matching('tag:verb | tag:animal & level:n3')), ['食べる', '鯨'])
+
+  def test_unknown_values_match_nothing(self):
+    index = NoteIndex(NOTES)
+    self.assertEqual(index.count('tag:plant'), 0)
+    self.assertEqual(index.count('!tag:plant'), len(NOTES))
+
+class TestEntryCanMatch(unittest.TestCase):
+
+  def entry(self, notes):
+    # NB: Only the hash and stat are of the file.
+    return summarize_notes(__file__, notes)
+
+  def test_never_wrongly_false(self):
+    entry = self.entry(NOTES)
+    index = NoteIndex(NOTES)
+    for expression in ['tag:verb | tag:animal & !tag:uncommon', '!tag:noun & level:n5',
+        '(tag:verb | level:n3) & !tag:animal', 'level:n4 | !tag:noun']:
+      if index.count(expression):
+        self.assertTrue(entry_can_match(entry, parse_filter(expression)), expression)
+
+  def test_skips_files_by_precedence(self):
+    entry = self.entry(NOTES[:2])
+    # No note is n3, but one is a noun
+    self.assertFalse(entry_can_match(entry, parse_filter('(tag:verb | tag:noun) & level:n3')))
+    self.assertTrue(entry_can_match(entry, parse_filter('tag:verb | tag:noun & level:n5')))
+    # Every note is a noun
+    self.assertFalse(entry_can_match(entry, parse_filter('!tag:noun')))
+
+if __name__ == '__main__':
+  unittest.main()
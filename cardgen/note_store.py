@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+
+"""
+An indexed SQLite mirror of the TOML note library.
+
+The TOML files stay the source of truth. The database is a disposable cache
+(in .cache/) that sync() keeps up to date by file hash, so only files that
+changed are re-read. Every note keeps its complete fields, in order, so any
+file can be exported back through library.write_toml byte for byte.
+
+  ./cardgen/note_store.py sync
+  ./cardgen/note_store.py find --level n4 --tag noun --tag food --source anime --max-rank 5000
+  ./cardgen/note_store.py query "SELECT level, count(*) FROM notes GROUP BY level"
+  ./cardgen/note_store.py export vocabulary/colors.toml --output /tmp/colors.toml
+  ./cardgen/note_store.py verify
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+from collections import OrderedDict
+
+from cache import cache_path
+from cache import hash_file
+from library import DynamicInlineTableDict
+from library import INDEX_NAME
+from library import NoteLibrary
+from library import write_toml
+
+DATABASE_NAME = 'notes.sqlite'
+
+# Bump when the schema changes. Old databases are rebuilt from scratch.
+SCHEMA_VERSION = 1
+
+FREQUENCY_FIELD = 'frequency_scores'
+
+SCHEMA = '''
+CREATE TABLE source_files (
+  id INTEGER PRIMARY KEY,
+  filename TEXT NOT NULL UNIQUE,
+  hash TEXT NOT NULL
+);
+
+CREATE TABLE notes (
+  id INTEGER PRIMARY KEY,
+  file_id INTEGER NOT NULL REFERENCES source_files(id) ON DELETE CASCADE,
+  position INTEGER NOT NULL,
+  kanji TEXT,
+  kana TEXT,
+  english TEXT,
+  level TEXT,
+  fields TEXT NOT NULL -- Every field of the note, in order, as JSON
+);
+
+CREATE TABLE tags (
+  note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+  tag TEXT NOT NULL
+);
+
+CREATE TABLE frequency_scores (
+  note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+  source TEXT NOT NULL,
+  rank INTEGER NOT NULL
+);
+
+CREATE INDEX notes_file ON notes(file_id, position);
+CREATE INDEX notes_kanji ON notes(kanji);
+CREATE INDEX notes_kana ON notes(kana);
+CREATE INDEX notes_level ON notes(level);
+CREATE INDEX tags_tag ON tags(tag, note_id);
+CREATE INDEX tags_note ON tags(note_id);
+CREATE INDEX frequency_scores_source ON frequency_scores(source, rank, note_id);
+CREATE INDEX frequency_scores_note ON frequency_scores(note_id);
+'''
+
+def _restore_inline_tables(value):
+  """
+  JSON decodes tables as plain dicts; TOML needs to know to write them inline.
+  """
+  if isinstance(value, dict):
+    return DynamicInlineTableDict((key, _restore_inline_tables(item)) \
+        for key, item in value.items())
+  if isinstance(value, list):
+    return [_restore_inline_tables(item) for item in value]
+  return value
+
+class NoteStore:
+  def __init__(self, filename=None):
+    self.filename = filename or cache_path(DATABASE_NAME)
+    self.connection = sqlite3.connect(self.filename)
+    self.connection.row_factory = sqlite3.Row
+    self.connection.execute('PRAGMA foreign_keys = ON')
+    self._ensure_schema()
+
+  def _ensure_schema(self):
+    version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+    if version == SCHEMA_VERSION:
+      return
+    with self.connection:
+      tables = [row[0] for row in self.connection.execute(
+          "SELECT name FROM sqlite_master WHERE type = 'table'")]
+      for table in tables:
+        self.connection.execute('DROP TABLE {}'.format(table))
+      self.connection.executescript(SCHEMA)
+      self.connection.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+
+  def close(self):
+    self.connection.close()
+
+  def sync(self, filenames=None):
+    """
+    Bring the database up to date with the notes files. Returns the files
+    that were (re)loaded and the files that were removed.
+    """
+    filenames = filenames if filenames is not None else NoteLibrary.note_filenames()
+    stored = { row['filename'] : (row['id'], row['hash']) for row in \
+        self.connection.execute('SELECT id, filename, hash FROM source_files') }
+
+    loaded = []
+    with self.connection:
+      for filename in sorted(filenames):
+        file_hash = hash_file(filename)
+        if filename in stored and stored[filename][1] == file_hash:
+          continue
+        try:
+          notes = NoteLibrary.read_notes_from_toml_file(filename)[INDEX_NAME]
+        except Exception as e:
+          print('Error processing file: {0}'.format(filename))
+          print(e)
+          continue
+        if filename in stored:
+          self.connection.execute('DELETE FROM source_files WHERE id = ?',
+              (stored[filename][0],))
+        self._insert_file(filename, file_hash, notes)
+        loaded.append(filename)
+
+      removed = sorted(set(stored) - set(filenames))
+      for filename in removed:
+        self.connection.execute('DELETE FROM source_files WHERE id = ?',
+            (stored[filename][0],))
+
+    return loaded, removed
+
+  def _insert_file(self, filename, file_hash, notes):
+    file_id = self.connection.execute(
+        'INSERT INTO source_files (filename, hash) VALUES (?, ?)',
+        (filename, file_hash)).lastrowid
+    for position, note in enumerate(notes):
+      note_id = self.connection.execute(
+          'INSERT INTO notes (file_id, position, kanji, kana, english, level, fields) '
+          'VALUES (?, ?, ?, ?, ?, ?, ?)',
+          (file_id, position, note.get('kanji'), note.get('kana'), note.get('english'),
+              note.get('level'), json.dumps(note, ensure_ascii=False))).lastrowid
+      self.connection.executemany('INSERT INTO tags (note_id, tag) VALUES (?, ?)',
+          [(note_id, tag) for tag in note.get('tags', [])])
+      self.connection.executemany(
+          'INSERT INTO frequency_scores (note_id, source, rank) VALUES (?, ?, ?)',
+          [(note_id, source, rank) for source, rank in note.get(FREQUENCY_FIELD, {}).items()])
+
+  def query(self, sql, parameters=()):
+    return self.connection.execute(sql, parameters).fetchall()
+
+  def find_notes(self, level=None, tags=(), source=None, max_rank=None):
+    """
+    Notes with the level, every one of the tags, and (if given) a rank in
+    the source better than max_rank, as OrderedDicts in library order.
+    """
+    joins = []
+    join_parameters = []
+    conditions = []
+    parameters = []
+    for i, tag in enumerate(tags):
+      joins.append('JOIN tags t{0} ON t{0}.note_id = notes.id AND t{0}.tag = ?'.format(i))
+      join_parameters.append(tag)
+    if source:
+      joins.append('JOIN frequency_scores f ON f.note_id = notes.id AND f.source = ?')
+      join_parameters.append(source)
+      if max_rank is not None:
+        conditions.append('f.rank < ?')
+        parameters.append(max_rank)
+    if level:
+      conditions.append('notes.level = ?')
+      parameters.append(level)
+
+    sql = 'SELECT notes.fields FROM notes JOIN source_files ON source_files.id = notes.file_id '
+    sql += ' '.join(joins)
+    if conditions:
+      sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY source_files.filename, notes.position'
+    return [json.loads(row['fields'], object_pairs_hook=OrderedDict) \
+        for row in self.connection.execute(sql, join_parameters + parameters)]
+
+  def file_notes(self, filename):
+    """
+    A file's notes as read_notes_from_toml_file would return them.
+    """
+    rows = self.connection.execute(
+        'SELECT notes.fields FROM notes JOIN source_files ON source_files.id = notes.file_id '
+        'WHERE source_files.filename = ? ORDER BY notes.position', (filename,)).fetchall()
+    if not rows:
+      known = self.connection.execute('SELECT 1 FROM source_files WHERE filename = ?',
+          (filename,)).fetchone()
+      if not known:
+        raise Exception('Not in the note store: {}'.format(filename))
+    notes = []
+    for row in rows:
+      fields = json.loads(row['fields'], object_pairs_hook=OrderedDict)
+      notes.append(OrderedDict((key, _restore_inline_tables(value)) \
+          for key, value in fields.items()))
+    return { INDEX_NAME : notes }
+
+  def export_file(self, filename, output):
+    write_toml(self.file_notes(filename), output)
+
+  def verify(self):
+    """
+    Files whose export differs from the file on disk. Call sync() first.
+    """
+    mismatched = []
+    with tempfile.TemporaryDirectory() as directory:
+      output = os.path.join(directory, 'export.toml')
+      for row in self.query('SELECT filename FROM source_files ORDER BY filename'):
+        self.export_file(row['filename'], output)
+        with open(output, 'r') as exported, open(row['filename'], 'r') as original:
+          if exported.read() != original.read():
+            mismatched.append(row['filename'])
+    return mismatched
+
+def main():
+  parser = argparse.ArgumentParser(description='SQLite mirror of the note library')
+  parser.add_argument('--database', dest='database',
+      help='database file (default: .cache/{})'.format(DATABASE_NAME))
+  subparsers = parser.add_subparsers(dest='command')
+
+  subparsers.add_parser('sync', help='load changed notes files into the database')
+
+  find = subparsers.add_parser('find', help='find notes by level, tags and rank')
+  find.add_argument('--level')
+  find.add_argument('--tag', dest='tags', action='append', default=[])
+  find.add_argument('--source', help='frequency source, eg. anime')
+  find.add_argument('--max-rank', dest='max_rank', type=int,
+      help='only notes ranked better than this in the source')
+
+  query = subparsers.add_parser('query', help='run SQL against the database')
+  query.add_argument('sql')
+
+  export = subparsers.add_parser('export', help='write a notes file back out as TOML')
+  export.add_argument('filename')
+  export.add_argument('--output', dest='output', required=True)
+
+  subparsers.add_parser('verify', help='check every file exports unchanged')
+
+  args = parser.parse_args()
+  if not args.command:
+    parser.print_help()
+    return
+
+  store = NoteStore(args.database)
+  loaded, removed = store.sync()
+  if args.command == 'sync':
+    print('Loaded {} files, removed {}'.format(len(loaded), len(removed)))
+  elif args.command == 'find':
+    for note in store.find_notes(args.level, args.tags, args.source, args.max_rank):
+      print(u'{} ({}) : {}'.format(note.get('kanji'), note.get('kana'), note.get('english')))
+  elif args.command == 'query':
+    for row in store.query(args.sql):
+      print('\t'.join(str(value) for value in row))
+  elif args.command == 'export':
+    store.export_file(args.filename, args.output)
+  elif args.command == 'verify':
+    mismatched = store.verify()
+    for filename in mismatched:
+      print('Differs: {}'.format(filename))
+    if mismatched:
+      raise Exception('{} files do not round trip'.format(len(mismatched)))
+    print('Every file round trips')
+  store.close()
+
+if __name__ == '__main__':
+  main()
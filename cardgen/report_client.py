@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""
+Query a running report_server.py from the command line.
+
+This only imports the standard library, so it starts fast enough to call
+from an editor.
+"""
+
+import argparse
+import json
+import sys
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+def query(path, params=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+  """
+  The decoded JSON result of a query. Raises on server errors.
+  """
+  url = 'http://{}:{}{}'.format(host, port, path)
+  if params:
+    url += '?' + urlencode({ key : value for key, value in params.items() \
+        if value is not None }, doseq=True)
+  try:
+    with urlopen(url) as response:
+      return json.loads(response.read().decode('utf-8'))
+  except HTTPError as e:
+    raise Exception(json.loads(e.read().decode('utf-8'))['error'])
+
+def main():
+  parser = argparse.ArgumentParser(description='Query the report server')
+  parser.add_argument('--host', dest='host', default=DEFAULT_HOST)
+  parser.add_argument('--port', dest='port', type=int, default=DEFAULT_PORT)
+  parser.add_argument('--json', dest='json', action='store_true',
+      help='print the raw JSON result')
+  subparsers = parser.add_subparsers(dest='query')
+
+  missing = subparsers.add_parser('missing', help='most frequent words not in Anki')
+  missing.add_argument('--source', default='anime_45k',
+      help='frequency list, or combined')
+  missing.add_argument('--limit', type=int, default=100)
+  missing.add_argument('--method', help='score used by the combined source')
+
+  jlpt = subparsers.add_parser('jlpt', help='JLPT words not in Anki')
+  jlpt.add_argument('level', help='n5, n4 or n3')
+
+  lookup = subparsers.add_parser('lookup', help='everything known about a word')
+  lookup.add_argument('word')
+
+  subparsers.add_parser('coverage', help='corpus coverage of the library')
+
+  count = subparsers.add_parser('count', help='number of notes matching filters')
+  count.add_argument('filter', nargs='+', help='eg. "level:n5 & tag:food"')
+  subparsers.add_parser('status', help='what the server has loaded')
+
+  args = parser.parse_args()
+  if not args.query:
+    parser.print_help()
+    sys.exit(1)
+
+  params = { key : value for key, value in vars(args).items() \
+      if key not in ('host', 'port', 'json', 'query') }
+  result = query('/' + args.query, params, args.host, args.port)
+
+  if args.json or args.query in ('lookup', 'coverage', 'status'):
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+  elif args.query == 'missing':
+    for row in result:
+      if isinstance(row['rank'], float):
+        print(u'{:.5f} : {}'.format(row['rank'], row['word']))
+      else:
+        print(u'{:<5} : {}'.format(row['rank'], row['word']))
+  elif args.query == 'count':
+    for row in result:
+      print(u'{:<6} : {}'.format(row['count'], row['filter']))
+  else:
+    for word in result:
+      print(word)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+"""
+Serve the frequency reports over local HTTP, as JSON.
+
+The note library and the frequency index stay loaded between queries. Before
+each query, notes files that changed on disk are re-read (and only those),
+and the index is reloaded if a frequency list changed. Queries are GET
+requests, eg.
+
+  /missing?source=anime_45k&limit=20
+  /jlpt?level=n5
+  /lookup?word=猫
+  /coverage
+  /count?filter=level:n5%20%26%20tag:food
+
+report_client.py is a command line client.
+"""
+
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from coverage import NEXT_WORD_COUNTS
+from frequency import Reports
+from frequency_index import index_fingerprint
+from frequency_scoring import DEFAULT_METHOD
+from library import INDEX_NAME
+from library import NoteLibrary
+from report_client import DEFAULT_HOST
+from report_client import DEFAULT_PORT
+from sources import FREQUENCY_LISTS
+from sources import LazySources
+from sources import WORD_SETS
+
+JLPT_SETS = {
+  'n3': 'jlpt_n3',
+  'n4': 'jlpt_n4',
+  'n5': 'jlpt_n5',
+}
+
+class ReportState:
+  """
+  Resident Reports, kept in sync with the files on disk.
+  """
+  def __init__(self):
+    self.reports = Reports()
+    self.lock = threading.Lock()
+    # filename => ((size, mtime), notes)
+    self.files = {}
+    self.index_fingerprint = None
+
+  def refresh(self):
+    """
+    Re-read changed notes files, and reload the index if a list changed.
+    """
+    filenames = NoteLibrary.note_filenames()
+    library_changed = False
+    for filename in filenames:
+      stat = os.stat(filename)
+      stat_key = (stat.st_size, stat.st_mtime_ns)
+      if filename in self.files and self.files[filename][0] == stat_key:
+        continue
+      try:
+        notes = NoteLibrary.read_notes_from_toml_file(filename)[INDEX_NAME]
+      except Exception as e:
+        print('Error processing file: {0}'.format(filename))
+        print(e)
+        notes = []
+      self.files[filename] = (stat_key, notes)
+      library_changed = True
+
+    for filename in set(self.files) - set(filenames):
+      del self.files[filename]
+      library_changed = True
+
+    if library_changed:
+      self.reports.reset('note_library', 'note_index', 'library_matches')
+      self.reports.library_notes = [note for filename in filenames \
+          for note in self.files[filename][1]]
+
+    fingerprint = index_fingerprint(FREQUENCY_LISTS)
+    if fingerprint != self.index_fingerprint:
+      self.reports.reset('frequency_index', 'combined_scores', 'library_matches')
+      self.reports.vocabulary_sets = LazySources(WORD_SETS)
+      self.index_fingerprint = fingerprint
+
+  def query(self, path, params):
+    with self.lock:
+      self.refresh()
+      if path not in QUERIES:
+        raise KeyError('Unknown query: {}'.format(path))
+      return QUERIES[path](self.reports, params)
+
+def param(params, name, default=None, type=str):
+  if name not in params:
+    return default
+  return type(params[name][0])
+
+def query_missing(reports, params):
+  missing = reports.missing_words(param(params, 'source', 'anime_45k'),
+      param(params, 'limit', 100, int), param(params, 'method', DEFAULT_METHOD))
+  return [{'word': word, 'rank': rank} for word, rank in missing]
+
+def query_jlpt(reports, params):
+  level = param(params, 'level', 'n5').lower()
+  if level not in JLPT_SETS:
+    raise KeyError('Unknown JLPT level: {}'.format(level))
+  return sorted(reports.set_not_in_anki(JLPT_SETS[level]))
+
+def query_lookup(reports, params):
+  if 'word' not in params:
+    raise KeyError('Missing parameter: word')
+  return reports.lookup(param(params, 'word'))
+
+def query_coverage(reports, params):
+  results = []
+  for curve, level_curves in reports.coverage_curves():
+    results.append({
+      'source': curve.source,
+      'words': len(curve),
+      'coverage': curve.coverage(),
+      'covered_words': curve.covered_words(),
+      'levels': { level : level_curve.coverage() \
+          for level, level_curve in level_curves.items() },
+      'next_gain': { count : curve.next_gain(count) for count in NEXT_WORD_COUNTS },
+    })
+  return results
+
+def query_count(reports, params):
+  if 'filter' not in params:
+    raise KeyError('Missing parameter: filter')
+  return [{'filter': expression, 'count': count} \
+      for expression, count in reports.count_notes(params['filter'])]
+
+def query_status(reports, params):
+  return {
+    'notes': len(reports.library_notes),
+    'frequency_words': len(reports.frequency_index),
+  }
+
+QUERIES = {
+  '/missing': query_missing,
+  '/jlpt': query_jlpt,
+  '/lookup': query_lookup,
+  '/coverage': query_coverage,
+  '/count': query_count,
+  '/status': query_status,
+}
+
+class ReportHandler(BaseHTTPRequestHandler):
+  # Set by serve()
+  state = None
+
+  def do_GET(self):
+    url = urlparse(self.path)
+    try:
+      status = 200
+      result = self.state.query(url.path, parse_qs(url.query))
+    except KeyError as e:
+      status = 404 if url.path not in QUERIES else 400
+      result = {'error': str(e.args[0])}
+    except Exception as e:
+      status = 400
+      result = {'error': str(e)}
+
+    body = json.dumps(result, ensure_ascii=False).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json; charset=utf-8')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass # Queries are too frequent to log
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+  state = ReportState()
+  with state.lock:
+    state.refresh()
+  # Load everything up front, so the first query is as fast as the rest.
+  state.reports.library_matches
+  state.reports.combined_scores
+
+  ReportHandler.state = state
+  server = ThreadingHTTPServer((host, port), ReportHandler)
+  print('Serving reports on http://{}:{}/'.format(host, port))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+def main():
+  parser = argparse.ArgumentParser(description='Serve frequency reports as JSON')
+  parser.add_argument('--host', dest='host', default=DEFAULT_HOST,
+      help='address to listen on (default: {})'.format(DEFAULT_HOST))
+  parser.add_argument('--port', dest='port', type=int, default=DEFAULT_PORT,
+      help='port to listen on (default: {})'.format(DEFAULT_PORT))
+  args = parser.parse_args()
+  serve(args.host, args.port)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+Split oversized notes files into kana range shards, and keep them balanced.
+
+  python cardgen shard [files or directories] [--max-notes N]
+  python cardgen shard --merge vocabulary/generated_jlpt_n3_wiktionary.toml
+
+A file with more than --max-notes notes is split into shards named like
+generated_jlpt_n3_wiktionary.001.toml, .002 and so on. Each shard holds a
+range of kana, in the order sort.py sorts by, so a note belongs in exactly
+one shard. Every loader reads shards like any other notes file; the few
+things that deal in whole files (paths given to lint, the deck generators
+and enrich, and sort) treat a file's shards as the file.
+
+Re-running keeps the shards balanced with little churn: notes are moved to
+the shard whose range they fall in, a shard over the limit is split in two,
+and neighbours that fit in half the limit together are merged. Files that
+end up unchanged aren't rewritten.
+"""
+
+import argparse
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+
+from library import INDEX_NAME
+from library import NoteLibrary
+from library import filename_under
+from library import logical_files
+from library import shard_filename
+from library import write_toml
+
+DEFAULT_MAX_NOTES = 500
+
+def note_sort_key(note):
+  # Sort by kana, ignore '～'
+  return note.get('kana', '').lstrip('～')
+
+def split_in_two(notes):
+  """
+  Two halves of sorted notes, split where the kana changes nearest the
+  middle. None if every note has the same kana.
+  """
+  keys = [note_sort_key(note) for note in notes]
+  middle = len(notes) // 2
+  for offset in range(len(notes)):
+    for position in (middle - offset, middle + offset):
+      if 0 < position < len(notes) and keys[position - 1] != keys[position]:
+        return notes[:position], notes[position:]
+  return None
+
+def balance_shards(shards, max_notes, unsharded=()):
+  """
+  The notes of a file's shards, and any unsharded notes, rearranged into
+  balanced kana ranges. The shards are lists of notes, in order.
+  """
+  # NB: A shard's range starts at its lowest kana. Notes outside of it (eg.
+  # added by hand to the wrong shard) move to the shard they fall in.
+  starts = sorted(min(note_sort_key(note) for note in shard) for shard in shards if shard)[1:]
+  balanced = [[] for _ in range(len(starts) + 1)]
+  notes = [note for shard in shards for note in shard] + list(unsharded)
+  for note in sorted(notes, key=note_sort_key):
+    balanced[bisect_right(starts, note_sort_key(note))].append(note)
+
+  position = 0
+  while position < len(balanced):
+    halves = split_in_two(balanced[position]) \
+        if len(balanced[position]) > max_notes else None
+    if halves:
+      balanced[position:position + 1] = list(halves)
+    else:
+      position += 1
+
+  position = 0
+  while position < len(balanced) - 1:
+    if len(balanced[position]) + len(balanced[position + 1]) <= max_notes // 2:
+      balanced[position:position + 2] = [balanced[position] + balanced[position + 1]]
+    else:
+      position += 1
+  return [shard for shard in balanced if shard] or [[]]
+
+def write_logical_file(filename, current, shards):
+  """
+  Write a file's notes as the given shards (or as the file itself if
+  there's one). current is { filename => notes } of the files holding them
+  now. Only changed files are written. Returns the files written and
+  removed.
+  """
+  if len(shards) == 1:
+    targets = [filename]
+  else:
+    targets = [shard_filename(filename, number) for number in range(1, len(shards) + 1)]
+
+  written = []
+  for target, notes in zip(targets, shards):
+    if current.get(target) != notes:
+      write_toml({ INDEX_NAME : notes }, target)
+      written.append(target)
+  removed = [stale for stale in current if stale not in targets]
+  for stale in removed:
+    os.remove(stale)
+  return written, removed
+
+def reshard_file(filename, filenames, max_notes=DEFAULT_MAX_NOTES, merge=False):
+  """
+  Balance the shards of a file, held in filenames, or merge them into the
+  file. A file that needs no shards is left as it is.
+  """
+  current = OrderedDict((shard, NoteLibrary.read_notes_from_toml_file(shard)[INDEX_NAME]) \
+      for shard in filenames)
+  if list(current) == [filename] and (merge or len(current[filename]) <= max_notes):
+    return [], []
+  # NB: Notes in the file itself, next to its shards, are new.
+  unsharded = current.get(filename, [])
+  notes = [shard for name, shard in current.items() if name != filename]
+  if merge:
+    all_notes = [note for shard in notes for note in shard] + unsharded
+    shards = [sorted(all_notes, key=note_sort_key)]
+  else:
+    shards = balance_shards(notes, max_notes, unsharded)
+  return write_logical_file(filename, current, shards)
+
+def main():
+  parser = argparse.ArgumentParser(description='Split large notes files into kana range shards')
+  parser.add_argument('paths', nargs='*',
+      help='notes files or directories (default: all)')
+  parser.add_argument('--max-notes', dest='max_notes', type=int, default=DEFAULT_MAX_NOTES,
+      help='most notes in a file or shard (default: {})'.format(DEFAULT_MAX_NOTES))
+  parser.add_argument('--merge', dest='merge', action='store_true',
+      help='merge shards back into one file')
+  args = parser.parse_args()
+
+  filenames = NoteLibrary.note_filenames()
+  if args.paths:
+    paths = [os.path.normpath(path) for path in args.paths]
+    filenames = [filename for filename in filenames if filename_under(filename, paths)]
+
+  for filename, shard_filenames in logical_files(filenames).items():
+    written, removed = reshard_file(filename, shard_filenames, args.max_notes, args.merge)
+    if written or removed:
+      print('{0: <50} : wrote {1}, removed {2}'.format(filename,
+          ', '.join(written) or 'nothing', ', '.join(removed) or 'nothing'))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,57 @@
+import unittest
+
+from shards import balance_shards
+from shards import split_in_two
+
+def notes(*kana):
+  return [{ 'kana': k } for k in kana]
+
+def kana(shards):
+  return [[note['kana'] for note in shard] for shard in shards]
+
+class TestSplitInTwo(unittest.TestCase):
+
+  def test_splits_nearest_the_middle(self):
+    self.assertEqual(kana(split_in_two(notes('あ', 'い', 'う', 'え'))), [['あ', 'い'], ['う', 'え']])
+
+  def test_never_splits_a_kana(self):
+    self.assertEqual(kana(split_in_two(notes('あ', 'い', 'い', 'い', 'う'))),
+        [['あ'], ['い', 'い', 'い', 'う']])
+    self.assertIsNone(split_in_two(notes('い', 'い', 'い')))
+
+class TestBalanceShards(unittest.TestCase):
+
+  def test_split_threshold(self):
+    self.assertEqual(kana(balance_shards([], 4, notes('あ', 'い', 'う', 'え'))),
+        [['あ', 'い', 'う', 'え']])
+    self.assertEqual(kana(balance_shards([], 4, notes('あ', 'い', 'う', 'え', 'お'))),
+        [['あ', 'い'], ['う', 'え', 'お']])
+
+  def test_splits_until_under_the_limit(self):
+    shards = balance_shards([], 2, notes('あ', 'い', 'う', 'え', 'お', 'か', 'き'))
+    self.assertEqual(kana(shards), [['あ'], ['い', 'う'], ['え', 'お'], ['か', 'き']])
+
+  def test_shard_of_one_kana_may_stay_over_the_limit(self):
+    self.assertEqual(kana(balance_shards([], 2, notes('い', 'い', 'い'))), [['い', 'い', 'い']])
+
+  def test_merge_threshold(self):
+    # Neighbours are merged when they fit in half the limit together.
+    self.assertEqual(kana(balance_shards([notes('あ', 'い'), notes('う', 'え')], 8)),
+        [['あ', 'い', 'う', 'え']])
+    self.assertEqual(kana(balance_shards([notes('あ', 'い'), notes('う', 'え', 'お')], 8)),
+        [['あ', 'い'], ['う', 'え', 'お']])
+
+  def test_note_in_the_wrong_shard_moves(self):
+    shards = [notes('あ', 'い', 'く'), notes('か', 'き', 'け')]
+    self.assertEqual(kana(balance_shards(shards, 4)), [['あ', 'い'], ['か', 'き', 'く', 'け']])
+
+  def test_unsharded_notes_join_their_range(self):
+    shards = balance_shards([notes('あ', 'い'), notes('か', 'き')], 4, notes('う', 'こ'))
+    self.assertEqual(kana(shards), [['あ', 'い', 'う'], ['か', 'き', 'こ']])
+
+  def test_sorts_by_kana_without_tilde(self):
+    shards = balance_shards([], 4, notes('～さん', 'あ', 'し'))
+    self.assertEqual(kana(shards), [['あ', '～さん', 'し']])
+
+if __name__ == '__main__':
+  unittest.main()
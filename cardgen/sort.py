@@ -13,7 +13,10 @@ from collections import OrderedDict
 
 from library import INDEX_NAME
 from library import NoteLibrary
+from library import logical_files
 from library import write_toml
+from shards import note_sort_key
+from shards import reshard_file
 
 skipped_count = 0
 
@@ -39,7 +42,7 @@ def sort_notes(note_toml_data):
 
     notes.append(note)
 
-  notes = sorted(notes, key=lambda v: v['kana'].lstrip('～')) # Sort by kana, ignore '～'
+  notes = sorted(notes, key=note_sort_key)
 
   return { INDEX_NAME : notes }
 
@@ -66,9 +69,8 @@ def sort_set_file(filename):
 def main():
   print('==== Notes files ==== ')
   total_notes = 0
-  for filename in glob.glob('**/*.toml', recursive=True):
-    if 'cardgen' in filename or 'temp/' in filename:
-      continue # XXX: Things here shouldn't be processed for now.
+  filenames = NoteLibrary.note_filenames()
+  for filename in filenames:
     try:
       notes = NoteLibrary.read_notes_from_toml_file(filename)
       note_count = len(notes[INDEX_NAME])
@@ -80,6 +82,11 @@ def main():
       print('Error processing file: {0}'.format(filename))
       print(e)
 
+  # NB: Each shard is sorted, so only notes in the wrong shard move.
+  for filename, shard_filenames in logical_files(filenames).items():
+    if shard_filenames != [filename]:
+      reshard_file(filename, shard_filenames)
+
   print('==== Overall notes stats ====')
   print('  Skipped notes: {0}'.format(skipped_count))
   print('  Total notes: {0}'.format(total_notes))
@@ -0,0 +1,77 @@
+"""
+Registry of the word lists in lists/.
+
+Every script that reads a list looks it up here by name, so paths and
+display names are declared exactly once.
+"""
+
+from collections import OrderedDict
+from collections import namedtuple
+from collections.abc import Mapping
+
+from analysis import load_word_frequency_map
+from analysis import load_word_set
+
+# One word per line. Lines with `/` hold alternate forms of the same word.
+WORD_SET = 'word_set'
+
+# One word per line, ordered from most to least frequent.
+FREQUENCY_LIST = 'frequency_list'
+
+LOADERS = {
+  WORD_SET: load_word_set,
+  FREQUENCY_LIST: load_word_frequency_map,
+}
+
+# `display_name` is how the source is shown in reports and stored in notes.
+Source = namedtuple('Source', ['name', 'path', 'format', 'display_name'])
+
+SOURCES = OrderedDict((source.name, source) for source in [
+  # TODO: Anime 250 list: https://owlcation.com/humanities/250-anime-japanese-words-phrases
+  # TODO: 500 common verbs list: https://www.linguajunkie.com/japanese/japanese-verbs-list
+  Source('jlpt_n5', 'lists/jlpt_n5_wiktionary.txt', WORD_SET, 'jlpt n5'),
+  Source('jlpt_n4', 'lists/jlpt_n4_wiktionary.txt', WORD_SET, 'jlpt n4'),
+  Source('jlpt_n3', 'lists/jlpt_n3_wiktionary.txt', WORD_SET, 'jlpt n3'),
+  Source('wanikani', 'lists/wanikani_vocab.txt', WORD_SET, 'wanikani'),
+  Source('anime_45k', 'lists/anime_45k_relevant_words.txt', FREQUENCY_LIST, 'anime'),
+  Source('leeds_15k', 'lists/leeds_15k_frequency.txt', FREQUENCY_LIST, 'leeds'),
+  Source('novel_3k', 'lists/Japanese-Word-Frequency-List-1-3000.txt', FREQUENCY_LIST, 'novels'),
+  Source('wikipedia_10k', 'lists/wikipedia_10k.txt', FREQUENCY_LIST, 'wikipedia'),
+])
+
+def sources_of_format(format):
+  """
+  { name => Source } for every registered source of one format.
+  """
+  return OrderedDict((name, source) for name, source in SOURCES.items() \
+      if source.format == format)
+
+WORD_SETS = sources_of_format(WORD_SET)
+
+# { name => path } of every frequency list
+FREQUENCY_LISTS = OrderedDict((name, source.path) \
+    for name, source in sources_of_format(FREQUENCY_LIST).items())
+
+class LazySources(Mapping):
+  """
+  Read-only { name => loaded list } mapping that reads each list from disk the
+  first time it's used.
+  """
+  def __init__(self, sources):
+    self.sources = sources
+    self.loaded = {}
+
+  def __getitem__(self, name):
+    if name not in self.loaded:
+      source = self.sources[name]
+      self.loaded[name] = LOADERS[source.format](source.path)
+    return self.loaded[name]
+
+  def __contains__(self, name):
+    return name in self.sources
+
+  def __iter__(self):
+    return iter(self.sources)
+
+  def __len__(self):
+    return len(self.sources)
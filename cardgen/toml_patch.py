@@ -0,0 +1,170 @@
+"""
+Edit notes files in place, keeping every byte that isn't edited.
+
+write_toml re-serializes a whole file, which is O(file) for a one line
+change and drops anything the encoder doesn't reproduce. A TomlPatch
+instead records the byte span of each `[[cards]]` block and each key line in
+it, and turns edits into span replacements. If the file's length is
+unchanged, only the edited bytes are written, in place. Otherwise the
+patched file is written to a temporary file and renamed over it, so a
+crash never leaves it half written.
+
+  patch = TomlPatch(filename)
+  patch.set_key(3, 'frequency_scores', scores)
+  patch.remove_key(3, 'highest_frequency')
+  patch.insert_note(0, blank_note)
+  patch.write(notes)
+
+Positions are those of the notes as they're read, before any edits. New
+keys go after a note's last key, and values are written the way write_toml
+writes them, so a patched file is what write_toml would have written.
+"""
+
+import toml
+from collections import OrderedDict
+
+from cache import atomic_write
+from library import CustomTomlEncoder
+from library import INDEX_NAME
+from library import KEY_LINE
+from manifest import record_file
+
+class NoteSpan:
+  """
+  Byte offsets of a `[[cards]]` block: its start, the end of its header
+  line, and [start, end] of each key's lines.
+  """
+  def __init__(self, start, header_end):
+    self.start = start
+    self.header_end = header_end
+    self.keys = OrderedDict()
+
+  def end_of_keys(self):
+    return max([span[1] for span in self.keys.values()] + [self.header_end])
+
+def note_spans(contents):
+  """
+  NoteSpan of each note in the contents (bytes) of a notes file.
+  """
+  header = '[[{}]]'.format(INDEX_NAME)
+  spans = []
+  key = None
+  offset = 0
+  for raw_line in contents.splitlines(keepends=True):
+    line = raw_line.decode('utf-8')
+    stripped = line.strip()
+    end = offset + len(raw_line)
+    if stripped == header:
+      spans.append(NoteSpan(offset, end))
+      key = None
+    elif spans:
+      match = KEY_LINE.match(line)
+      if match:
+        key = match.group(1)
+        spans[-1].keys[key] = [offset, end]
+      elif key and stripped and not stripped.startswith('#'):
+        spans[-1].keys[key][1] = end # A value continued on the next line
+      else:
+        key = None
+    offset = end
+  return spans
+
+def render_key(key, value):
+  return toml.dumps(OrderedDict([(key, value)]),
+      encoder=CustomTomlEncoder(preserve=True)).encode('utf-8')
+
+def render_note(note):
+  return toml.dumps({ INDEX_NAME : [note] },
+      encoder=CustomTomlEncoder(preserve=True)).encode('utf-8')
+
+class TomlPatch:
+  def __init__(self, filename):
+    self.filename = filename
+    with open(filename, 'rb') as f:
+      self.contents = f.read()
+    self.spans = note_spans(self.contents)
+    # (start, end, replacement), in the order they were made
+    self.edits = []
+    self.inserted_notes = 0
+
+  def __len__(self):
+    return len(self.spans)
+
+  def _insert_at(self, offset, text):
+    if offset > 0 and self.contents[offset - 1:offset] != b'\n':
+      text = b'\n' + text
+    self.edits.append((offset, offset, text))
+
+  def set_key(self, position, key, value):
+    """
+    Set a key of a note, replacing its line if it has one.
+    """
+    span = self.spans[position]
+    if key in span.keys:
+      start, end = span.keys[key]
+      self.edits.append((start, end, render_key(key, value)))
+    else:
+      self._insert_at(span.end_of_keys(), render_key(key, value))
+
+  def remove_key(self, position, key):
+    span = self.spans[position]
+    if key in span.keys:
+      start, end = span.keys[key]
+      self.edits.append((start, end, b''))
+
+  def insert_note(self, position, note):
+    """
+    Insert a note before the note at position, or after the last note.
+    """
+    self.inserted_notes += 1
+    if position < len(self.spans):
+      self.edits.append((self.spans[position].start, self.spans[position].start,
+          render_note(note)))
+    else:
+      self._insert_at(len(self.contents), render_note(note))
+
+  def patched(self):
+    """
+    The contents with every edit made.
+    """
+    pieces = []
+    offset = 0
+    # NB: Stable, so inserts at the same offset stay in the order made.
+    for start, end, text in sorted(self.edits, key=lambda edit: edit[0]):
+      if start < offset:
+        raise Exception('Overlapping edits to {} at byte {}'.format(self.filename, start))
+      pieces.append(self.contents[offset:start])
+      pieces.append(text)
+      offset = end
+    pieces.append(self.contents[offset:])
+    return b''.join(pieces)
+
+  def write(self, notes=None):
+    """
+    Write the edits, if any, and update the manifest with the notes as
+    edited. Returns whether the file changed.
+    """
+    if not self.edits:
+      return False
+    if notes is not None and len(notes) != len(self.spans) + self.inserted_notes:
+      raise Exception('{} has {} notes, but {} [[{}]] blocks'.format(
+          self.filename, len(notes), len(self.spans) + self.inserted_notes, INDEX_NAME))
+
+    contents = self.patched()
+    if len(contents) == len(self.contents):
+      # Only the bytes between the first and last edits changed.
+      first = min(edit[0] for edit in self.edits)
+      last = max(edit[1] for edit in self.edits)
+      with open(self.filename, 'r+b') as f:
+        f.seek(first)
+        f.write(contents[first:last])
+    else:
+      atomic_write(self.filename, contents)
+
+    self.contents = contents
+    self.spans = note_spans(contents)
+    self.edits = []
+    self.inserted_notes = 0
+    if notes is not None:
+      record_file(self.filename, notes)
+    return True
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import toml
+import unittest
+from collections import OrderedDict
+from toml.decoder import TomlDecoder
+
+from cache import cache_path
+from library import CustomTomlEncoder
+from library import INDEX_NAME
+from manifest import entry_name
+from toml_patch import TomlPatch
+from toml_patch import note_spans
+
+NOTES = '''[[cards]]
+kanji = '会う'
+kana = 'あう'
+english = 'to meet'
+tags = ['common']
+
+[[cards]]
+kanji = '猫'
+kana = 'ねこ'
+english = 'cat'
+
+'''
+
+def parse(contents):
+  return toml.loads(contents, decoder=TomlDecoder(_dict=OrderedDict))
+
+def serialize(notes):
+  """
+  What write_toml writes for the notes.
+  """
+  return toml.dumps({ INDEX_NAME : notes }, encoder=CustomTomlEncoder(preserve=True))
+
+class TestTomlPatch(unittest.TestCase):
+
+  def setUp(self):
+    fd, self.filename = tempfile.mkstemp(suffix='.toml')
+    os.close(fd)
+
+  def tearDown(self):
+    os.remove(self.filename)
+
+  def write(self, contents):
+    with open(self.filename, 'w') as f:
+      f.write(contents)
+
+  def read(self):
+    with open(self.filename, 'r') as f:
+      return f.read()
+
+  def test_set_key_matches_write_toml(self):
+    self.write(NOTES)
+    notes = parse(NOTES)[INDEX_NAME]
+    notes[0]['english'] = 'to meet; to see'
+    patch = TomlPatch(self.filename)
+    patch.set_key(0, 'english', 'to meet; to see')
+    self.assertTrue(patch.write())
+    self.assertEqual(self.read(), serialize(notes))
+
+  def test_same_length_edit(self):
+    self.write(NOTES)
+    patch = TomlPatch(self.filename)
+    patch.set_key(1, 'english', 'dog')
+    patch.write()
+    self.assertEqual(self.read(), NOTES.replace("'cat'", "'dog'"))
+
+  def test_missing_key_goes_after_last_key(self):
+    self.write(NOTES)
+    notes = parse(NOTES)[INDEX_NAME]
+    notes[1]['level'] = 'n5'
+    patch = TomlPatch(self.filename)
+    patch.set_key(1, 'level', 'n5')
+    patch.remove_key(1, 'tags') # Not in the note: nothing to do
+    patch.write()
+    self.assertEqual(self.read(), serialize(notes))
+
+  def test_continuation_lines(self):
+    contents = NOTES.replace("tags = ['common']", "tags = [\n  'common',\n  'verb',\n]")
+    spans = note_spans(contents.encode('utf-8'))
+    start, end = spans[0].keys['tags']
+    self.assertEqual(contents.encode('utf-8')[start:end], b"tags = [\n  'common',\n  'verb',\n]\n")
+
+    self.write(contents)
+    patch = TomlPatch(self.filename)
+    patch.set_key(0, 'tags', ['rare'])
+    patch.write()
+    self.assertEqual(self.read(), NOTES.replace("['common']", "['rare']"))
+
+  def test_insert_at_end_without_trailing_newline(self):
+    self.write(NOTES.rstrip('\n'))
+    notes = parse(NOTES)[INDEX_NAME]
+    blank = OrderedDict([('kanji', ''), ('kana', '')])
+    patch = TomlPatch(self.filename)
+    patch.insert_note(len(patch), blank)
+    patch.write()
+    self.assertEqual(parse(self.read())[INDEX_NAME], notes + [blank])
+    self.assertTrue(self.read().startswith(NOTES.rstrip('\n') + '\n[[cards]]\n'))
+
+  def test_overlapping_edits_fail(self):
+    self.write(NOTES)
+    patch = TomlPatch(self.filename)
+    patch.set_key(0, 'english', 'to see')
+    patch.remove_key(0, 'english')
+    with self.assertRaises(Exception):
+      patch.write()
+    self.assertEqual(self.read(), NOTES)
+
+  def test_note_count_must_match(self):
+    self.write(NOTES)
+    patch = TomlPatch(self.filename)
+    patch.insert_note(0, OrderedDict([('kanji', '')]))
+    with self.assertRaises(Exception):
+      patch.write(parse(NOTES)[INDEX_NAME])
+
+  def test_files_outside_the_library_arent_recorded(self):
+    self.write(NOTES)
+    notes = parse(NOTES)[INDEX_NAME]
+    notes[1]['english'] = 'kitty'
+    patch = TomlPatch(self.filename)
+    patch.set_key(1, 'english', 'kitty')
+    patch.write(notes)
+    self.assertFalse(os.path.exists(cache_path(entry_name(os.path.normpath(self.filename)))))
+
+if __name__ == '__main__':
+  unittest.main()
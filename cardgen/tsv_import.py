@@ -1,78 +1,292 @@
 #!/usr/bin/env python
 
 """
-Import a tsv file into a new vocab TOML file.
+Import TSV or CSV word lists into new vocab TOML files.
+
+  python cardgen tsv-import lists/jlpt_n3_wiktionary.tsv
+  python cardgen tsv-import dictionary.csv --columns kanji,kana,-,english --header
+
+Rows are streamed: each is cleaned up with REPLACEMENTS, skipped if the word
+is already in the library (or in an earlier row), and written out in shards
+of at most --shard-size notes. Memory holds one shard and the set of known
+words, however long the input is. Rows without english become notes with a
+blank english to fill in, so `python cardgen frequency --missing anime_45k
+--format tsv` output can be imported as is.
+
+A list imports to vocabulary/generated_{name}.toml, or to
+generated_{name}.001.toml, .002 and so on when it fills more than one shard.
+A new import's shards are written in row order; `python cardgen shard` (or
+sort) moves them into kana ranges. Importing into an existing output only
+adds the rows it doesn't have yet, merged into its kana ranges, so edits
+made to earlier imports are kept.
 """
 
+import argparse
 import csv
 import glob
 import os
+import re
 
 from collections import OrderedDict
 
 from library import INDEX_NAME
 from library import NoteLibrary
-from sort import write_toml
+from library import shard_filename
+from library import write_toml
+from manifest import save_entry
+from manifest import summarize_notes
+from normalize import KANA_ONLY
+from normalize import normalized_keys
+from shards import DEFAULT_MAX_NOTES
+from shards import balance_shards
+from shards import write_logical_file
 
 REPLACEMENTS = {
   '・する': 'する',
 }
 
+# All of REPLACEMENTS as one pattern, longest match first
+REPLACEMENT_PATTERN = re.compile('|'.join(re.escape(match) \
+    for match in sorted(REPLACEMENTS, key=len, reverse=True)))
+
+# The fields a column can map to, in the order they're written
+COLUMN_FIELDS = ('kanji', 'kana', 'english', 'source', 'level', 'explain')
+
+# Marks a column to ignore in --columns
+SKIP_COLUMN = '-'
+
+DEFAULT_COLUMNS = ['kanji', 'kana', 'english', 'level']
+DEFAULT_SOURCE = 'wiktionary'
+DEFAULT_TAGS = ['generated', 'tsv']
+DEFAULT_SHARD_SIZE = DEFAULT_MAX_NOTES
+
 def correct_entry(entry: str) -> str:
-  for match, replacement in REPLACEMENTS.items():
-    if match in entry:
-      entry = entry.replace(match, replacement)
-  return entry
-
-def hydrate_note(row):
-  kanji = row[0]
-  kana = row[1]
-  english = row[2]
-  level = row[3]
-
-  keys = [
-    ('kanji', kanji),
-    ('kana', kana),
-    ('english', english),
-    ('source', 'wiktionary'),
-    ('level', level),
-    ('tags', ['generated', 'tsv']),
-  ]
-  return OrderedDict(keys)
+  return REPLACEMENT_PATTERN.sub(lambda match: REPLACEMENTS[match.group(0)], entry)
+
+def hydrate_note(fields, source=DEFAULT_SOURCE, tags=DEFAULT_TAGS):
+  """
+  A note from { field => value } read from a row.
+  """
+  note = OrderedDict()
+  for field in COLUMN_FIELDS:
+    value = fields.get(field, '')
+    if field == 'source':
+      value = value or source
+    if field == 'level':
+      value = value.lower()
+    if value or field in ('kanji', 'kana', 'english'):
+      note[field] = value
+  note['tags'] = list(tags)
+  return note
+
+def read_rows(filename, columns, header=False, delimiter=None):
+  """
+  { field => value } for each row of a TSV or CSV file, lazily.
+  """
+  if delimiter is None:
+    delimiter = ',' if filename.lower().endswith('.csv') else '\t'
+  with open(filename, newline='') as fd:
+    rows = csv.reader(fd, delimiter=delimiter, quotechar='"')
+    if header:
+      next(rows, None)
+    for row in rows:
+      if not row or row[0].startswith('#'):
+        continue
+      yield { field : correct_entry(value.strip()) \
+          for field, value in zip(columns, row) if field != SKIP_COLUMN }
+
+def word_keys(kanji):
+  """
+  The forms a word is known by, to check against the known words.
+  """
+  keys = set([kanji])
+  # NB: Kana isn't normalized, since folding it makes loanwords (デモ) clash
+  # with hiragana words (でも).
+  if not KANA_ONLY.match(kanji):
+    keys.update(normalized_keys(kanji))
+  return keys
+
+def new_notes(rows, known_words, source=DEFAULT_SOURCE, tags=DEFAULT_TAGS, stats=None):
+  """
+  Notes for the rows that aren't known words yet, lazily. Each note's words
+  are added to known_words, so later rows with the same word are skipped.
+  """
+  stats = stats if stats is not None else {}
+  for fields in rows:
+    kanji = fields.get('kanji') or fields.get('kana')
+    # NB: Kanji rows without a reading keep a blank kana to fill in.
+    kana = fields.get('kana') or (kanji if KANA_ONLY.match(kanji or '') else '')
+    # NB: Rows without english (eg. from `frequency --missing --format tsv`)
+    # become notes with a blank english to fill in.
+    if not kanji:
+      stats['incomplete'] = stats.get('incomplete', 0) + 1
+      continue
+    # NB: Only the kanji identifies a word; homophones (党, 塔) are different
+    # words. Kana only words are matched on their kana.
+    keys = word_keys(kanji)
+    if not keys.isdisjoint(known_words):
+      stats['known'] = stats.get('known', 0) + 1
+      continue
+    known_words.update(keys)
+    if kana:
+      known_words.add(kana)
+    fields['kanji'] = kanji
+    fields['kana'] = kana
+    stats['imported'] = stats.get('imported', 0) + 1
+    if not fields.get('english'):
+      stats['blank'] = stats.get('blank', 0) + 1
+    yield hydrate_note(fields, source, tags)
 
 def tsv_to_toml_filename(filename):
   path = os.path.splitext(filename)[0]
   base = os.path.basename(path)
   return 'vocabulary/generated_{}.toml'.format(base)
 
+def output_filenames(filename):
+  """
+  The output file, and any shards of it, already on disk.
+  """
+  path, extension = os.path.splitext(filename)
+  return [filename] + glob.glob('{}.[0-9][0-9][0-9]{}'.format(glob.escape(path), extension))
+
+def write_shards(notes, filename, shard_size=DEFAULT_SHARD_SIZE):
+  """
+  Write the notes in shards of at most shard_size notes. A single shard is
+  written to the filename itself. Returns the files written, or [] if there
+  were no notes (and nothing is written).
+
+  Notes are first written to temporary files, so a bad row halfway through
+  the input leaves the previous import alone. If the file (or its shards)
+  already exists, the notes are merged into its kana ranges (see
+  shards.balance_shards), and only the shards that change are rewritten.
+  """
+  temporary = []
+  entries = []
+  try:
+    shard = []
+    for note in notes:
+      shard.append(note)
+      if len(shard) == shard_size:
+        temporary.append(_write_temporary_shard(shard, filename, len(temporary) + 1))
+        entries.append(summarize_notes(temporary[-1], shard))
+        shard = []
+    if shard:
+      temporary.append(_write_temporary_shard(shard, filename, len(temporary) + 1))
+      entries.append(summarize_notes(temporary[-1], shard))
+  except Exception:
+    for name in temporary:
+      os.remove(name)
+    raise
+
+  existing = [name for name in output_filenames(filename) if os.path.exists(name)]
+  if existing:
+    return _merge_temporary_shards(temporary, filename, existing, shard_size)
+
+  if len(temporary) == 1:
+    written = [filename]
+  else:
+    written = [shard_filename(filename, number) for number in range(1, len(temporary) + 1)]
+  for name, target, entry in zip(temporary, written, entries):
+    os.replace(name, target)
+    save_entry(os.path.normpath(target), entry)
+  return written
+
+def _merge_temporary_shards(temporary, filename, existing, shard_size):
+  """
+  Merge the notes of the temporary shards into the file's existing shards.
+  """
+  added = []
+  for name in temporary:
+    added.extend(NoteLibrary.read_notes_from_toml_file(name)[INDEX_NAME])
+  current = OrderedDict((name, NoteLibrary.read_notes_from_toml_file(name)[INDEX_NAME]) \
+      for name in sorted(existing))
+  # NB: As in shards.reshard_file, notes in the file itself next to its
+  # shards aren't in a range yet.
+  unsharded = current.get(filename, []) + added
+  shards = balance_shards([notes for name, notes in current.items() if name != filename],
+      shard_size, unsharded)
+  written, _ = write_logical_file(filename, current, shards)
+  for name in temporary:
+    os.remove(name)
+  return written
+
+def _write_temporary_shard(notes, filename, number):
+  # NB: Not named .toml, so the library doesn't pick it up meanwhile.
+  name = '{}.tmp'.format(shard_filename(filename, number))
+  write_toml({ INDEX_NAME : notes }, name)
+  return name
+
+def known_library_words():
+  """
+  Every key of every note, including earlier imports.
+  """
+  words = set()
+  for entry in NoteLibrary.manifest().values():
+    words.update(entry['keys'])
+  return words
+
+def import_file(filename, columns=DEFAULT_COLUMNS, header=False, delimiter=None,
+    source=DEFAULT_SOURCE, tags=DEFAULT_TAGS, shard_size=DEFAULT_SHARD_SIZE,
+    known_words=None):
+  new_filename = tsv_to_toml_filename(filename)
+  if known_words is None:
+    known_words = known_library_words()
+  stats = {}
+  rows = read_rows(filename, columns, header, delimiter)
+  notes = new_notes(rows, known_words, source, tags, stats)
+  written = write_shards(notes, new_filename, shard_size)
+  if not written:
+    print('No new notes in {} ({} already known, {} incomplete rows); left {} as it was'.format(
+        filename, stats.get('known', 0), stats.get('incomplete', 0), new_filename))
+    return written
+  target = written[0] if len(written) == 1 else '{} shards ({} to {})'.format(
+      len(written), written[0], written[-1])
+  print('Wrote {} notes to {} ({} with blank english, {} already known, {} incomplete rows)'.format(
+      stats.get('imported', 0), target, stats.get('blank', 0), stats.get('known', 0),
+      stats.get('incomplete', 0)))
+  return written
+
+def parse_columns(spec):
+  columns = [column.strip() for column in spec.split(',')]
+  for column in columns:
+    if column != SKIP_COLUMN and column not in COLUMN_FIELDS:
+      raise Exception('Unknown column "{}" (expected one of {}, or {})'.format(
+          column, ', '.join(COLUMN_FIELDS), SKIP_COLUMN))
+  if 'kanji' not in columns and 'kana' not in columns:
+    raise Exception('Columns need a kanji or kana column: {}'.format(spec))
+  return columns
+
 def main():
-  # Load existing library
-  note_library = NoteLibrary()
-  note_library.load_library()
+  parser = argparse.ArgumentParser(description='Import TSV or CSV word lists as notes')
+  parser.add_argument('filenames', nargs='*',
+      help='lists to import (default: lists/*.tsv, except the n4 lists)')
+  parser.add_argument('--columns', dest='columns', default=','.join(DEFAULT_COLUMNS),
+      help='field of each column, {} to skip one (default: {})'.format(
+        SKIP_COLUMN, ','.join(DEFAULT_COLUMNS)))
+  parser.add_argument('--header', dest='header', action='store_true',
+      help='skip the first row')
+  parser.add_argument('--delimiter', dest='delimiter',
+      help='column delimiter (default: comma for .csv, otherwise tab)')
+  parser.add_argument('--source', dest='source', default=DEFAULT_SOURCE,
+      help='source of notes without a source column (default: {})'.format(DEFAULT_SOURCE))
+  parser.add_argument('--tag', dest='tags', action='append', default=[],
+      help='extra tag for every note')
+  parser.add_argument('--shard-size', dest='shard_size', type=int, default=DEFAULT_SHARD_SIZE,
+      help='most notes per output file (default: {})'.format(DEFAULT_SHARD_SIZE))
+  args = parser.parse_args()
 
-  # Scan and convert the tsv files
-  for filename in glob.glob('lists/*.tsv', recursive=True):
-    if 'n4' in filename:
-      continue
-    notes = []
-    with open(filename) as fd:
-      rd = csv.reader(fd, delimiter='\t', quotechar='"')
-      for row in rd:
-        kanji = row[0] = correct_entry(row[0])
-        kana = row[1] = correct_entry(row[1])
-        if kanji in note_library.notes or kana in note_library.notes:
-          continue
-        note = hydrate_note(row)
-        notes.append(note)
-
-    toml = {}
-    toml[INDEX_NAME] = notes
-
-    new_filename = tsv_to_toml_filename(filename)
-    print('Writing {} notes to {}'.format(len(notes), new_filename))
-    write_toml(toml, new_filename)
-    note_library.add_notes_from_file(new_filename)
+  filenames = args.filenames
+  if not filenames:
+    filenames = [filename for filename in sorted(glob.glob('lists/*.tsv')) \
+        if 'n4' not in filename]
+
+  columns = parse_columns(args.columns)
+  tags = DEFAULT_TAGS + args.tags
+  # NB: Shared, so words imported from one list aren't imported from the next.
+  known_words = known_library_words()
+  for filename in filenames:
+    import_file(filename, columns, args.header, args.delimiter, args.source, tags,
+        args.shard_size, known_words)
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+
+from library import INDEX_NAME
+from library import NoteLibrary
+from library import shard_filename
+from library import write_toml
+from tsv_import import write_shards
+
+def notes(*kana):
+  return [OrderedDict([('kanji', k), ('kana', k)]) for k in kana]
+
+def kana(filename):
+  return [note['kana'] for note in NoteLibrary.read_notes_from_toml_file(filename)[INDEX_NAME]]
+
+class TestWriteShards(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.filename = os.path.join(self.directory.name, 'generated_test.toml')
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def test_new_import_is_written_in_row_order(self):
+    written = write_shards(iter(notes('う', 'あ', 'い')), self.filename, 2)
+    self.assertEqual(written, [shard_filename(self.filename, 1), shard_filename(self.filename, 2)])
+    self.assertEqual([kana(name) for name in written], [['う', 'あ'], ['い']])
+
+  def test_no_notes_writes_nothing(self):
+    self.assertEqual(write_shards(iter([]), self.filename), [])
+    self.assertFalse(os.path.exists(self.filename))
+
+  def test_merges_into_existing_shards(self):
+    first, second, third = [shard_filename(self.filename, number) for number in (1, 2, 3)]
+    write_toml({ INDEX_NAME : notes('あ', 'い', 'う') }, first)
+    write_toml({ INDEX_NAME : notes('か', 'き', 'く') }, second)
+    write_toml({ INDEX_NAME : notes('さ', 'し') }, third)
+    written = write_shards(iter(notes('こ', 'え')), self.filename, 4)
+    self.assertEqual(written, [first, second])
+    self.assertEqual([kana(name) for name in (first, second, third)],
+        [['あ', 'い', 'う', 'え'], ['か', 'き', 'く', 'こ'], ['さ', 'し']])
+    self.assertEqual(sorted(os.listdir(self.directory.name)),
+        sorted(os.path.basename(name) for name in (first, second, third)))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -2,20 +2,44 @@
 
 """
 Update the entire set of notes with frequency data.
+
+Runs are incremental: a note is rescored only if its file changed or a
+frequency list changed since the last run (see STATE_CACHE_NAME).
 """
 
+import argparse
 import glob
-from typing import Dict, Tuple
-
-from analysis import load_word_frequency_map
+from cached_property import cached_property
+from collections import OrderedDict
+from typing import Dict
+
+from cache import hash_file
+from cache import hash_strings
+from cache import load_json
+from cache import save_json
+from frequency_index import index_fingerprint
+from frequency_index import load_frequency_index
+from frequency_scoring import CombinedScores
 from library import DynamicInlineTableDict
 from library import INDEX_NAME
 from library import NoteLibrary
-from library import write_toml
+from normalize import normalized_keys
+from sources import FREQUENCY_LISTS
+from sources import SOURCES
+from toml_patch import TomlPatch
 
 # Where we store the frequency data in our notes
 FREQUENCY_FIELD = 'frequency_scores'
-ANIME_FREQUENCY_SUBFIELD = 'anime'
+ANIME_FREQUENCY_SUBFIELD = SOURCES['anime_45k'].display_name
+
+# Rank across every list (see frequency_scoring). Not a source of its own.
+COMBINED_FREQUENCY_SUBFIELD = 'combined'
+
+# Hashes of the files processed by the last run, and the scores of every note
+STATE_CACHE_NAME = 'update_frequencies.json'
+
+# Bump when scoring changes in a way the list fingerprints don't capture.
+SCORES_VERSION = 1
 
 # TODO: Remove after running migrations
 DEPRECATED_FIELDS = [
@@ -34,6 +58,8 @@ def calculate_highest_frequency(frequency_data: Dict[str, int]) -> Dict[str, int
   lowest_score = 1000000000
   lowest_score_source = None
   for source, score in frequency_data.items():
+    if source == COMBINED_FREQUENCY_SUBFIELD:
+      continue
     if score < lowest_score:
       lowest_score = score
       lowest_score_source = source
@@ -41,64 +67,158 @@ def calculate_highest_frequency(frequency_data: Dict[str, int]) -> Dict[str, int
     return None
   return {'source': lowest_score_source, 'score': lowest_score}
 
-def main():
-  # Several { Word => frequency } maps.
-  frequencies = {
-    'anime_45k': load_word_frequency_map('lists/anime_45k_relevant_words.txt'),
-    'leeds_15k' : load_word_frequency_map('lists/leeds_15k_frequency.txt'),
-    'novel_3k' : load_word_frequency_map('lists/Japanese-Word-Frequency-List-1-3000.txt'),
-    'wikipedia_10k' : load_word_frequency_map('lists/wikipedia_10k.txt'),
-  }
-
-  frequency_list_names = {
-    'anime_45k': ANIME_FREQUENCY_SUBFIELD,
-    'leeds_15k' : 'leeds',
-    'novel_3k' : 'novels',
-    'wikipedia_10k' : 'wikipedia',
-  }
+class NoteScorer:
+  """
+  Frequency scores of notes, memoized by (kanji, kana).
+  """
+  def __init__(self, combined=False, note_scores=None):
+    self.combined = combined
+    # 'kanji\tkana' => [{ display name => score }, matched by normalized form]
+    self.note_scores = note_scores if note_scores is not None else {}
+
+  @cached_property
+  def frequency_index(self):
+    return load_frequency_index()
+
+  @cached_property
+  def combined_scores(self):
+    return CombinedScores(self.frequency_index)
+
+  def score(self, note):
+    """
+    ({ display name => score }, whether a normalized form was needed)
+    """
+    key = '{}\t{}'.format(note['kanji'], note['kana'])
+    if key not in self.note_scores:
+      self.note_scores[key] = self._score(note['kanji'], note['kana'])
+    frequency_scores, normalized = self.note_scores[key]
+    return frequency_scores, normalized
+
+  def _score(self, kanji, kana):
+    # Kanji scores win over kana scores, which win over normalized forms.
+    sources = self.frequency_index.sources
+    # NB: The index holds every list's rank of a word in one row, so each
+    # form is a single lookup.
+    scores = dict(self.frequency_index.scores(kana))
+    scores.update(self.frequency_index.scores(kanji))
+
+    normalized = False
+    if len(scores) < len(sources):
+      normalized_scores = self.frequency_index.normalized_scores(
+          normalized_keys(kanji) + normalized_keys(kana))
+      for source, score in normalized_scores.items():
+        if source not in scores:
+          scores[source] = score
+          normalized = True
+
+    frequency_scores = OrderedDict((SOURCES[source].display_name.lower(), scores[source]) \
+        for source in sources if source in scores)
+
+    if self.combined:
+      combined_rank = self.combined_scores.rank(kanji) or self.combined_scores.rank(kana)
+      if combined_rank:
+        frequency_scores[COMBINED_FREQUENCY_SUBFIELD] = combined_rank
+
+    return frequency_scores, normalized
+
+def scores_fingerprint(combined):
+  """
+  Changes whenever any note's scores could change, regardless of the note.
+  """
+  return hash_strings(str(SCORES_VERSION), index_fingerprint(FREQUENCY_LISTS),
+      str(combined))
+
+def update_notes(notes, scorer, patch=None):
+  """
+  Attach frequency scores to notes and clean up deprecated fields, and make
+  the same edits to the patch (see toml_patch) if there is one.
+  Returns (changed, notes with scores, notes matched by a normalized form).
+  """
+  changed = False
+  freq_count = 0
+  normalized_count = 0
+  for position, note in enumerate(notes):
+    # First we clean the note of deprecated frequency fields.
+    # These were fields that were renamed or discarded.
+    for deprecated_field in DEPRECATED_FIELDS:
+      if note.pop(deprecated_field, None) is not None:
+        changed = True
+        if patch:
+          patch.remove_key(position, deprecated_field)
+
+    # Now we attach all of the word frequencies we know about the note.
+    frequency_scores, normalized = scorer.score(note)
+    if normalized:
+      normalized_count += 1
+    if not frequency_scores:
+      continue
+    freq_count += 1
+
+    current_scores = note.get(FREQUENCY_FIELD, {})
+    if list(current_scores.items()) != list(frequency_scores.items()):
+      note[FREQUENCY_FIELD] = DynamicInlineTableDict(frequency_scores)
+      changed = True
+      if patch:
+        patch.set_key(position, FREQUENCY_FIELD, note[FREQUENCY_FIELD])
+
+  return changed, freq_count, normalized_count
+
+def main(combined=False, force=False):
+  """
+  Only files that changed since the last run are read, and only the notes
+  that changed are rewritten, in place (see toml_patch). Every file is
+  reprocessed when a frequency list changes.
+  """
+  fingerprint = scores_fingerprint(combined)
+  state = load_json(STATE_CACHE_NAME)
+  if force or not state or state['fingerprint'] != fingerprint:
+    state = {'fingerprint': fingerprint, 'files': {}, 'notes': {}}
+
+  scorer = NoteScorer(combined, state['notes'])
 
   print('==== Notes files ==== ')
+  unchanged_files = 0
+  rewritten_files = 0
   total_notes = 0
+  total_normalized = 0
   for filename in glob.glob('**/*.toml', recursive=True):
     if 'cardgen' in filename or 'temp/' in filename:
       continue # XXX: Things here shouldn't be processed for now.
     try:
+      if state['files'].get(filename) == hash_file(filename):
+        unchanged_files += 1
+        continue
+
       notes = NoteLibrary.read_notes_from_toml_file(filename)
       note_count = len(notes[INDEX_NAME])
-      freq_count = 0
-
-      for note in notes[INDEX_NAME]:
-        # First we clean the note of deprecated frequency fields.
-        # These were fields that were renamed or discarded.
-        for deprecated_field in DEPRECATED_FIELDS:
-          note.pop(deprecated_field, None)
-
-        # Now we attach all of the word frequencies we know about the note.
-        frequency_scores = {}
-
-        for freq_name, freq_map in frequencies.items():
-          current_score = None
-          if note['kanji'] in freq_map:
-            current_score = freq_map[note['kanji']]
-          elif note['kana'] in freq_map:
-            current_score = freq_map[note['kana']]
-          else:
-            continue
-
-          human_name = frequency_list_names[freq_name].lower()
-          frequency_scores[human_name] = current_score
-
-        if frequency_scores:
-          note[FREQUENCY_FIELD] = DynamicInlineTableDict(frequency_scores)
-          freq_count += 1
-
-      print('{0: <50} : {2} / {1} notes'.format(filename, note_count, freq_count))
-      write_toml(notes, filename)
+      patch = TomlPatch(filename)
+      changed, freq_count, normalized_count = update_notes(notes[INDEX_NAME], scorer, patch)
+
+      total_notes += note_count
+      total_normalized += normalized_count
+      print('{0: <50} : {2} / {1} notes ({3} normalized)'.format(filename, note_count,
+          freq_count, normalized_count))
+      if changed:
+        patch.write(notes[INDEX_NAME])
+        rewritten_files += 1
+      state['files'][filename] = hash_file(filename)
 
     except Exception as e:
       print('Error processing file: {0}'.format(filename))
       print(e)
 
+  save_json(STATE_CACHE_NAME, state)
+
+  print('{0} files unchanged, {1} rewritten'.format(unchanged_files, rewritten_files))
+  print('{0} notes scored, {1} with new matches from normalized forms'.format(total_notes,
+      total_normalized))
+
 if __name__ == '__main__':
-    main()
+  parser = argparse.ArgumentParser(description='Update note frequency scores')
+  parser.add_argument('--combined', dest='combined', action='store_true',
+      help='also store each note\'s rank across every list')
+  parser.add_argument('--force', dest='force', action='store_true',
+      help='rescore every note, even if nothing changed')
+  args = parser.parse_args()
+  main(combined=args.combined, force=args.force)
 